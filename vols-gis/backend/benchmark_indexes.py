@@ -0,0 +1,192 @@
+"""Бенчмарк индексов миграций: планы запросов до и после (EXPLAIN ANALYZE)
+
+Запросы повторяют фильтры views: fibers_list, links_list, links_search,
+поиск по имени (ILIKE '%...%'), KNN nodes_nearest, общий поиск
+/api/search и статистику дашборда. Для каждого запроса выводятся узел плана, время выполнения и
+число прочитанных буферов без индексов миграций и с ними.
+
+Все выполняется в одной транзакции, которая в конце откатывается:
+- --seed N добавляет N синтетических узлов (и пропорционально маршруты,
+  волокна и связи), чтобы таблицы были достаточно большими;
+- "до" - индексы миграций удаляются внутри SAVEPOINT и возвращаются
+  ROLLBACK TO SAVEPOINT.
+DROP INDEX в транзакции держит эксклюзивную блокировку таблиц до ее
+окончания, поэтому запускать стоит на копии или dev-базе.
+
+    python benchmark_indexes.py [--seed 200000] [--ini development.ini]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, text
+from pyramid.paster import get_appsettings
+
+from vols_gis.migrations import (
+    v0001_filter_indexes, v0002_search_indexes, v0003_meta_data_jsonb, v0004_nodes_geography_index,
+)
+from vols_gis.views.stats import DASHBOARD_SQL
+from vols_gis.views.search import SEARCH_TYPES, search_sql
+
+INDEXES = (v0001_filter_indexes.INDEXES + v0002_search_indexes.INDEXES + v0003_meta_data_jsonb.INDEXES
+           + v0004_nodes_geography_index.INDEXES)
+
+SEED_SQL = [
+    """
+    INSERT INTO nodes (name, node_type, status, geom)
+    SELECT 'bench node ' || g,
+           (ARRAY['muft', 'cross', 'bsp', 'terminal'])[1 + g % 4],
+           (ARRAY['active', 'active', 'active', 'inactive', 'maintenance'])[1 + g % 5],
+           ST_SetSRID(ST_MakePoint(30 + random() * 10, 50 + random() * 10), 4326)
+    FROM generate_series(1, :n) g
+    """,
+    """
+    WITH n AS (SELECT array_agg(id) AS ids FROM nodes)
+    INSERT INTO vols (name, status, start_node_id, end_node_id, path, length_km)
+    SELECT 'bench vols ' || g,
+           (ARRAY['active', 'active', 'planning', 'under_construction'])[1 + g % 4],
+           n.ids[1 + g % cardinality(n.ids)], n.ids[1 + (g * 7) % cardinality(n.ids)],
+           ST_MakeLine(ST_SetSRID(ST_MakePoint(30 + random() * 10, 50 + random() * 10), 4326),
+                       ST_SetSRID(ST_MakePoint(30 + random() * 10, 50 + random() * 10), 4326)),
+           random() * 100
+    FROM generate_series(1, :n / 10) g, n
+    """,
+    """
+    WITH v AS (SELECT array_agg(id) AS ids FROM vols)
+    INSERT INTO fibers (name, status, fiber_count, vols_id, meta_data)
+    SELECT 'bench fiber ' || g,
+           (ARRAY['active', 'active', 'spare', 'damaged'])[1 + g % 4],
+           8, v.ids[1 + g % cardinality(v.ids)],
+           jsonb_build_object('manufacturer', (ARRAY['Corning', 'Fujikura', 'OFS', 'Incab'])[1 + g % 4],
+                              'year', 2000 + g % 25)
+    FROM generate_series(1, :n) g, v
+    """,
+    """
+    WITH f AS (SELECT array_agg(id) AS ids FROM fibers), n AS (SELECT array_agg(id) AS ids FROM nodes)
+    INSERT INTO links (fiber_id, start_node_id, end_node_id, start_port, end_port, status, capacity_gbps)
+    SELECT f.ids[1 + g % cardinality(f.ids)],
+           n.ids[1 + (g * 3) % cardinality(n.ids)], n.ids[1 + (g * 11) % cardinality(n.ids)],
+           g % 48, g % 48,
+           (ARRAY['active', 'active', 'spare', 'unused'])[1 + g % 4], 10
+    FROM generate_series(1, :n) g, f, n
+    """,
+]
+
+# Запросы views; :vols_id, :fiber_id, :node_id - существующие значения
+QUERIES = [
+    ('fibers_list ?vols_id=', 'SELECT * FROM fibers WHERE vols_id = :vols_id ORDER BY id LIMIT 101'),
+    ('fibers_list ?status=spare', "SELECT * FROM fibers WHERE status = 'spare' ORDER BY id LIMIT 101"),
+    ('fibers_by_vols', 'SELECT * FROM fibers WHERE vols_id = :vols_id'),
+    ('links_list ?fiber_id=', 'SELECT * FROM links WHERE fiber_id = :fiber_id ORDER BY id LIMIT 101'),
+    ('links_list ?start_node_id=', 'SELECT * FROM links WHERE start_node_id = :node_id ORDER BY id LIMIT 101'),
+    ('links_search ?node_id=',
+     'SELECT * FROM links WHERE start_node_id = :node_id OR end_node_id = :node_id'),
+    ('nodes_list ?status=maintenance',
+     "SELECT id, name FROM nodes WHERE status = 'maintenance' ORDER BY id LIMIT 101"),
+    ('nodes_list ?search=', "SELECT id, name FROM nodes WHERE name ILIKE '%' || :search || '%' ORDER BY id LIMIT 101"),
+    ('vols_list ?search=', "SELECT id, name FROM vols WHERE name ILIKE '%' || :search || '%' ORDER BY id LIMIT 101"),
+    ('fibers_list ?search=', "SELECT id, name FROM fibers WHERE name ILIKE '%' || :search || '%' ORDER BY id LIMIT 101"),
+    ('fibers_list ?meta.year=2019',
+     """SELECT * FROM fibers WHERE meta_data @> '{"year": 2019}' OR meta_data @> '{"year": "2019"}'
+        ORDER BY id LIMIT 101"""),
+    ('fibers_list ?meta_contains=',
+     """SELECT * FROM fibers WHERE meta_data @> '{"manufacturer": "Incab", "year": 2019}'
+        ORDER BY id LIMIT 101"""),
+    ('nodes_nearest ?k=10',
+     """SELECT id, name FROM nodes
+        ORDER BY geography(geom) <-> geography(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)) LIMIT 10"""),
+    ('search ?q=', search_sql(SEARCH_TYPES).text),
+    ('stats_dashboard', DASHBOARD_SQL.text),
+]
+
+PARAMS_SQL = text("""
+    SELECT (SELECT vols_id FROM fibers WHERE vols_id IS NOT NULL ORDER BY id DESC LIMIT 1) AS vols_id,
+           (SELECT fiber_id FROM links WHERE fiber_id IS NOT NULL ORDER BY id DESC LIMIT 1) AS fiber_id,
+           (SELECT start_node_id FROM links WHERE start_node_id IS NOT NULL ORDER BY id DESC LIMIT 1) AS node_id
+""")
+
+
+def plan_summary(plan):
+    """Узлы плана с именами использованных индексов"""
+    nodes = []
+
+    def walk(node):
+        label = node['Node Type']
+        if node.get('Index Name'):
+            label += f" ({node['Index Name']})"
+        nodes.append(label)
+        for child in node.get('Plans', ()):
+            walk(child)
+
+    walk(plan)
+    scans = [label for label in nodes if 'Scan' in label]
+    return ', '.join(dict.fromkeys(scans)) or nodes[0]
+
+
+def explain(connection, sql, params):
+    result = connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}'), params).scalar()
+    data = (json.loads(result) if isinstance(result, str) else result)[0]
+    plan = data['Plan']
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    return data['Execution Time'], buffers, plan_summary(plan)
+
+
+def run_all(connection, params, repeat):
+    results = {}
+    for name, sql in QUERIES:
+        # Лучшее из нескольких запусков: первый прогревает кеш
+        runs = [explain(connection, sql, params) for _ in range(repeat)]
+        results[name] = min(runs, key=lambda run: run[0])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ini', default='development.ini')
+    parser.add_argument('--seed', type=int, default=0, help='число синтетических узлов')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(get_appsettings(args.ini)['sqlalchemy.url'])
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            if args.seed:
+                print(f'Генерация данных: {args.seed} узлов...')
+                for sql in SEED_SQL:
+                    connection.execute(text(sql), {'n': args.seed})
+            for name, definition in INDEXES:
+                connection.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}'))
+            for table in ('nodes', 'vols', 'fibers', 'links'):
+                connection.execute(text(f'ANALYZE {table}'))
+
+            params = dict(connection.execute(PARAMS_SQL).mappings().one())
+            params.update(lon=35.0, lat=55.0, search='123', q='bench 123', pattern='%bench 123%', prefix='bench 123%', limit=10)
+
+            savepoint = connection.begin_nested()
+            for name, _ in INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+            before = run_all(connection, params, args.repeat)
+            savepoint.rollback()
+            after = run_all(connection, params, args.repeat)
+        finally:
+            transaction.rollback()
+
+    print(f"\n{'Запрос':32} {'до, мс':>9} {'после, мс':>10} {'буферы до/после':>18}  План после")
+    print('-' * 120)
+    for name, _ in QUERIES:
+        time_before, buffers_before, _ = before[name]
+        time_after, buffers_after, plan_after = after[name]
+        print(f'{name:32} {time_before:9.2f} {time_after:10.2f} '
+              f'{f"{buffers_before}/{buffers_after}":>18}  {plan_after}')
+    print('\nПланы "до":')
+    for name, _ in QUERIES:
+        print(f'  {name:32} {before[name][2]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Бенчмарк сериализации списков: to_shape по строкам против координат из SQL
+
+Сравнивает работу, которую views выполняют в Python на каждую строку:
+- раньше: WKB из БД -> geoalchemy2.shape.to_shape -> Shapely -> координаты;
+- сейчас: БД отдает ST_X/ST_Y и ST_AsGeoJSON, Python только собирает словарь.
+
+БД не нужна: строки генерируются в памяти в том виде, в каком их
+возвращает psycopg2.
+"""
+import sys
+import time
+import json
+import random
+import datetime
+from types import SimpleNamespace
+
+from geoalchemy2.elements import WKBElement
+from geoalchemy2.shape import to_shape
+from shapely.geometry import Point, LineString
+
+from vols_gis.utils.serialization import node_row_to_dict, vols_row_to_dict
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+PATH_POINTS = 20
+
+
+def make_node_rows(count):
+    """Строки узлов: WKB геометрия (старый путь) и lat/lon (новый путь)"""
+    now = datetime.datetime.now()
+    old_rows, new_rows = [], []
+    for i in range(count):
+        lon, lat = random.uniform(30, 40), random.uniform(50, 60)
+        attrs = dict(id=i, name=f'node {i}', description=None, node_type='muft',
+                     status='active', meta_data=None, created_at=now, updated_at=now)
+        old_rows.append(SimpleNamespace(geom=WKBElement(Point(lon, lat).wkb, srid=4326), **attrs))
+        new_rows.append(SimpleNamespace(lat=lat, lon=lon, **attrs))
+    return old_rows, new_rows
+
+
+def make_vols_rows(count):
+    """Строки маршрутов: WKB LineString (старый путь) и GeoJSON (новый путь)"""
+    now = datetime.datetime.now()
+    old_rows, new_rows = [], []
+    for i in range(count):
+        coords = [(random.uniform(30, 40), random.uniform(50, 60)) for _ in range(PATH_POINTS)]
+        attrs = dict(id=i, name=f'vols {i}', description=None, start_node_id=1, end_node_id=2,
+                     length_km=None, status='active', meta_data=None, created_at=now, updated_at=now)
+        old_rows.append(SimpleNamespace(path=WKBElement(LineString(coords).wkb, srid=4326), **attrs))
+        geojson = json.dumps({'type': 'LineString', 'coordinates': coords})
+        new_rows.append(SimpleNamespace(path_geojson=geojson, **attrs))
+    return old_rows, new_rows
+
+
+def old_node_to_dict(row):
+    shape = to_shape(row.geom)
+    return {
+        'id': row.id, 'name': row.name or '', 'description': row.description,
+        'node_type': row.node_type, 'status': row.status, 'meta_data': row.meta_data,
+        'created_at': row.created_at.isoformat(), 'updated_at': row.updated_at.isoformat(),
+        'lat': shape.y, 'lon': shape.x,
+    }
+
+
+def old_vols_to_dict(row):
+    shape = to_shape(row.path)
+    return {
+        'id': row.id, 'name': row.name or '', 'description': row.description,
+        'start_node_id': row.start_node_id, 'end_node_id': row.end_node_id,
+        'path': [[coord[0], coord[1]] for coord in shape.coords],
+        'length_km': None, 'status': row.status, 'meta_data': row.meta_data,
+        'created_at': row.created_at.isoformat(), 'updated_at': row.updated_at.isoformat(),
+    }
+
+
+def measure(func, rows):
+    start = time.perf_counter()
+    for row in rows:
+        func(row)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print(f"Сериализация {ROWS} строк")
+    print("=" * 60)
+
+    old_rows, new_rows = make_node_rows(ROWS)
+    old_time = measure(old_node_to_dict, old_rows)
+    new_time = measure(node_row_to_dict, new_rows)
+    print(f"Узлы:     to_shape {old_time:.2f} с, ST_X/ST_Y {new_time:.2f} с, "
+          f"ускорение x{old_time / new_time:.1f}")
+
+    old_rows, new_rows = make_vols_rows(ROWS)
+    old_time = measure(old_vols_to_dict, old_rows)
+    new_time = measure(vols_row_to_dict, new_rows)
+    print(f"Маршруты: to_shape {old_time:.2f} с, ST_AsGeoJSON {new_time:.2f} с, "
+          f"ускорение x{old_time / new_time:.1f} ({PATH_POINTS} точек в маршруте)")
@@ -8,7 +8,9 @@ sys.path.insert(0, os.path.dirname(__file__))
 from sqlalchemy import create_engine
 from pyramid.paster import get_appsettings
 from vols_gis.db import Base
-from vols_gis.models import Node, Vols, Fiber, Link, WebMap, User
+from vols_gis.models import Node, Vols, VolsLod, Fiber, Link, WebMap, User
+from vols_gis.utils.lod import refresh_lod
+from vols_gis.migrations import upgrade
 
 def init_db():
     """Создает все таблицы в базе данных"""
@@ -29,6 +31,7 @@ def init_db():
     print("Импорт моделей...")
     print("  - Node")
     print("  - Vols")
+    print("  - VolsLod")
     print("  - Fiber")
     print("  - Link")
     print("  - WebMap")
@@ -47,6 +50,18 @@ def init_db():
         print(f"\nТаблицы в базе данных ({len(tables)}):")
         for table in sorted(tables):
             print(f"  - {table}")
+        
+        # Упрощенные пути для маршрутов, внесенных до появления vols_lod
+        with engine.begin() as conn:
+            refresh_lod(conn)
+        print("✅ Уровни детализации маршрутов (vols_lod) обновлены")
+        
+        # Версионные миграции поверх базовой схемы (индексы и т.д.)
+        applied = upgrade(engine)
+        if applied:
+            print(f"✅ Применены миграции: {', '.join(str(v) for v in applied)}")
+        else:
+            print("✅ Миграции уже применены")
             
     except Exception as e:
         print(f"❌ Ошибка при создании таблиц: {e}")
@@ -0,0 +1,46 @@
+"""Управление миграциями схемы БД
+
+    python migrate.py                  - применить все новые миграции
+    python migrate.py status           - список миграций
+    python migrate.py upgrade [N]      - применить миграции до версии N
+    python migrate.py downgrade N      - откатить миграции с версией больше N
+"""
+import sys
+import os
+
+# Добавляем путь к проекту
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+from pyramid.paster import get_appsettings
+from vols_gis.migrations import status, upgrade, downgrade, MigrationError
+
+
+def main(argv):
+    command = argv[0] if argv else 'upgrade'
+    settings = get_appsettings('development.ini')
+    engine = create_engine(settings['sqlalchemy.url'])
+    
+    try:
+        if command == 'status':
+            for migration in status(engine):
+                mark = '✅' if migration['applied'] else '  '
+                print(f"{mark} {migration['version']:04d} {migration['description']}")
+        elif command == 'upgrade':
+            target = int(argv[1]) if len(argv) > 1 else None
+            applied = upgrade(engine, target)
+            print(f"Применены миграции: {applied}" if applied else "Новых миграций нет")
+        elif command == 'downgrade' and len(argv) > 1:
+            reverted = downgrade(engine, int(argv[1]))
+            print(f"Откачены миграции: {reverted}" if reverted else "Откатывать нечего")
+        else:
+            print(__doc__)
+            return 2
+    except MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
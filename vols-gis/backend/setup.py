@@ -28,6 +28,8 @@ setup(
     install_requires=requires,
     extras_require={
         'testing': tests_require,
+        'msgpack': ['msgpack>=1.0.0'],
+        'brotli': ['brotli>=1.0.9'],
     },
     entry_points={
         'paste.app_factory': [
@@ -1,9 +1,12 @@
 """Vols GIS - Минималистичный аналог NextGIS Web для учета ВОЛС"""
 from pyramid.config import Configurator
 from pyramid.tweens import EXCVIEW
-from sqlalchemy import engine_from_config, text
+from pyramid.settings import asbool
+from sqlalchemy import engine_from_config
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from .db import Base
+from .db_pool import CircuitBreaker, PoolHealthChecker, watch_engine_errors
 
 
 def main(global_config, **settings):
@@ -16,33 +19,90 @@ def main(global_config, **settings):
     # Настройка базы данных
     engine = None
     DBSession = None
+    health_checker = None
+    breaker = None
     try:
-        engine = engine_from_config(settings, prefix='sqlalchemy.')
-        # Тестируем подключение
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        # Параметры пула (pool_size, max_overflow, pool_timeout, pool_recycle,
+        # pool_pre_ping) задаются в development.ini с префиксом sqlalchemy.;
+        # pool_pre_ping engine_from_config сам к bool не приводит
+        engine_options = {
+            'pool_pre_ping': asbool(settings.get('sqlalchemy.pool_pre_ping', True)),
+        }
+        if make_url(settings['sqlalchemy.url']).get_backend_name() == 'postgresql':
+            # Короткий таймаут подключения, чтобы запросы не висели, пока БД лежит
+            engine_options['connect_args'] = {
+                'connect_timeout': int(settings.get('vols_gis.db_connect_timeout', 5))
+            }
+        # Engine ленивый: к БД он подключится при первом запросе
+        engine = engine_from_config(settings, prefix='sqlalchemy.', **engine_options)
         Base.metadata.bind = engine
         DBSession = sessionmaker(bind=engine)
-        logger.info('✅ База данных успешно подключена')
+        
+        # Размыкатель цепи и фоновое переподключение с экспоненциальной задержкой:
+        # приложение стартует и без БД и само подхватывает ее, когда она поднимется
+        health_checker = PoolHealthChecker(
+            engine,
+            interval=int(settings.get('vols_gis.db_health_interval', 30)),
+            max_backoff=int(settings.get('vols_gis.db_backoff_max', 60))
+        )
+        breaker = CircuitBreaker(
+            failure_threshold=int(settings.get('vols_gis.db_breaker_threshold', 3)),
+            on_open=health_checker.wake
+        )
+        health_checker.breaker = breaker
+        watch_engine_errors(engine, breaker)
+        health_checker.start()
     except Exception as e:
-        logger.error(f'❌ Ошибка подключения к базе данных: {e}')
+        logger.error(f'❌ Ошибка настройки подключения к базе данных: {e}')
         import traceback
         logger.error(traceback.format_exc())
         logger.warning('⚠️ Приложение запущено без БД. Запросы к БД будут возвращать ошибки.')
         # Создаем заглушку для DBSession
         DBSession = None
     
+    config.registry['db_engine'] = engine
+    config.registry['db_health_checker'] = health_checker
+    
+    # TTL кеша статистики дашборда
+    from .views.stats import dashboard_cache
+    dashboard_cache.ttl = int(settings.get('vols_gis.stats_ttl', 30))
+    from .utils.clusters import cluster_cache
+    cluster_cache.ttl = int(settings.get('vols_gis.clusters_ttl', 60))
+    from .graph import port_index
+    port_index.ttl = int(settings.get('vols_gis.ports_ttl', 300))
+    from .graph import network_graph
+    network_graph.ttl = int(settings.get('vols_gis.graph_ttl', 300))
+    
+    # Кеш ответов read-heavy endpoints
+    from .utils.response_cache import response_cache
+    response_cache.configure(settings)
+    
+    # Кеш проверенных JWT токенов и необязательный кеш профилей пользователей
+    from .auth.cache import token_cache, user_cache
+    token_cache.configure(settings)
+    user_cache.configure(settings)
+    
+    # Права view (permission=) проверяет политика по роли из request.user
+    from .auth.security import AuthSecurityPolicy
+    config.set_security_policy(AuthSecurityPolicy())
+    
+    # Пул фоновых задач импорта файлов
+    from .imports import import_manager
+    import_manager.configure(settings, engine)
+    
     # Добавляем DBSession в request
     def get_db(request):
         if DBSession is None:
             logger.warning('Попытка создать DB сессию, но БД не подключена')
             # Возвращаем None вместо исключения, чтобы view мог обработать это
             return None
+        if not breaker.allow_request():
+            # БД недоступна: отказываем сразу, не дожидаясь таймаута подключения
+            return None
         try:
-            session = DBSession()
-            # Проверяем, что сессия действительно работает
-            session.execute(text("SELECT 1"))
-            return session
+            # Живость соединения проверяет пул (pool_pre_ping) при выдаче
+            # соединения, отдельный SELECT 1 на каждый запрос не нужен
+            return DBSession()
         except Exception as e:
             logger.error(f'Ошибка создания DB сессии: {e}')
             import traceback
@@ -69,6 +129,12 @@ def main(global_config, **settings):
     # Используем under=EXCVIEW чтобы он был последним в цепочке
     config.add_tween('vols_gis.middleware.cors.cors_tween_factory', under=EXCVIEW)
     
+    # Аутентификация: токен проверяется один раз на запрос -> request.user
+    config.add_tween('vols_gis.auth.security.auth_tween_factory', under=EXCVIEW)
+    
+    # Сжатие ответов (brotli / gzip по Accept-Encoding)
+    config.add_tween('vols_gis.middleware.compression.compression_tween_factory', under=EXCVIEW)
+    
     # Статические файлы для frontend
     import os
     frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'frontend')
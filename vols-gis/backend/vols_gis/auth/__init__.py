@@ -1,12 +1,18 @@
 """Модуль аутентификации и авторизации"""
-from .jwt import create_access_token, decode_access_token, get_user_from_token
+from .jwt import create_access_token, decode_access_token, get_user_from_token, verify_token
+from .cache import token_cache, user_cache
 from .decorators import require_auth, require_role
+from .security import AUTHENTICATED, AuthSecurityPolicy
 
 __all__ = [
     'create_access_token',
     'decode_access_token',
     'get_user_from_token',
+    'verify_token',
+    'token_cache',
+    'user_cache',
     'require_auth',
     'require_role',
+    'AUTHENTICATED',
+    'AuthSecurityPolicy',
 ]
-
@@ -0,0 +1,105 @@
+"""Кеши аутентификации: проверенные JWT токены и профили пользователей
+
+- TokenCache - LRU проверенных токенов. Ключ - sha256 токена (сам токен
+  в памяти не хранится), запись живет до exp токена, поэтому истекший
+  токен из кеша не вернется. Повторные запросы с тем же токеном не
+  выполняют jwt.decode.
+- UserCache - необязательный кеш user.to_dict() по ID для /api/auth/me.
+  Сбрасывается в users_update/users_delete; TTL покрывает изменения
+  из других процессов и напрямую в БД.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+
+class LRUCache:
+    """LRU со временем истечения каждой записи (time.time())"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TokenCache(LRUCache):
+    """Проверенные токены: sha256(token) -> данные пользователя до exp"""
+
+    def configure(self, settings):
+        """Настройка из vols_gis.auth.* в .ini"""
+        self.max_entries = int(settings.get('vols_gis.auth.token_cache_size', 1024))
+        self.clear()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        return super().get(self._key(token))
+
+    def set(self, token, user_info, exp):
+        super().set(self._key(token), user_info, exp)
+
+
+class UserCache(LRUCache):
+    """Профили пользователей (user.to_dict()) по ID, выключен по умолчанию"""
+
+    def __init__(self, max_entries=1024, ttl=300, enabled=False):
+        super().__init__(max_entries)
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def configure(self, settings):
+        """Настройка из vols_gis.auth.* в .ini"""
+        from pyramid.settings import asbool
+        self.enabled = asbool(settings.get('vols_gis.auth.user_cache', False))
+        self.ttl = int(settings.get('vols_gis.auth.user_cache_ttl', 300))
+        self.max_entries = int(settings.get('vols_gis.auth.user_cache_size', 1024))
+        self.clear()
+
+    def get(self, user_id):
+        if not self.enabled:
+            return None
+        return super().get(user_id)
+
+    def set(self, user_id, user_dict):
+        if self.enabled:
+            super().set(user_id, user_dict, time.time() + self.ttl)
+
+    def invalidate(self, user_id):
+        self.pop(user_id)
+
+
+token_cache = TokenCache()
+user_cache = UserCache()
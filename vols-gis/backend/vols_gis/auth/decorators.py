@@ -1,8 +1,11 @@
-"""Декораторы для авторизации"""
+"""Декораторы для авторизации
+
+Токен проверяет auth_tween (auth/security.py) один раз на запрос, права -
+политика безопасности через view_config(permission=...). Декораторы
+оставлены для view вне этой схемы и только читают request.user.
+"""
 from functools import wraps
-from pyramid.view import view_config
 from pyramid.response import Response
-from ..auth.jwt import get_user_from_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,38 +19,44 @@ def get_token_from_request(request):
     return None
 
 
+def unauthorized_response(request):
+    """401: токена нет или он неверный/истекший"""
+    if not get_token_from_request(request):
+        return Response(
+            json_body={
+                'error': 'Unauthorized',
+                'message': 'Требуется аутентификация. Отправьте токен в заголовке Authorization: Bearer <token>'
+            },
+            status=401,
+            content_type='application/json'
+        )
+    return Response(
+        json_body={
+            'error': 'Invalid token',
+            'message': 'Неверный или истекший токен'
+        },
+        status=401,
+        content_type='application/json'
+    )
+
+
+def forbidden_response(message):
+    """403: пользователь известен, но роли недостаточно"""
+    return Response(
+        json_body={'error': 'Forbidden', 'message': message},
+        status=403,
+        content_type='application/json'
+    )
+
+
 def require_auth(view_func):
     """Декоратор для проверки аутентификации"""
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        token = get_token_from_request(request)
-        
-        if not token:
-            return Response(
-                json_body={
-                    'error': 'Unauthorized',
-                    'message': 'Требуется аутентификация. Отправьте токен в заголовке Authorization: Bearer <token>'
-                },
-                status=401,
-                content_type='application/json'
-            )
-        
-        user_info = get_user_from_token(token)
-        if not user_info:
-            return Response(
-                json_body={
-                    'error': 'Invalid token',
-                    'message': 'Неверный или истекший токен'
-                },
-                status=401,
-                content_type='application/json'
-            )
-        
-        # Добавляем информацию о пользователе в request
-        request.user = user_info
-        
+        if getattr(request, 'user', None) is None:
+            return unauthorized_response(request)
         return view_func(request, *args, **kwargs)
-    
+
     return wrapper
 
 
@@ -56,47 +65,14 @@ def require_role(*allowed_roles):
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            # Сначала проверяем аутентификацию
-            token = get_token_from_request(request)
-            
-            if not token:
-                return Response(
-                    json_body={
-                        'error': 'Unauthorized',
-                        'message': 'Требуется аутентификация'
-                    },
-                    status=401,
-                    content_type='application/json'
-                )
-            
-            user_info = get_user_from_token(token)
-            if not user_info:
-                return Response(
-                    json_body={
-                        'error': 'Invalid token',
-                        'message': 'Неверный или истекший токен'
-                    },
-                    status=401,
-                    content_type='application/json'
-                )
-            
-            # Проверяем роль
-            user_role = user_info.get('role')
-            if user_role not in allowed_roles:
-                return Response(
-                    json_body={
-                        'error': 'Forbidden',
-                        'message': f'Доступ запрещен. Требуются роли: {", ".join(allowed_roles)}'
-                    },
-                    status=403,
-                    content_type='application/json'
+            user_info = getattr(request, 'user', None)
+            if user_info is None:
+                return unauthorized_response(request)
+            if user_info.get('role') not in allowed_roles:
+                return forbidden_response(
+                    f'Доступ запрещен. Требуются роли: {", ".join(allowed_roles)}'
                 )
-            
-            # Добавляем информацию о пользователе в request
-            request.user = user_info
-            
             return view_func(request, *args, **kwargs)
-        
+
         return wrapper
     return decorator
-
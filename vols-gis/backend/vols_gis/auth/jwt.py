@@ -4,6 +4,8 @@ import datetime
 from typing import Optional, Dict
 import logging
 
+from .cache import token_cache
+
 logger = logging.getLogger(__name__)
 
 # Секретный ключ (в продакшене должен быть в переменных окружения)
@@ -39,14 +41,33 @@ def decode_access_token(token: str) -> Optional[Dict]:
         return None
 
 
+def user_from_payload(payload: Dict) -> Dict:
+    """Информация о пользователе из claims токена"""
+    return {
+        "user_id": payload.get("user_id"),
+        "username": payload.get("username"),
+        "role": payload.get("role")
+    }
+
+
 def get_user_from_token(token: str) -> Optional[Dict]:
     """Получает информацию о пользователе из токена"""
     payload = decode_access_token(token)
     if payload:
-        return {
-            "user_id": payload.get("user_id"),
-            "username": payload.get("username"),
-            "role": payload.get("role")
-        }
+        return user_from_payload(payload)
     return None
 
+
+def verify_token(token: str) -> Optional[Dict]:
+    """get_user_from_token с кешем проверенных токенов (до exp токена)"""
+    user_info = token_cache.get(token)
+    if user_info is None:
+        payload = decode_access_token(token)
+        if not payload:
+            return None
+        user_info = user_from_payload(payload)
+        if payload.get("exp") is not None:
+            token_cache.set(token, user_info, payload["exp"])
+    # Копия: view не должен менять запись кеша
+    return dict(user_info)
+
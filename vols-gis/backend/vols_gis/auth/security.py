@@ -0,0 +1,60 @@
+"""Tween аутентификации и политика безопасности Pyramid
+
+Tween один раз на запрос разбирает заголовок Authorization и проверяет
+токен через кеш token_cache; результат - request.user (None без токена
+или с неверным токеном). Политика только читает request.user, поэтому
+проверка view_config(permission=...) - сравнение строк без jwt.decode.
+
+Права (permission):
+- 'authenticated' - любой пользователь с действующим токеном;
+- имя роли ('admin', 'editor', ...) - пользователь с этой ролью.
+Отказ обрабатывает forbidden view (exception_views): 401 без
+пользователя, 403 при недостаточной роли.
+"""
+from pyramid.security import Allowed, Denied
+
+from .decorators import get_token_from_request
+from .jwt import verify_token
+
+AUTHENTICATED = 'authenticated'
+
+
+def authenticate(request):
+    """Пользователь запроса по токену (None, если токена нет или он неверный)"""
+    token = get_token_from_request(request)
+    return verify_token(token) if token else None
+
+
+def auth_tween_factory(handler, registry):
+    """Проверяет токен до вызова view и кладет пользователя в request.user"""
+    def auth_tween(request):
+        request.user = authenticate(request)
+        return handler(request)
+
+    return auth_tween
+
+
+class AuthSecurityPolicy:
+    """Права по роли из request.user (его заполняет auth_tween)"""
+
+    def identity(self, request):
+        return getattr(request, 'user', None)
+
+    def authenticated_userid(self, request):
+        user = self.identity(request)
+        return user.get('user_id') if user else None
+
+    def permits(self, request, context, permission):
+        user = self.identity(request)
+        if user is None:
+            return Denied('Требуется аутентификация')
+        if permission == AUTHENTICATED or user.get('role') == permission:
+            return Allowed('Роль %s', user.get('role'))
+        return Denied('Доступ запрещен. Требуются роли: %s', permission)
+
+    def remember(self, request, userid, **kw):
+        # Токен выдает /api/auth/login, заголовки не нужны
+        return []
+
+    def forget(self, request, **kw):
+        return []
@@ -1,4 +1,5 @@
 """Tween для автоматического закрытия DB сессии после запроса"""
+from pyramid.httpexceptions import HTTPException
 from pyramid.tweens import EXCVIEW
 
 
@@ -8,6 +9,9 @@ def db_close_tween_factory(handler, registry):
         try:
             response = handler(request)
             return response
+        except HTTPException:
+            # 401/403 политики безопасности и прочие HTTP ответы - не ошибки
+            raise
         except Exception as e:
             # Логируем ошибку перед закрытием сессии
             import logging
@@ -0,0 +1,180 @@
+"""Пул соединений с БД: проверка живости, автопереподключение и статистика"""
+import threading
+import time
+import logging
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для БД
+
+    После failure_threshold подряд ошибок соединения размыкается: запросы
+    сразу получают отказ, не дожидаясь таймаута подключения. Замыкает его
+    PoolHealthChecker, когда БД снова отвечает.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, failure_threshold=3, on_open=None):
+        self.failure_threshold = failure_threshold
+        self.on_open = on_open
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        return self.state == self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.state != self.OPEN:
+                self._open()
+
+    def trip(self):
+        """Разомкнуть сразу (БД точно недоступна)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        logger.warning('⚠️ БД недоступна, запросы к БД временно отклоняются')
+        if self.on_open is not None:
+            self.on_open()
+
+    def reset_failures(self):
+        """Успешный запрос: ошибки соединения идут уже не подряд"""
+        if self.failures:
+            with self._lock:
+                self.failures = 0
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self.opened_at = None
+                logger.info('✅ БД снова доступна, запросы к БД разрешены')
+
+
+class PoolHealthChecker:
+    """Фоновая проверка доступности БД
+
+    Живость отдельных соединений проверяет сам пул (pool_pre_ping при
+    выдаче соединения), поэтому запросы не делают SELECT 1. Этот поток
+    раз в interval секунд проверяет, что БД отвечает. Пока БД недоступна,
+    проверки повторяются с экспоненциальной задержкой от min_backoff до
+    max_backoff секунд, а после успешной проверки размыкатель замыкается.
+    """
+
+    def __init__(self, engine, interval=30, min_backoff=1, max_backoff=60, breaker=None):
+        self.engine = engine
+        self.interval = interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker
+        self.healthy = None
+        self.last_check = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def check(self):
+        """Однократная проверка БД"""
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            if self.healthy is False:
+                logger.info('✅ Соединение с БД восстановлено')
+            self.healthy = True
+            self.last_error = None
+            if self.breaker is not None:
+                self.breaker.record_success()
+        except Exception as e:
+            if self.healthy is not False:
+                logger.error(f'❌ БД недоступна: {e}')
+            self.healthy = False
+            self.last_error = str(e)
+            if self.breaker is not None:
+                self.breaker.trip()
+        self.last_check = time.time()
+        return self.healthy
+
+    def wake(self):
+        """Проверить БД немедленно, не дожидаясь интервала"""
+        self._wake.set()
+
+    def _run(self):
+        # Первая проверка сразу: старт приложения не ждет подключения к БД
+        delay = 0
+        backoff = self.min_backoff
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopped:
+                break
+            if self.check():
+                delay = self.interval
+                backoff = self.min_backoff
+            else:
+                delay = backoff
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='db-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+
+def watch_engine_errors(engine, breaker):
+    """Учитывает ошибки соединения из запросов в размыкателе
+
+    Считаются только потеря соединения и ошибки подключения (context.connection
+    is None). Прочие OperationalError - deadlock, statement_timeout,
+    lock_timeout - говорят о запросе, а не о доступности БД. Устаревшее
+    соединение, отбракованное pool_pre_ping, пул сам заменяет новым.
+    Успешный запрос обнуляет счетчик.
+    """
+    @event.listens_for(engine, 'handle_error')
+    def on_error(context):
+        if getattr(context, 'is_pre_ping', False):
+            return
+        if context.is_disconnect or context.connection is None:
+            breaker.record_failure()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def on_success(conn, cursor, statement, parameters, context, executemany):
+        breaker.reset_failures()
+
+
+def pool_stats(engine, health_checker=None):
+    """Статистика пула соединений для подбора pool_size/max_overflow"""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    # QueuePool отдает счетчики, у других пулов (например, для SQLite) их может не быть
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    timeout = getattr(pool, 'timeout', None)
+    if callable(timeout):
+        stats['timeout'] = timeout()
+    if health_checker is not None:
+        stats['healthy'] = health_checker.healthy
+        stats['last_check'] = health_checker.last_check
+        stats['last_error'] = health_checker.last_error
+        if health_checker.breaker is not None:
+            stats['circuit'] = health_checker.breaker.state
+    return stats
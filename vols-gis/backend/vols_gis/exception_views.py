@@ -1,11 +1,21 @@
 """Exception views для обработки всех ошибок"""
-from pyramid.view import exception_view_config
+from pyramid.view import exception_view_config, forbidden_view_config
 from pyramid.response import Response
+from .auth.decorators import unauthorized_response, forbidden_response
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@forbidden_view_config()
+def forbidden_view(exc, request):
+    """Отказ политики безопасности: 401 без пользователя, 403 при недостаточной роли"""
+    if getattr(request, 'user', None) is None:
+        return unauthorized_response(request)
+    result = getattr(exc, 'result', None)
+    return forbidden_response(getattr(result, 'msg', None) or 'Доступ запрещен')
+
+
 @exception_view_config(Exception)
 def exception_view(exc, request):
     """Обрабатывает все необработанные исключения и возвращает JSON"""
@@ -0,0 +1,10 @@
+"""Граф сети ВОЛС: маршруты и связи между узлами"""
+from .network import NetworkGraph, network_graph
+from .ports import PortIndex, port_index
+
+__all__ = [
+    'NetworkGraph',
+    'network_graph',
+    'PortIndex',
+    'port_index',
+]
@@ -0,0 +1,325 @@
+"""In-process граф сети в формате CSR (compressed sparse row)
+
+Вершины - узлы (nodes), ребра - маршруты ВОЛС (vols) и связи (links)
+между их начальным и конечным узлами. Граф неориентированный, вес ребра -
+длина в километрах (для связи - длина маршрута ее волокна).
+
+Базовая часть графа хранится компактными массивами:
+    offsets[i]..offsets[i+1] - диапазон ребер вершины i в targets/weights/edges.
+Записи в БД применяются инкрементально: измененные ребра помечаются
+удаленными в CSR и добавляются в небольшой overlay. Когда overlay
+разрастается, граф пересобирается в памяти без обращения к БД.
+
+Записи из других процессов и напрямую в БД подхватываются перезагрузкой
+по TTL (vols_gis.graph_ttl), как у индекса портов.
+"""
+from array import array
+from collections import deque
+import heapq
+import threading
+import time
+import logging
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+EDGE_VOLS = 'vols'
+EDGE_LINK = 'link'
+
+# Размер overlay (доля от числа ребер), после которого граф пересобирается
+COMPACT_RATIO = 0.1
+COMPACT_MIN_EDGES = 1000
+
+LOAD_BATCH_SIZE = 10000
+
+VOLS_EDGES_SQL = text("""
+    SELECT id, start_node_id, end_node_id, COALESCE(length_km, 0)
+    FROM vols
+    WHERE start_node_id IS NOT NULL AND end_node_id IS NOT NULL
+""")
+
+LINK_EDGES_SQL = text("""
+    SELECT l.id, l.start_node_id, l.end_node_id, COALESCE(v.length_km, 0)
+    FROM links l
+    LEFT JOIN fibers f ON f.id = l.fiber_id
+    LEFT JOIN vols v ON v.id = f.vols_id
+    WHERE l.start_node_id IS NOT NULL AND l.end_node_id IS NOT NULL
+      AND (f.vols_id IS NULL OR v.id IS NOT NULL)
+""")
+
+LINK_WEIGHT_SQL = text("""
+    SELECT COALESCE(v.length_km, 0)
+    FROM fibers f
+    JOIN vols v ON v.id = f.vols_id
+    WHERE f.id = :fiber_id
+""")
+
+ROUTE_LINK_EDGES_SQL = text("""
+    SELECT l.id, l.start_node_id, l.end_node_id, COALESCE(v.length_km, 0)
+    FROM links l
+    JOIN fibers f ON f.id = l.fiber_id
+    JOIN vols v ON v.id = f.vols_id
+    WHERE v.id = :vols_id
+""")
+
+FIBER_LINK_EDGES_SQL = text("""
+    SELECT l.id, l.start_node_id, l.end_node_id, COALESCE(v.length_km, 0)
+    FROM links l
+    JOIN fibers f ON f.id = l.fiber_id
+    LEFT JOIN vols v ON v.id = f.vols_id
+    WHERE f.id = :fiber_id
+""")
+
+
+class NetworkGraph:
+    """Граф сети с кратчайшими путями и достижимостью"""
+
+    def __init__(self, ttl=300):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.ttl = ttl
+        self._loaded_at = 0
+        self._reset()
+
+    def _reset(self):
+        # Отображение id узла <-> плотный индекс вершины
+        self._index = {}
+        self._node_ids = array('q')
+        # CSR
+        self._offsets = array('q', [0])
+        self._targets = array('q')
+        self._weights = array('d')
+        self._edge_kinds = []
+        self._edge_ids = array('q')
+        # Ребро (kind, id) -> (u, v, weight) для всех живых ребер
+        self._edges = {}
+        # Overlay инкрементальных изменений
+        self._removed = set()
+        self._extra = {}
+
+    # ---- построение ----
+
+    def _vertex(self, node_id):
+        index = self._index.get(node_id)
+        if index is None:
+            index = len(self._node_ids)
+            self._index[node_id] = index
+            self._node_ids.append(node_id)
+        return index
+
+    def _build(self, edges):
+        """Собирает CSR из словаря {(kind, id): (u, v, weight)}"""
+        vertex_count = len(self._node_ids)
+        degree = [0] * (vertex_count + 1)
+        for u, v, _ in edges.values():
+            degree[u] += 1
+            degree[v] += 1
+
+        offsets = array('q', [0]) * (vertex_count + 1)
+        for i in range(vertex_count):
+            offsets[i + 1] = offsets[i] + degree[i]
+
+        total = offsets[vertex_count]
+        targets = array('q', [0]) * total
+        weights = array('d', [0.0]) * total
+        edge_ids = array('q', [0]) * total
+        edge_kinds = [None] * total
+        cursor = list(offsets[:vertex_count])
+        for (kind, edge_id), (u, v, weight) in edges.items():
+            for a, b in ((u, v), (v, u)):
+                pos = cursor[a]
+                targets[pos] = b
+                weights[pos] = weight
+                edge_ids[pos] = edge_id
+                edge_kinds[pos] = kind
+                cursor[a] += 1
+
+        self._offsets = offsets
+        self._targets = targets
+        self._weights = weights
+        self._edge_ids = edge_ids
+        self._edge_kinds = edge_kinds
+        self._removed = set()
+        self._extra = {}
+
+    def load(self, session):
+        """Загружает граф из БД (маршруты и связи)"""
+        with self._lock:
+            self._reset()
+            self.loaded = False
+            edges = {}
+            for kind, sql in ((EDGE_VOLS, VOLS_EDGES_SQL), (EDGE_LINK, LINK_EDGES_SQL)):
+                result = session.execute(sql.execution_options(yield_per=LOAD_BATCH_SIZE))
+                for edge_id, start_id, end_id, weight in result:
+                    edges[(kind, edge_id)] = (self._vertex(start_id), self._vertex(end_id), float(weight))
+            self._edges = edges
+            self._build(edges)
+            self.loaded = True
+            self._loaded_at = time.monotonic()
+            logger.info(f'Граф сети загружен: {len(self._node_ids)} узлов, {len(edges)} ребер')
+
+    def reset(self):
+        """Сбрасывает граф: он будет заново загружен при следующем запросе"""
+        with self._lock:
+            self._reset()
+            self.loaded = False
+
+    def ensure_loaded(self, session):
+        """Загружает граф, если он не загружен или старше TTL"""
+        if not self.loaded or (self.ttl and time.monotonic() - self._loaded_at > self.ttl):
+            self.load(session)
+
+    def compact(self):
+        """Переносит overlay в CSR"""
+        with self._lock:
+            self._build(self._edges)
+
+    # ---- инкрементальные изменения ----
+
+    def upsert_edge(self, kind, edge_id, start_id, end_id, weight):
+        """Добавляет или обновляет ребро после записи в БД"""
+        with self._lock:
+            if not self.loaded:
+                return
+            key = (kind, edge_id)
+            self._drop(key)
+            if start_id is None or end_id is None:
+                return
+            u, v = self._vertex(start_id), self._vertex(end_id)
+            self._edges[key] = (u, v, float(weight or 0))
+            self._extra.setdefault(u, []).append(key)
+            self._extra.setdefault(v, []).append(key)
+            self._maybe_compact()
+
+    def remove_edge(self, kind, edge_id):
+        """Удаляет ребро после удаления записи в БД"""
+        with self._lock:
+            if not self.loaded:
+                return
+            self._drop((kind, edge_id))
+            self._maybe_compact()
+
+    def _drop(self, key):
+        old = self._edges.pop(key, None)
+        if old is None:
+            return
+        # Ребро могло быть и в CSR, и в overlay
+        self._removed.add(key)
+        u, v, _ = old
+        for vertex in (u, v):
+            keys = self._extra.get(vertex)
+            if keys and key in keys:
+                keys.remove(key)
+
+    def _maybe_compact(self):
+        pending = len(self._removed) + sum(len(keys) for keys in self._extra.values()) // 2
+        if pending >= max(COMPACT_MIN_EDGES, len(self._edges) * COMPACT_RATIO):
+            self.compact()
+
+    def _neighbours(self, u):
+        """Соседи вершины: (v, weight, kind, edge_id)"""
+        removed = self._removed
+        if u + 1 < len(self._offsets):
+            for pos in range(self._offsets[u], self._offsets[u + 1]):
+                kind, edge_id = self._edge_kinds[pos], self._edge_ids[pos]
+                if removed and (kind, edge_id) in removed:
+                    continue
+                yield self._targets[pos], self._weights[pos], kind, edge_id
+        for key in self._extra.get(u, ()):
+            a, b, weight = self._edges[key]
+            yield (b if a == u else a), weight, key[0], key[1]
+
+    # ---- запросы ----
+
+    def shortest_path(self, from_id, to_id):
+        """Кратчайший путь по длине (Дейкстра)
+
+        Возвращает dict с length_km, списком узлов и ребер или None,
+        если пути нет.
+        """
+        with self._lock:
+            source = self._index.get(from_id)
+            target = self._index.get(to_id)
+            if source is None or target is None:
+                return None
+
+            dist = {source: 0.0}
+            prev = {}
+            heap = [(0.0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if u == target:
+                    break
+                if d > dist[u]:
+                    continue
+                for v, weight, kind, edge_id in self._neighbours(u):
+                    nd = d + weight
+                    if nd < dist.get(v, float('inf')):
+                        dist[v] = nd
+                        prev[v] = (u, kind, edge_id)
+                        heapq.heappush(heap, (nd, v))
+
+            if target not in dist:
+                return None
+
+            nodes = [to_id]
+            edges = []
+            u = target
+            while u != source:
+                u, kind, edge_id = prev[u]
+                nodes.append(self._node_ids[u])
+                edges.append({'type': kind, 'id': edge_id})
+            nodes.reverse()
+            edges.reverse()
+            return {'length_km': round(dist[target], 3), 'nodes': nodes, 'edges': edges}
+
+    def reachable(self, from_id, max_hops=None):
+        """Узлы, достижимые из from_id (BFS), с числом переходов
+
+        max_hops ограничивает глубину (окрестность узла).
+        Возвращает список (node_id, hops) или None, если узла нет в графе.
+        """
+        with self._lock:
+            source = self._index.get(from_id)
+            if source is None:
+                return None
+            hops = {source: 0}
+            queue = deque([source])
+            while queue:
+                u = queue.popleft()
+                if max_hops is not None and hops[u] >= max_hops:
+                    continue
+                for v, _, _, _ in self._neighbours(u):
+                    if v not in hops:
+                        hops[v] = hops[u] + 1
+                        queue.append(v)
+            return [(self._node_ids[u], h) for u, h in hops.items()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'nodes': len(self._node_ids),
+                'edges': len(self._edges),
+                'pending_changes': len(self._removed) + sum(len(k) for k in self._extra.values()) // 2,
+            }
+
+
+def link_weight(session, fiber_id):
+    """Вес ребра связи: длина маршрута, по которому идет ее волокно"""
+    if fiber_id is None:
+        return 0.0
+    return float(session.execute(LINK_WEIGHT_SQL, {'fiber_id': fiber_id}).scalar() or 0)
+
+
+def route_link_edges(session, vols_id):
+    """Ребра связей, чей вес - длина маршрута vols_id: (id, start, end, weight)"""
+    return session.execute(ROUTE_LINK_EDGES_SQL, {'vols_id': vols_id}).all()
+
+
+def fiber_link_edges(session, fiber_id):
+    """Ребра связей по волокну fiber_id: (id, start, end, weight)"""
+    return session.execute(FIBER_LINK_EDGES_SQL, {'fiber_id': fiber_id}).all()
+
+
+network_graph = NetworkGraph()
@@ -0,0 +1,201 @@
+"""In-process индекс занятости портов и емкости по узлам
+
+Для каждого узла хранится карта занятых портов {порт: (id связи, сторона)}
+и суммарная емкость оканчивающихся на нем связей по статусам. Индекс
+загружается из links один раз и дальше обновляется инкрементально после
+записи связи, поэтому ответы по узлу строятся за O(портов узла) без
+обращения к БД.
+
+Как и граф сети, индекс живет в памяти процесса: пакетная загрузка и
+импорт сбрасывают его, и он перечитывается при следующем запросе, а
+записи из других процессов и напрямую в БД подхватываются перезагрузкой
+по TTL (vols_gis.ports_ttl). Проверку conflicts и запись связи
+выполняют под блокировкой индекса (locked), поэтому параллельные запросы
+процесса не займут один порт дважды. Ограничения в БД нет.
+"""
+import threading
+import time
+import logging
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SIDE_START = 'start'
+SIDE_END = 'end'
+
+LOAD_BATCH_SIZE = 10000
+
+LINK_PORTS_SQL = text("""
+    SELECT id, start_node_id, start_port, end_node_id, end_port,
+           COALESCE(capacity_gbps, 0), status
+    FROM links
+""")
+
+
+class NodePorts:
+    """Порты и емкость одного узла"""
+
+    __slots__ = ('ports', 'capacity')
+
+    def __init__(self):
+        # порт -> (id связи, сторона)
+        self.ports = {}
+        # статус -> [число связей, Гбит/с]
+        self.capacity = {}
+
+
+class PortIndex:
+    """Занятые порты и емкость по узлам"""
+
+    def __init__(self, ttl=300):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.ttl = ttl
+        self._loaded_at = 0
+        self._reset()
+
+    def _reset(self):
+        self._nodes = {}
+        # id связи -> (start_node_id, start_port, end_node_id, end_port, capacity, status)
+        self._links = {}
+
+    def load(self, session):
+        """Загружает индекс из БД"""
+        with self._lock:
+            self._reset()
+            result = session.execute(LINK_PORTS_SQL.execution_options(yield_per=LOAD_BATCH_SIZE))
+            for link_id, start_id, start_port, end_id, end_port, capacity, status in result:
+                self._add(link_id, (start_id, start_port, end_id, end_port, float(capacity), status))
+            self.loaded = True
+            self._loaded_at = time.monotonic()
+            logger.info(f'Индекс портов загружен: {len(self._nodes)} узлов, {len(self._links)} связей')
+
+    def reset(self):
+        """Сбрасывает индекс: он будет заново загружен при следующем запросе"""
+        with self._lock:
+            self._reset()
+            self.loaded = False
+
+    def ensure_loaded(self, session):
+        """Загружает индекс, если он не загружен или старше TTL"""
+        if not self.loaded or (self.ttl and time.monotonic() - self._loaded_at > self.ttl):
+            self.load(session)
+
+    def locked(self):
+        """Блокировка индекса на время проверки портов и записи связи"""
+        return self._lock
+
+    # ---- инкрементальные изменения ----
+
+    def _endpoints(self, entry):
+        start_id, start_port, end_id, end_port, _, _ = entry
+        return ((start_id, start_port, SIDE_START), (end_id, end_port, SIDE_END))
+
+    def _add(self, link_id, entry):
+        self._links[link_id] = entry
+        capacity, status = entry[4], entry[5] or 'unknown'
+        for node_id, port, side in self._endpoints(entry):
+            if node_id is None:
+                continue
+            node = self._nodes.get(node_id)
+            if node is None:
+                node = self._nodes[node_id] = NodePorts()
+            if port is not None:
+                node.ports[port] = (link_id, side)
+            totals = node.capacity.setdefault(status, [0, 0.0])
+            totals[0] += 1
+            totals[1] += capacity
+
+    def _drop(self, link_id):
+        entry = self._links.pop(link_id, None)
+        if entry is None:
+            return
+        capacity, status = entry[4], entry[5] or 'unknown'
+        for node_id, port, side in self._endpoints(entry):
+            node = self._nodes.get(node_id)
+            if node is None:
+                continue
+            if port is not None and node.ports.get(port) == (link_id, side):
+                del node.ports[port]
+            totals = node.capacity.get(status)
+            if totals is not None:
+                totals[0] -= 1
+                totals[1] -= capacity
+                if totals[0] <= 0:
+                    del node.capacity[status]
+            if not node.ports and not node.capacity:
+                del self._nodes[node_id]
+
+    def upsert_link(self, link):
+        """Добавляет или обновляет связь после записи в БД"""
+        with self._lock:
+            if not self.loaded:
+                return
+            self._drop(link.id)
+            self._add(link.id, (
+                link.start_node_id, link.start_port, link.end_node_id, link.end_port,
+                float(link.capacity_gbps or 0), link.status,
+            ))
+
+    def remove_link(self, link_id):
+        with self._lock:
+            if self.loaded:
+                self._drop(link_id)
+
+    # ---- запросы ----
+
+    def conflicts(self, start_node_id, start_port, end_node_id, end_port, exclude_link_id=None):
+        """Занятые другими связями порты среди концов новой связи
+
+        Возвращает список {'node_id', 'port', 'link_id', 'side'}.
+        """
+        result = []
+        requested = [(start_node_id, start_port), (end_node_id, end_port)]
+        with self._lock:
+            for node_id, port in requested:
+                if node_id is None or port is None:
+                    continue
+                node = self._nodes.get(node_id)
+                occupied = node.ports.get(port) if node is not None else None
+                if occupied is not None and occupied[0] != exclude_link_id:
+                    result.append({'node_id': node_id, 'port': port, 'link_id': occupied[0], 'side': occupied[1]})
+        if start_port is not None and (start_node_id, start_port) == (end_node_id, end_port):
+            # Оба конца связи в один и тот же порт
+            result.append({'node_id': start_node_id, 'port': start_port, 'link_id': None, 'side': SIDE_END})
+        return result
+
+    def ports(self, node_id):
+        """Занятые порты узла по возрастанию номера"""
+        with self._lock:
+            node = self._nodes.get(node_id)
+            if node is None:
+                return []
+            return [
+                {'port': port, 'link_id': link_id, 'side': side}
+                for port, (link_id, side) in sorted(node.ports.items())
+            ]
+
+    def capacity(self, node_id):
+        """Число связей и суммарная емкость (Гбит/с) на узле по статусам"""
+        with self._lock:
+            node = self._nodes.get(node_id)
+            by_status = {
+                status: {'links': count, 'capacity_gbps': round(gbps, 2)}
+                for status, (count, gbps) in (node.capacity.items() if node is not None else ())
+            }
+        return {
+            'links': sum(item['links'] for item in by_status.values()),
+            'capacity_gbps': round(sum(item['capacity_gbps'] for item in by_status.values()), 2),
+            'by_status': by_status,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'nodes': len(self._nodes),
+                'links': len(self._links),
+            }
+
+
+port_index = PortIndex()
@@ -0,0 +1,12 @@
+"""Импорт файлов GeoJSON, GeoPackage и Shapefile в фоновых задачах"""
+from .readers import ImportFormatError, detect_format, open_reader
+from .jobs import ImportJob, ImportManager, import_manager
+
+__all__ = [
+    'ImportFormatError',
+    'detect_format',
+    'open_reader',
+    'ImportJob',
+    'ImportManager',
+    'import_manager',
+]
@@ -0,0 +1,250 @@
+"""Фоновые задачи импорта файлов
+
+Загруженный файл сохраняется во временный каталог, а разбор и запись
+выполняет пул рабочих потоков. Объекты пишутся пачками по
+IMPORT_CHUNK_SIZE, каждая пачка - отдельная транзакция, поэтому прогресс
+виден сразу, а память не зависит от размера файла. Некорректные объекты
+пропускаются и попадают в список ошибок задачи.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..graph import network_graph, port_index
+from ..utils.bulk import BULK_MODELS, MAX_REPORTED_ERRORS, iter_batches, validate_batch, insert_rows
+from ..utils.spatial import SRID
+from ..utils.versions import bump_version
+from .readers import open_reader
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Целевая модель по типу геометрии объекта
+GEOMETRY_MODELS = {
+    'Point': 'nodes',
+    'LineString': 'vols',
+}
+
+# Поля схем, которые заполняются из геометрии, а не из атрибутов
+GEOMETRY_FIELDS = ('lat', 'lon', 'path')
+
+REPROJECT_SQL = text("""
+    SELECT ST_AsGeoJSON(ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(g), :srid), 4326))
+    FROM unnest(CAST(:geometries AS text[])) WITH ORDINALITY AS t(g, n)
+    ORDER BY n
+""")
+
+
+def reproject(session, geometries, srid):
+    """Перепроецирует GeoJSON геометрии в EPSG:4326 средствами PostGIS"""
+    if srid == SRID:
+        return geometries
+    indexes = [i for i, geometry in enumerate(geometries) if geometry is not None]
+    if not indexes:
+        return geometries
+    source = [json.dumps(geometries[i]) for i in indexes]
+    result = list(geometries)
+    for i, geojson in zip(indexes, session.execute(REPROJECT_SQL, {'srid': srid, 'geometries': source}).scalars()):
+        result[i] = json.loads(geojson)
+    return result
+
+
+def map_attributes(bulk_model, properties, mapping=None):
+    """Атрибуты файла -> поля схемы
+
+    mapping - {поле схемы: атрибут файла}; остальные атрибуты сопоставляются
+    с полями по имени без учета регистра, несопоставленные попадают в meta_data.
+    """
+    fields = {name.lower(): name for name in bulk_model.schema.model_fields
+              if name not in GEOMETRY_FIELDS and name != 'meta_data'}
+    sources = {source: target for target, source in (mapping or {}).items()}
+    item, extra = {}, {}
+    for key, value in properties.items():
+        target = sources.get(key) or fields.get(key.lower())
+        if target is not None:
+            item[target] = value
+        elif value is not None:
+            extra[key] = value
+    if extra:
+        item['meta_data'] = extra
+    return item
+
+
+class ImportJob:
+    """Состояние одной задачи импорта"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, path, file_format, filename=None, model=None, srid=None, layer=None, mapping=None):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.format = file_format
+        self.filename = filename
+        self.model = model
+        self.srid = srid
+        self.layer = layer
+        self.mapping = mapping
+        self.status = self.QUEUED
+        self.total = None
+        self.read = 0
+        self.inserted = {}
+        self.error_count = 0
+        self.errors = []
+        self.message = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def add_errors(self, errors):
+        self.error_count += len(errors)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'format': self.format,
+            'filename': self.filename,
+            'model': self.model,
+            'srid': self.srid,
+            'total': self.total,
+            'read': self.read,
+            'inserted': dict(self.inserted),
+            'error_count': self.error_count,
+            'errors': list(self.errors),
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ImportManager:
+    """Очередь задач импорта и пул рабочих потоков"""
+
+    def __init__(self, max_workers=2, max_jobs=100, directory=None):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.directory = directory
+        self.engine = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def configure(self, settings, engine):
+        self.max_workers = int(settings.get('vols_gis.import_workers', self.max_workers))
+        self.directory = settings.get('vols_gis.import_dir') or None
+        self.engine = engine
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='import')
+            return self._executor
+
+    def create_upload_file(self, suffix=''):
+        """Временный файл для загрузки (удаляется после импорта)"""
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(prefix='import-', suffix=suffix, dir=self.directory, delete=False)
+
+    def submit(self, job):
+        with self._lock:
+            self._jobs[job.id] = job
+            # Храним только последние max_jobs задач
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in (ImportJob.QUEUED, ImportJob.RUNNING):
+                    break
+                self._jobs.popitem(last=False)
+        self._get_executor().submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def _run(self, job):
+        job.status = ImportJob.RUNNING
+        job.started_at = time.time()
+        session = Session(bind=self.engine)
+        try:
+            reader = open_reader(job.path, job.format, job.srid, job.layer)
+            job.srid = reader.srid
+            for chunk in iter_batches(reader.features(), IMPORT_CHUNK_SIZE):
+                job.total = reader.total
+                self._load_chunk(session, job, chunk)
+                job.read += len(chunk)
+            job.status = ImportJob.DONE
+            logger.info(f'Импорт {job.id} завершен: прочитано {job.read}, записано {job.inserted}, '
+                        f'ошибок {job.error_count}')
+        except Exception as e:
+            session.rollback()
+            job.status = ImportJob.FAILED
+            job.message = str(e)
+            logger.error(f'Ошибка импорта {job.id}: {e}')
+            logger.error(traceback.format_exc())
+        finally:
+            session.close()
+            job.finished_at = time.time()
+            if job.inserted.get('vols') or job.inserted.get('links'):
+                network_graph.reset()
+            if job.inserted.get('links'):
+                port_index.reset()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+
+    def _load_chunk(self, session, job, chunk):
+        geometries = reproject(session, [geometry for _, geometry in chunk], job.srid)
+
+        # Раскладываем объекты по целевым моделям
+        groups = {}
+        errors = []
+        for offset, ((properties, _), geometry) in enumerate(zip(chunk, geometries)):
+            index = job.read + offset
+            geometry_type = geometry.get('type') if geometry else None
+            table = job.model or GEOMETRY_MODELS.get(geometry_type)
+            if table is None:
+                errors.append({'index': index, 'errors': [
+                    {'loc': ['geometry'], 'msg': f'Тип геометрии {geometry_type} не поддерживается'}
+                ]})
+                continue
+            bulk_model = BULK_MODELS[table]
+            item = map_attributes(bulk_model, properties, job.mapping)
+            item = bulk_model.from_feature(item, geometry)
+            indexes, items = groups.setdefault(table, ([], []))
+            indexes.append(index)
+            items.append(item)
+
+        for table, (indexes, items) in groups.items():
+            rows, batch_errors = validate_batch(BULK_MODELS[table], items)
+            for error in batch_errors:
+                error['index'] = indexes[error['index']]
+            errors.extend(batch_errors)
+            ids = insert_rows(session, BULK_MODELS[table], rows)
+            session.commit()
+            if ids:
+                job.inserted[table] = job.inserted.get(table, 0) + len(ids)
+                bump_version(table)
+        job.add_errors(sorted(errors, key=lambda error: error['index']))
+
+
+import_manager = ImportManager()
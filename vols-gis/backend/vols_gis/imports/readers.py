@@ -0,0 +1,407 @@
+"""Потоковое чтение объектов из GeoJSON, GeoPackage и Shapefile (zip)
+
+Каждый reader отдает объекты как (properties, geometry), где geometry -
+словарь GeoJSON геометрии в исходной системе координат (reader.srid)
+или None. Файлы читаются по одному объекту, целиком в память не грузятся.
+"""
+import io
+import json
+import os
+import re
+import sqlite3
+import struct
+import zipfile
+
+from shapely import wkb
+from shapely.geometry import mapping
+
+from ..utils.spatial import SRID
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Максимальный размер одного объекта GeoJSON (символов): дальше объект
+# считается некорректным, а не недочитанным
+MAX_FEATURE_SIZE = 64 * 1024 * 1024
+
+_EPSG_RE = re.compile(r'EPSG:+(\d+)', re.IGNORECASE)
+_AUTHORITY_RE = re.compile(r'AUTHORITY\["EPSG",\s*"(\d+)"\]', re.IGNORECASE)
+
+
+class ImportFormatError(ValueError):
+    """Файл не удается прочитать в заявленном формате"""
+
+
+def detect_format(path, filename=None):
+    """Формат файла по расширению имени или по сигнатуре"""
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
+        if ext in ('.geojson', '.json'):
+            return 'geojson'
+        if ext == '.gpkg':
+            return 'gpkg'
+        if ext == '.zip':
+            return 'shp'
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    if head.startswith(b'SQLite format 3'):
+        return 'gpkg'
+    if head.startswith(b'PK'):
+        return 'shp'
+    return 'geojson'
+
+
+# ---- GeoJSON ----
+
+_DOCUMENT_ARRAY_RE = re.compile(r'"(?:features|items)"\s*:\s*\[')
+
+
+def iter_json_array(f, buf, pos):
+    """Элементы JSON массива по одному
+
+    buf[pos:] - текст сразу после открывающей '[', остальное дочитывается
+    из f кусками READ_CHUNK_SIZE. Элементы разбираются через
+    JSONDecoder.raw_decode, в памяти держится только текущий (не больше
+    MAX_FEATURE_SIZE). Разобранная часть буфера отбрасывается, когда позиция
+    уходит дальше READ_CHUNK_SIZE, а не после каждого элемента.
+    """
+    decoder = json.JSONDecoder()
+    while True:
+        # Пропускаем пробелы и запятые между элементами
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                break
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise ImportFormatError('Неожиданный конец файла в массиве объектов')
+            buf, pos = chunk, 0
+        if buf[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Объект не дочитан (или некорректен): добавляем следующий кусок
+            if len(buf) - pos > MAX_FEATURE_SIZE:
+                raise ImportFormatError(
+                    f'Некорректный JSON или объект больше {MAX_FEATURE_SIZE} символов')
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise ImportFormatError(f'Некорректный JSON около позиции {pos}')
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        pos = end
+        if pos > READ_CHUNK_SIZE:
+            buf, pos = buf[pos:], 0
+        yield item
+
+
+def iter_json_document(stream):
+    """Объекты JSON документа потоком: FeatureCollection, массив или {"items": [...]}
+
+    Документ целиком в память не читается: ищется начало массива (корень,
+    features или items), дальше элементы идут через iter_json_array.
+    """
+    buf = ''
+    while True:
+        stripped = buf.lstrip('\ufeff \t\r\n')
+        if stripped.startswith('['):
+            yield from iter_json_array(stream, buf, len(buf) - len(stripped) + 1)
+            return
+        if stripped:
+            match = _DOCUMENT_ARRAY_RE.search(buf)
+            if match:
+                yield from iter_json_array(stream, buf, match.end())
+                return
+            if len(buf) > MAX_FEATURE_SIZE:
+                break
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buf += chunk
+    raise ImportFormatError('Ожидается FeatureCollection, массив объектов или {"items": [...]}')
+
+
+class GeoJSONReader:
+    """Потоковый разбор FeatureCollection
+
+    Массив features разбирается по одному объекту (iter_json_array).
+    CRS берется из члена crs (если он идет до features), иначе EPSG:4326.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.srid = SRID
+        self.total = None
+
+    def features(self):
+        with open(self.path, 'r', encoding='utf-8-sig') as f:
+            buf = ''
+            # Ищем начало массива features, попутно читая crs
+            while True:
+                match = re.search(r'"features"\s*:\s*\[', buf)
+                if match:
+                    break
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    # Не FeatureCollection: одиночный Feature или геометрия
+                    yield from self._single(json.loads(buf))
+                    return
+                buf += chunk
+            self._read_crs(buf[:match.start()])
+            for feature in iter_json_array(f, buf, match.end()):
+                yield dict(feature.get('properties') or {}), feature.get('geometry')
+
+    def _read_crs(self, header):
+        match = re.search(r'"crs"\s*:\s*\{.*?"name"\s*:\s*"([^"]+)"', header, re.DOTALL)
+        if not match:
+            return
+        name = match.group(1)
+        epsg = _EPSG_RE.search(name)
+        if epsg:
+            self.srid = int(epsg.group(1))
+        elif 'CRS84' in name:
+            self.srid = SRID
+
+    def _single(self, data):
+        if data.get('type') == 'Feature':
+            yield dict(data.get('properties') or {}), data.get('geometry')
+        elif data.get('type'):
+            yield {}, data
+
+
+# ---- GeoPackage ----
+
+# Размер envelope в заголовке GeoPackage геометрии по индикатору из флагов
+_GPKG_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+def gpkg_geometry(blob):
+    """GeoPackage binary (заголовок GP + WKB) -> GeoJSON геометрия"""
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    if blob[:2] != b'GP':
+        raise ImportFormatError('Некорректная геометрия GeoPackage')
+    flags = blob[3]
+    if flags & 0x10:
+        # Пустая геометрия
+        return None
+    envelope = _GPKG_ENVELOPE_SIZES.get((flags >> 1) & 0x07)
+    if envelope is None:
+        raise ImportFormatError('Некорректный заголовок геометрии GeoPackage')
+    return mapping(wkb.loads(blob[8 + envelope:]))
+
+
+class GeoPackageReader:
+    """Слой объектов GeoPackage (SQLite)
+
+    SRID - код EPSG системы координат слоя. srs_id 0 и -1 (в GeoPackage -
+    "не определена") заменяются параметром srid или EPSG:4326; систему не
+    из EPSG без параметра srid импорт не принимает.
+    """
+
+    def __init__(self, path, layer=None, srid=None):
+        self.path = path
+        self._conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            query = "SELECT table_name FROM gpkg_contents WHERE data_type = 'features'"
+            tables = [row[0] for row in self._conn.execute(query)]
+        except sqlite3.DatabaseError as e:
+            raise ImportFormatError(f'Файл не является GeoPackage: {e}')
+        if layer is None:
+            if not tables:
+                raise ImportFormatError('В GeoPackage нет слоев объектов')
+            layer = tables[0]
+        elif layer not in tables:
+            raise ImportFormatError(f'Слой {layer} не найден, доступны: {", ".join(tables)}')
+        self.layer = layer
+
+        self.geometry_column, srs_id = self._conn.execute(
+            'SELECT column_name, srs_id FROM gpkg_geometry_columns WHERE table_name = ?', (layer,)
+        ).fetchone()
+        try:
+            self.srid = srid if srid is not None else self._layer_srid(srs_id)
+        except ImportFormatError:
+            self._conn.close()
+            raise
+        self.total = self._conn.execute(f'SELECT COUNT(*) FROM "{layer}"').fetchone()[0]
+
+    def _layer_srid(self, srs_id):
+        if srs_id in (0, -1):
+            return SRID
+        row = self._conn.execute(
+            'SELECT organization, organization_coordsys_id FROM gpkg_spatial_ref_sys WHERE srs_id = ?',
+            (srs_id,)
+        ).fetchone()
+        if row is None:
+            raise ImportFormatError(f'Система координат {srs_id} слоя {self.layer} не описана в GeoPackage')
+        organization, coordsys_id = row
+        if (organization or '').upper() != 'EPSG' or coordsys_id is None or coordsys_id <= 0:
+            raise ImportFormatError(
+                f'Система координат слоя {self.layer} не из EPSG ({organization}:{coordsys_id}), '
+                f'укажите параметр srid')
+        return coordsys_id
+
+    def features(self):
+        try:
+            cursor = self._conn.execute(f'SELECT * FROM "{self.layer}"')
+            columns = [description[0] for description in cursor.description]
+            for values in cursor:
+                properties = dict(zip(columns, values))
+                geometry = gpkg_geometry(properties.pop(self.geometry_column))
+                properties.pop('fid', None)
+                yield properties, geometry
+        finally:
+            self._conn.close()
+
+
+# ---- Shapefile ----
+
+SHP_NULL = 0
+SHP_POINT_TYPES = (1, 11, 21)
+SHP_POLYLINE_TYPES = (3, 13, 23)
+
+
+def shp_geometry(content):
+    """Запись .shp -> GeoJSON геометрия (точки и линии)"""
+    shape_type = struct.unpack('<i', content[:4])[0]
+    if shape_type == SHP_NULL:
+        return None
+    if shape_type in SHP_POINT_TYPES:
+        x, y = struct.unpack('<2d', content[4:20])
+        return {'type': 'Point', 'coordinates': [x, y]}
+    if shape_type in SHP_POLYLINE_TYPES:
+        num_parts, num_points = struct.unpack('<2i', content[36:44])
+        parts = list(struct.unpack(f'<{num_parts}i', content[44:44 + 4 * num_parts]))
+        offset = 44 + 4 * num_parts
+        flat = struct.unpack(f'<{2 * num_points}d', content[offset:offset + 16 * num_points])
+        points = [[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)]
+        lines = [points[start:end] for start, end in zip(parts, parts[1:] + [num_points])]
+        if len(lines) == 1:
+            return {'type': 'LineString', 'coordinates': lines[0]}
+        return {'type': 'MultiLineString', 'coordinates': lines}
+    raise ImportFormatError(f'Тип геометрии Shapefile {shape_type} не поддерживается')
+
+
+def prj_to_srid(wkt):
+    """EPSG код по .prj (WKT): AUTHORITY верхнего уровня или известные системы"""
+    authorities = _AUTHORITY_RE.findall(wkt)
+    if authorities:
+        # AUTHORITY всей системы координат идет последним
+        return int(authorities[-1])
+    if re.search(r'Mercator_Auxiliary_Sphere|Pseudo[-_ ]Mercator|Web_Mercator', wkt, re.IGNORECASE):
+        return 3857
+    if wkt.lstrip().upper().startswith('GEOGCS') and re.search(r'WGS[_ ]?(19)?84', wkt, re.IGNORECASE):
+        return SRID
+    return None
+
+
+class ShapefileReader:
+    """Zip архив с Shapefile (.shp + .dbf, опционально .prj и .cpg)"""
+
+    def __init__(self, path, srid=None):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        names = {name.lower(): name for name in self._zip.namelist()}
+        shp = [name for name in names if name.endswith('.shp')]
+        if not shp:
+            self._zip.close()
+            raise ImportFormatError('В архиве нет .shp файла')
+        stem = shp[0][:-4]
+        self._shp = names[shp[0]]
+        self._dbf = names.get(stem + '.dbf')
+        if self._dbf is None:
+            self._zip.close()
+            raise ImportFormatError('В архиве нет .dbf файла')
+
+        self.encoding = 'utf-8'
+        if stem + '.cpg' in names:
+            encoding = self._zip.read(names[stem + '.cpg']).decode('ascii').strip()
+            # Кодовые страницы записываются номером: 1251 -> cp1251
+            self.encoding = f'cp{encoding}' if encoding.isdigit() else encoding or 'utf-8'
+
+        self.srid = srid
+        if self.srid is None and stem + '.prj' in names:
+            self.srid = prj_to_srid(self._zip.read(names[stem + '.prj']).decode('latin-1'))
+        if self.srid is None:
+            self._zip.close()
+            raise ImportFormatError('Не удалось определить систему координат по .prj, укажите параметр srid')
+        self.total = None
+
+    def _read_dbf_header(self, dbf):
+        header = dbf.read(32)
+        count, header_length, record_length = struct.unpack('<IHH', header[4:12])
+        fields = []
+        # Описания полей по 32 байта, затем терминатор 0x0D
+        for _ in range((header_length - 33) // 32):
+            descriptor = dbf.read(32)
+            if descriptor[0] == 0x0D:
+                dbf.read(header_length - 64 - 32 * len(fields))
+                return count, record_length, fields
+            name = descriptor[:11].split(b'\x00')[0].decode('latin-1')
+            fields.append((name, chr(descriptor[11]), descriptor[16]))
+        dbf.read(header_length - 32 - 32 * len(fields))
+        return count, record_length, fields
+
+    def _decode(self, raw):
+        try:
+            return raw.decode(self.encoding)
+        except (UnicodeDecodeError, LookupError):
+            # Русские Shapefile без .cpg обычно в cp1251
+            return raw.decode('cp1251', errors='replace')
+
+    def _parse_value(self, field_type, raw):
+        text = self._decode(raw).strip()
+        if field_type in ('N', 'F'):
+            if not text or text.startswith('*'):
+                return None
+            number = float(text)
+            return int(number) if number.is_integer() and '.' not in text else number
+        if field_type == 'L':
+            return text.upper() in ('Y', 'T') if text not in ('', '?') else None
+        if field_type == 'D':
+            return f'{text[:4]}-{text[4:6]}-{text[6:8]}' if len(text) == 8 else None
+        return text or None
+
+    def features(self):
+        try:
+            with self._zip.open(self._shp) as shp, self._zip.open(self._dbf) as dbf:
+                shp = io.BufferedReader(shp)
+                shp.read(100)
+                count, record_length, fields = self._read_dbf_header(dbf)
+                self.total = count
+                for _ in range(count):
+                    record = dbf.read(record_length)
+                    header = shp.read(8)
+                    if len(record) < record_length or len(header) < 8:
+                        raise ImportFormatError('Файлы .shp и .dbf не согласованы')
+                    content_length = struct.unpack('>2i', header)[1] * 2
+                    geometry = shp_geometry(shp.read(content_length))
+                    if record[:1] == b'*':
+                        # Удаленная запись
+                        continue
+                    properties = {}
+                    offset = 1
+                    for name, field_type, length in fields:
+                        properties[name] = self._parse_value(field_type, record[offset:offset + length])
+                        offset += length
+                    yield properties, geometry
+        finally:
+            self._zip.close()
+
+
+def open_reader(path, file_format, srid=None, layer=None):
+    """Reader для файла; srid переопределяет систему координат файла"""
+    if file_format == 'geojson':
+        reader = GeoJSONReader(path)
+    elif file_format == 'gpkg':
+        reader = GeoPackageReader(path, layer, srid)
+    elif file_format == 'shp':
+        reader = ShapefileReader(path, srid)
+    else:
+        raise ImportFormatError(f'Неизвестный формат {file_format}')
+    if srid is not None:
+        reader.srid = srid
+    return reader
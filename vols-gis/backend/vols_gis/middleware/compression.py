@@ -0,0 +1,193 @@
+"""Tween для сжатия ответов (brotli / gzip)
+
+Кодировка выбирается по Accept-Encoding: br (если установлен пакет brotli),
+затем gzip. Ответы с известной длиной меньше min_size не сжимаются.
+Потоковые ответы (app_iter генератор, например выгрузки) сжимаются
+по мере отдачи, не собирая тело в памяти.
+
+Сжатые потоковые ответы с ETag (выгрузки) кешируются: пока таблица не
+изменилась и ETag тот же, повторный запрос отдается из кеша без
+обращения к БД и без повторного сжатия.
+"""
+from collections import OrderedDict
+import threading
+import zlib
+import logging
+
+from pyramid.settings import asbool
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/geo+json',
+    'application/x-msgpack',
+    'application/vnd.mapbox-vector-tile',
+    'application/javascript',
+    'image/svg+xml',
+)
+
+
+def is_compressible(content_type):
+    if not content_type:
+        return False
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits=31 - формат gzip (заголовок и CRC)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressedCache:
+    """LRU кеш сжатых потоковых ответов по (ETag, кодировка)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class CompressionSettings:
+    def __init__(self, settings):
+        self.enabled = asbool(settings.get('vols_gis.compression.enabled', True))
+        self.min_size = int(settings.get('vols_gis.compression.min_size', 1024))
+        self.gzip_level = int(settings.get('vols_gis.compression.gzip_level', 6))
+        self.brotli_quality = int(settings.get('vols_gis.compression.brotli_quality', 5))
+        self.cache = CompressedCache(
+            max_bytes=int(settings.get('vols_gis.compression.cache_bytes', 64 * 1024 * 1024))
+        )
+
+    def choose_encoding(self, request):
+        # Без Accept-Encoding формально подходит любая кодировка, но не сжимаем
+        if 'Accept-Encoding' not in request.headers:
+            return None
+        offers = ['br', 'gzip'] if brotli is not None else ['gzip']
+        accepted = request.accept_encoding.acceptable_offers(offers)
+        return accepted[0][0] if accepted else None
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+
+def iter_compressed(app_iter, compressor, on_complete=None):
+    """Сжимает app_iter по мере чтения; on_complete(body) - после полной отдачи"""
+    parts = [] if on_complete is not None else None
+    try:
+        for chunk in app_iter:
+            data = compressor.compress(chunk)
+            if data:
+                if parts is not None:
+                    parts.append(data)
+                yield data
+        data = compressor.finish()
+        if parts is not None:
+            parts.append(data)
+        yield data
+    finally:
+        close = getattr(app_iter, 'close', None)
+        if close is not None:
+            close()
+    if parts is not None:
+        on_complete(b''.join(parts))
+
+
+def compression_tween_factory(handler, registry):
+    """Сжимает ответы по Accept-Encoding"""
+    config = CompressionSettings(registry.settings or {})
+    registry['compression_cache'] = config.cache
+
+    def compression_tween(request):
+        response = handler(request)
+        if not config.enabled or request.method == 'HEAD':
+            return response
+        if response.status_code != 200 or response.content_encoding \
+                or not is_compressible(response.content_type):
+            return response
+
+        encoding = config.choose_encoding(request)
+        response.vary = tuple(response.vary or ()) + ('Accept-Encoding',)
+        if encoding is None:
+            return response
+
+        streaming = not isinstance(response.app_iter, (list, tuple))
+        if not streaming:
+            body = response.body
+            if len(body) < config.min_size:
+                return response
+            compressor = config.compressor(encoding)
+            response.body = compressor.compress(body) + compressor.finish()
+            response.content_encoding = encoding
+            if response.etag:
+                response.etag = (response.etag, False)
+            return response
+
+        etag = response.etag
+        cache_key = (etag, encoding) if etag else None
+        if etag:
+            # Сжатое тело побайтово отличается: ETag становится слабым (как в nginx),
+            # If-None-Match с W/"..." по-прежнему дает 304
+            response.etag = (etag, False)
+        cached = config.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            # Тело уже сжато: исходный генератор (и запрос к БД) не запускается
+            close = getattr(response.app_iter, 'close', None)
+            if close is not None:
+                close()
+            response.app_iter = [cached]
+            response.content_length = len(cached)
+        else:
+            on_complete = (lambda body: config.cache.set(cache_key, body)) if cache_key else None
+            response.app_iter = iter_compressed(response.app_iter, config.compressor(encoding), on_complete)
+            response.content_length = None
+        response.content_encoding = encoding
+        return response
+
+    return compression_tween
@@ -1,4 +1,5 @@
 """Простой CORS middleware"""
+from pyramid.httpexceptions import HTTPForbidden
 from pyramid.response import Response
 
 
@@ -10,6 +11,9 @@ def cors_tween_factory(handler, registry):
         
         try:
             response = handler(request)
+        except HTTPForbidden:
+            # Отказ политики безопасности: 401/403 формирует forbidden view
+            response = request.invoke_exception_view(reraise=True)
         except Exception as e:
             # Если произошла ошибка, создаем JSON ответ
             logger.error(f'Ошибка в обработчике: {e}', exc_info=True)
@@ -38,11 +42,14 @@ def cors_tween_factory(handler, registry):
         if response:
             response.headers['Access-Control-Allow-Origin'] = '*'
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, If-None-Match'
+            response.headers['Access-Control-Expose-Headers'] = 'ETag'
             response.headers['Access-Control-Max-Age'] = '3600'
             
-            # Устанавливаем Content-Type для JSON ответов
-            if hasattr(response, 'content_type') and 'json' in response.content_type:
+            # Устанавливаем Content-Type для JSON ответов (у 304 тела и Content-Type нет)
+            if response.status_code == 304:
+                pass
+            elif hasattr(response, 'content_type') and 'json' in (response.content_type or ''):
                 response.headers['Content-Type'] = 'application/json'
             elif 'Content-Type' not in response.headers or 'text/html' in response.headers.get('Content-Type', ''):
                 # Если это HTML ошибка, заменяем на JSON
@@ -53,7 +60,7 @@ def cors_tween_factory(handler, registry):
             return Response(status=200, headers={
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization, If-None-Match'
             })
         
         return response
@@ -0,0 +1,192 @@
+"""Версионные миграции схемы БД
+
+Таблицы создаются Base.metadata.create_all (init_db.py) - это базовая
+схема. Дальнейшие изменения описываются модулями vXXXX_*.py и
+применяются по порядку версий. Примененные версии записываются в таблицу
+schema_migrations, поэтому повторный запуск выполняет только новые.
+
+Модуль миграции задает:
+- VERSION, DESCRIPTION;
+- UPGRADE и DOWNGRADE - списки SQL команд;
+- TRANSACTIONAL - False для команд, которые нельзя выполнять
+  в транзакции (CREATE INDEX CONCURRENTLY). Такие команды должны быть
+  идемпотентными (IF NOT EXISTS), т.к. при сбое их нельзя откатить;
+- INDEXES - (имя, определение) создаваемых индексов. Прерванный
+  CREATE INDEX CONCURRENTLY оставляет индекс INVALID, который IF NOT EXISTS
+  пропустил бы: перед upgrade такие индексы удаляются, а после него все
+  индексы миграции должны существовать и быть валидными - иначе версия
+  не записывается.
+
+Параллельный запуск из нескольких процессов исключается advisory lock.
+"""
+import logging
+
+from sqlalchemy import text
+
+from . import v0001_filter_indexes, v0002_search_indexes, v0003_meta_data_jsonb, v0004_nodes_geography_index
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = sorted([
+    v0001_filter_indexes,
+    v0002_search_indexes,
+    v0003_meta_data_jsonb,
+    v0004_nodes_geography_index,
+], key=lambda migration: migration.VERSION)
+
+# Ключ pg_advisory_lock для миграций
+MIGRATIONS_LOCK_ID = 0x564F4C53
+
+CREATE_TABLE_SQL = text("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT NOW()
+    )
+""")
+
+
+INDEX_STATE_SQL = text("""
+    SELECT c.relname, i.indisvalid
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relname = ANY(:names)
+""")
+
+
+class MigrationError(Exception):
+    """Ошибка применения миграции"""
+
+
+def _index_state(connection, names):
+    """{имя индекса: indisvalid} для существующих индексов из names"""
+    return dict(connection.execute(INDEX_STATE_SQL, {'names': list(names)}).all())
+
+
+def drop_invalid_indexes(connection, migration):
+    """Удаляет INVALID индексы миграции, оставшиеся от прерванной сборки"""
+    names = [name for name, _ in getattr(migration, 'INDEXES', ())]
+    if not names:
+        return
+    for name, valid in _index_state(connection, names).items():
+        if not valid:
+            logger.warning(f'Индекс {name} невалиден (прерванная сборка), пересоздается')
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+
+
+def check_indexes(connection, migration):
+    """MigrationError, если индекс миграции не создан или невалиден"""
+    names = [name for name, _ in getattr(migration, 'INDEXES', ())]
+    if not names:
+        return
+    state = _index_state(connection, names)
+    broken = [name for name in names if not state.get(name)]
+    if broken:
+        raise MigrationError(f'Индексы не созданы или невалидны: {", ".join(broken)}')
+
+
+def _connect(engine):
+    # Соединение для advisory lock и команд вне транзакции (CONCURRENTLY)
+    return engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+
+
+def applied_versions(connection):
+    """Множество примененных версий"""
+    connection.execute(CREATE_TABLE_SQL)
+    return set(connection.execute(text('SELECT version FROM schema_migrations')).scalars())
+
+
+def _run(engine, connection, migration, statements, record):
+    """Выполняет команды миграции и record(conn) - запись в schema_migrations"""
+    if migration.TRANSACTIONAL:
+        # Команды и запись о версии - одна транзакция
+        with engine.begin() as tx:
+            for statement in statements:
+                tx.execute(text(statement))
+            record(tx)
+    else:
+        for statement in statements:
+            connection.execute(text(statement))
+        with engine.begin() as tx:
+            record(tx)
+
+
+def status(engine):
+    """Список миграций с отметкой о применении"""
+    with _connect(engine) as connection:
+        applied = applied_versions(connection)
+    return [
+        {'version': m.VERSION, 'description': m.DESCRIPTION, 'applied': m.VERSION in applied}
+        for m in MIGRATIONS
+    ]
+
+
+def upgrade(engine, target=None):
+    """Применяет непримененные миграции до версии target (все, если None)
+
+    Возвращает список примененных версий.
+    """
+    done = []
+    with _connect(engine) as connection:
+        connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+        try:
+            applied = applied_versions(connection)
+            for migration in MIGRATIONS:
+                if migration.VERSION in applied or (target is not None and migration.VERSION > target):
+                    continue
+                logger.info(f'Миграция {migration.VERSION}: {migration.DESCRIPTION}')
+                
+                def record(tx):
+                    check_indexes(tx, migration)
+                    tx.execute(
+                        text('INSERT INTO schema_migrations (version, description) VALUES (:version, :description)'),
+                        {'version': migration.VERSION, 'description': migration.DESCRIPTION}
+                    )
+                
+                try:
+                    drop_invalid_indexes(connection, migration)
+                    _run(engine, connection, migration, migration.UPGRADE, record)
+                except Exception as e:
+                    raise MigrationError(f'Миграция {migration.VERSION} не применена: {e}') from e
+                done.append(migration.VERSION)
+        finally:
+            connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+    return done
+
+
+def downgrade(engine, target):
+    """Откатывает примененные миграции с версией больше target
+
+    Возвращает список откаченных версий.
+    """
+    done = []
+    with _connect(engine) as connection:
+        connection.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+        try:
+            applied = applied_versions(connection)
+            for migration in reversed(MIGRATIONS):
+                if migration.VERSION not in applied or migration.VERSION <= target:
+                    continue
+                logger.info(f'Откат миграции {migration.VERSION}: {migration.DESCRIPTION}')
+                try:
+                    _run(engine, connection, migration, migration.DOWNGRADE, lambda tx: tx.execute(
+                        text('DELETE FROM schema_migrations WHERE version = :version'),
+                        {'version': migration.VERSION}
+                    ))
+                except Exception as e:
+                    raise MigrationError(f'Миграция {migration.VERSION} не откачена: {e}') from e
+                done.append(migration.VERSION)
+        finally:
+            connection.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+    return done
+
+
+__all__ = [
+    'MIGRATIONS',
+    'MigrationError',
+    'applied_versions',
+    'status',
+    'upgrade',
+    'downgrade',
+]
@@ -0,0 +1,40 @@
+"""B-tree индексы колонок фильтров и trigram индексы для поиска по имени
+
+Составные индексы (колонка фильтра, id) обслуживают и фильтр, и keyset
+пагинацию списков (ORDER BY id LIMIT n). Индексы по внешним ключам нужны
+fibers_list, links_list, links_search, загрузке графа и удалению родителей.
+GIN индексы pg_trgm используются для name ILIKE '%...%'.
+"""
+
+VERSION = 1
+DESCRIPTION = 'Индексы фильтров (B-tree) и поиска по имени (pg_trgm)'
+
+# CREATE INDEX CONCURRENTLY не блокирует запись, но не выполняется в транзакции
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('idx_nodes_status', 'nodes (status, id)'),
+    ('idx_nodes_node_type', 'nodes (node_type, id)'),
+    ('idx_vols_status', 'vols (status, id)'),
+    ('idx_vols_start_node_id', 'vols (start_node_id)'),
+    ('idx_vols_end_node_id', 'vols (end_node_id)'),
+    ('idx_fibers_vols_id', 'fibers (vols_id, id)'),
+    ('idx_fibers_status', 'fibers (status, id)'),
+    ('idx_links_fiber_id', 'links (fiber_id, id)'),
+    ('idx_links_start_node_id', 'links (start_node_id, id)'),
+    ('idx_links_end_node_id', 'links (end_node_id, id)'),
+    ('idx_links_status', 'links (status, id)'),
+    ('idx_nodes_name_trgm', 'nodes USING GIN (name gin_trgm_ops)'),
+    ('idx_vols_name_trgm', 'vols USING GIN (name gin_trgm_ops)'),
+    ('idx_fibers_name_trgm', 'fibers USING GIN (name gin_trgm_ops)'),
+]
+
+UPGRADE = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}'
+    for name, definition in INDEXES
+] + [
+    # Планировщику нужна статистика, чтобы выбрать новые индексы
+    'ANALYZE nodes', 'ANALYZE vols', 'ANALYZE fibers', 'ANALYZE links',
+]
+
+DOWNGRADE = [f'DROP INDEX CONCURRENTLY IF EXISTS {name}' for name, _ in INDEXES]
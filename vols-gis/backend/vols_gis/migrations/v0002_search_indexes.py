@@ -0,0 +1,38 @@
+"""Trigram индексы для общего поиска /api/search
+
+Индексируется выражение "документа" объекта: имя, описание и выбранные
+ключи meta_data. Запрос поиска (views/search.py) использует те же
+выражения из DOCUMENTS - только при точном совпадении выражения
+планировщик выбирает индекс.
+"""
+
+VERSION = 2
+DESCRIPTION = 'Trigram индексы общего поиска по узлам, маршрутам и волокнам'
+
+TRANSACTIONAL = False
+
+# Ключи meta_data, по которым ищет /api/search
+META_KEYS = ('address', 'code', 'owner')
+
+
+def _meta(keys):
+    return " || ' ' || ".join(f"coalesce(meta_data ->> '{key}', '')" for key in keys)
+
+
+DOCUMENTS = {
+    'nodes': f"(name || ' ' || coalesce(description, '') || ' ' || {_meta(META_KEYS)})",
+    'vols': f"(name || ' ' || coalesce(description, '') || ' ' || {_meta(META_KEYS)})",
+    'fibers': f"(name || ' ' || coalesce(cable_type, '') || ' ' || {_meta(META_KEYS)})",
+}
+
+INDEXES = [
+    (f'idx_{table}_search_trgm', f'{table} USING GIN ({document} gin_trgm_ops)')
+    for table, document in DOCUMENTS.items()
+]
+
+UPGRADE = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}'
+    for name, definition in INDEXES
+] + ['ANALYZE nodes', 'ANALYZE vols', 'ANALYZE fibers']
+
+DOWNGRADE = [f'DROP INDEX CONCURRENTLY IF EXISTS {name}' for name, _ in INDEXES]
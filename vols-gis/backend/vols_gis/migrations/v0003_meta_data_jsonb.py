@@ -0,0 +1,53 @@
+"""meta_data как JSONB и GIN индексы jsonb_path_ops для фильтров meta.*
+
+init-db.sql создает JSONB колонки, а create_all до этой версии создавал
+json. Колонки json приводятся к jsonb (только если они еще json - иначе
+ALTER не нужен), затем строятся индексы для оператора @>.
+"""
+
+VERSION = 3
+DESCRIPTION = 'meta_data JSONB и GIN индексы jsonb_path_ops'
+
+TRANSACTIONAL = False
+
+JSONB_COLUMNS = [
+    ('nodes', 'meta_data'),
+    ('vols', 'meta_data'),
+    ('fibers', 'meta_data'),
+    ('links', 'meta_data'),
+    ('webmaps', 'visible_layers'),
+    ('webmaps', 'permissions'),
+]
+
+INDEXES = [
+    (f'idx_{table}_meta_data', f'{table} USING GIN (meta_data jsonb_path_ops)')
+    for table in ('nodes', 'vols', 'fibers', 'links')
+]
+
+# Один DO блок - одна транзакция для всех ALTER
+TO_JSONB_SQL = """
+DO $$
+DECLARE
+    col record;
+BEGIN
+    FOR col IN
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND data_type = 'json'
+          AND (table_name, column_name) IN ({columns})
+    LOOP
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE jsonb USING %I::jsonb',
+                       col.table_name, col.column_name, col.column_name);
+    END LOOP;
+END
+$$
+""".format(columns=', '.join(f"('{table}', '{column}')" for table, column in JSONB_COLUMNS))
+
+UPGRADE = [TO_JSONB_SQL] + [
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}'
+    for name, definition in INDEXES
+] + ['ANALYZE nodes', 'ANALYZE vols', 'ANALYZE fibers', 'ANALYZE links']
+
+# Тип колонок не возвращается: модели работают с JSONB
+DOWNGRADE = [f'DROP INDEX CONCURRENTLY IF EXISTS {name}' for name, _ in INDEXES]
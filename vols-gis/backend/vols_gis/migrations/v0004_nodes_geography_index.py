@@ -0,0 +1,23 @@
+"""GIST индекс по geography(geom) узлов для KNN в метрах
+
+/api/nodes/nearest сортирует по `geography(geom) <-> geography(point)`:
+расстояние по сфере, а не в градусах, поэтому вдали от экватора ближайшие
+узлы не теряются. Обход в порядке KNN возможен только по индексу того же
+выражения, что и в запросе (utils/spatial.geography).
+"""
+
+VERSION = 4
+DESCRIPTION = 'GIST индекс geography(geom) для KNN поиска узлов'
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('idx_nodes_geog', 'nodes USING GIST (geography(geom))'),
+]
+
+UPGRADE = [
+    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}'
+    for name, definition in INDEXES
+] + ['ANALYZE nodes']
+
+DOWNGRADE = [f'DROP INDEX CONCURRENTLY IF EXISTS {name}' for name, _ in INDEXES]
@@ -1,12 +1,13 @@
 """Модели данных"""
 from .nodes import Node
 from .vols import Vols
+from .vols_lod import VolsLod
 from .fibers import Fiber
 from .links import Link
 from .webmaps import WebMap
 from .users import User
 
-__all__ = ['Node', 'Vols', 'Fiber', 'Link', 'WebMap', 'User']
+__all__ = ['Node', 'Vols', 'VolsLod', 'Fiber', 'Link', 'WebMap', 'User']
 
 
 
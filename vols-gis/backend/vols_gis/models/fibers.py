@@ -1,5 +1,7 @@
 """Модель волокон"""
-from sqlalchemy import Column, String, Integer, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 
@@ -12,7 +14,10 @@ class Fiber(BaseModel):
     fiber_count = Column(Integer)  # количество волокон в пучке
     status = Column(String(50))  # 'active', 'spare', 'damaged'
     vols_id = Column(Integer, ForeignKey('vols.id'))
-    meta_data = Column(JSON)
+    meta_data = Column(JSONB)
+    
+    vols = relationship('Vols', back_populates='fibers')
+    links = relationship('Link', back_populates='fiber', order_by='Link.id', passive_deletes='all')
     
     def to_dict(self):
         """Преобразует объект в словарь"""
@@ -1,5 +1,7 @@
 """Модель связей"""
-from sqlalchemy import Column, Integer, Numeric, String, ForeignKey, JSON
+from sqlalchemy import Column, Integer, Numeric, String, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 
@@ -14,7 +16,11 @@ class Link(BaseModel):
     end_port = Column(Integer)  # номер порта на конце
     status = Column(String(50))  # 'active', 'spare', 'unused'
     capacity_gbps = Column(Numeric(10, 2))
-    meta_data = Column(JSON)
+    meta_data = Column(JSONB)
+    
+    fiber = relationship('Fiber', back_populates='links')
+    start_node = relationship('Node', foreign_keys=[start_node_id])
+    end_node = relationship('Node', foreign_keys=[end_node_id])
     
     def to_dict(self):
         """Преобразует объект в словарь"""
@@ -1,5 +1,7 @@
 """Модель узлов связи"""
-from sqlalchemy import Column, String, Text, JSON
+from sqlalchemy import Column, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import column_property
 from geoalchemy2 import Geometry
 from .base import BaseModel
 
@@ -13,7 +15,10 @@ class Node(BaseModel):
     node_type = Column(String(50))  # 'muft', 'cross', 'bsp', 'terminal'
     status = Column(String(50))  # 'active', 'inactive', 'maintenance'
     geom = Column(Geometry('POINT', srid=4326), nullable=False)
-    meta_data = Column(JSON)
+    meta_data = Column(JSONB)
+    # Координаты точки, вычисленные в SQL (загружаются только с undefer)
+    lat = column_property(func.ST_Y(geom), deferred=True)
+    lon = column_property(func.ST_X(geom), deferred=True)
     
     def to_dict(self):
         """Преобразует объект в словарь"""
@@ -1,5 +1,7 @@
 """Модель ВОЛС маршрутов"""
-from sqlalchemy import Column, String, Text, Integer, Numeric, ForeignKey, JSON
+from sqlalchemy import Column, String, Text, Integer, Numeric, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
 from .base import BaseModel
 
@@ -15,7 +17,13 @@ class Vols(BaseModel):
     path = Column(Geometry('LINESTRING', srid=4326), nullable=False)
     length_km = Column(Numeric(10, 2))
     status = Column(String(50))  # 'active', 'planning', 'under_construction'
-    meta_data = Column(JSON)
+    meta_data = Column(JSONB)
+    
+    start_node = relationship('Node', foreign_keys=[start_node_id])
+    end_node = relationship('Node', foreign_keys=[end_node_id])
+    # passive_deletes='all': удаление маршрута с волокнами по-прежнему
+    # отклоняется внешним ключом, а не обнуляет fibers.vols_id
+    fibers = relationship('Fiber', back_populates='vols', order_by='Fiber.id', passive_deletes='all')
     
     def to_dict(self):
         """Преобразует объект в словарь"""
@@ -0,0 +1,14 @@
+"""Модель упрощенных геометрий маршрутов (уровни детализации)"""
+from sqlalchemy import Column, Integer, ForeignKey
+from geoalchemy2 import Geometry
+from ..db import Base
+
+
+class VolsLod(Base):
+    """Упрощенный путь маршрута для диапазона zoom (см. utils/lod.py)"""
+    __tablename__ = 'vols_lod'
+    
+    vols_id = Column(Integer, ForeignKey('vols.id', ondelete='CASCADE'), primary_key=True)
+    band = Column(Integer, primary_key=True)  # максимальный zoom диапазона
+    path = Column(Geometry('LINESTRING', srid=4326), nullable=False)
+    npoints = Column(Integer)
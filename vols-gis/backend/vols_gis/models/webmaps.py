@@ -1,5 +1,6 @@
 """Модель веб-карт"""
-from sqlalchemy import Column, String, Text, Integer, JSON
+from sqlalchemy import Column, String, Text, Integer
+from sqlalchemy.dialects.postgresql import JSONB
 from geoalchemy2 import Geometry
 from .base import BaseModel
 
@@ -10,10 +11,10 @@ class WebMap(BaseModel):
     
     name = Column(String(255), nullable=False)
     description = Column(Text)
-    visible_layers = Column(JSON)  # какие слои видны
+    visible_layers = Column(JSONB)  # какие слои видны
     center_geom = Column(Geometry('POINT', srid=4326))
     zoom_level = Column(Integer, default=8)
-    permissions = Column(JSON)  # права доступа
+    permissions = Column(JSONB)  # права доступа
     
     def to_dict(self):
         """Преобразует объект в словарь"""
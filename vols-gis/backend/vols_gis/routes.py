@@ -10,13 +10,19 @@ def includeme(config: Configurator):
     
     # API: Nodes
     config.add_route('api_nodes_list', '/api/nodes')
-    config.add_route('api_nodes_get', '/api/nodes/{id}')
+    # Статические пути до /api/nodes/{id}, иначе {id} перехватит их
     config.add_route('api_nodes_nearby', '/api/nodes/nearby')
+    config.add_route('api_nodes_nearest', '/api/nodes/nearest')
+    config.add_route('api_nodes_clusters', '/api/nodes/clusters')
+    config.add_route('api_nodes_get', '/api/nodes/{id}')
+    config.add_route('api_nodes_ports', '/api/nodes/{id}/ports')
+    config.add_route('api_nodes_capacity', '/api/nodes/{id}/capacity')
     
     # API: VOLS
     config.add_route('api_vols_list', '/api/vols')
     config.add_route('api_vols_get', '/api/vols/{id}')
     config.add_route('api_vols_path', '/api/vols/{id}/path')
+    config.add_route('api_vols_full', '/api/vols/{id}/full')
     
     # API: Fibers
     config.add_route('api_fibers_list', '/api/fibers')
@@ -25,8 +31,9 @@ def includeme(config: Configurator):
     
     # API: Links
     config.add_route('api_links_list', '/api/links')
-    config.add_route('api_links_get', '/api/links/{id}')
+    # search до {id}, иначе {id} перехватит его
     config.add_route('api_links_search', '/api/links/search')
+    config.add_route('api_links_get', '/api/links/{id}')
     
     # API: Users
     config.add_route('api_users_list', '/api/users')
@@ -47,6 +54,26 @@ def includeme(config: Configurator):
     config.add_route('api_export_fibers_csv', '/api/export/fibers.csv')
     config.add_route('api_export_all_json', '/api/export/all.json')
     
+    # API: Bulk import
+    config.add_route('api_bulk', '/api/bulk/{model}')
+    
+    # API: File imports
+    config.add_route('api_imports', '/api/imports')
+    config.add_route('api_imports_get', '/api/imports/{id}')
+    
+    # API: Vector tiles
+    config.add_route('api_tiles', '/api/tiles/{layer}/{z}/{x}/{y}.pbf')
+    
+    # API: Graph
+    config.add_route('api_graph_path', '/api/graph/path')
+    config.add_route('api_graph_reachable', '/api/graph/reachable')
+    
+    # API: Search
+    config.add_route('api_search', '/api/search')
+    
+    # API: Health
+    config.add_route('api_health_db', '/api/health/db')
+    
     # API: Stats
     config.add_route('api_stats_dashboard', '/api/stats/dashboard')
     config.add_route('api_stats_summary', '/api/stats/summary')
@@ -0,0 +1,170 @@
+"""Пакетная загрузка объектов: разбор, валидация и вставка пачками
+
+Объекты валидируются pydantic схемами создания (NodeCreate, VolsCreate, ...)
+пачками по BULK_BATCH_SIZE и вставляются многострочным
+INSERT ... RETURNING id в одной транзакции вызывающего кода.
+"""
+import json
+from collections import defaultdict
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+
+from ..models.nodes import Node
+from ..models.vols import Vols
+from ..models.fibers import Fiber
+from ..models.links import Link
+from ..schemas.nodes import NodeCreate
+from ..schemas.vols import VolsCreate
+from ..schemas.fibers import FiberCreate
+from ..schemas.links import LinkCreate
+from .spatial import SRID
+from .lod import refresh_lod
+
+BULK_BATCH_SIZE = 1000
+# Сколько ошибок валидации возвращается клиенту (всего считаются все)
+MAX_REPORTED_ERRORS = 1000
+
+
+def _point_ewkt(lon, lat):
+    return f'SRID={SRID};POINT({lon} {lat})'
+
+
+def _linestring_ewkt(path):
+    coords = ', '.join(f'{lon} {lat}' for lon, lat in path)
+    return f'SRID={SRID};LINESTRING({coords})'
+
+
+def node_row(schema):
+    row = schema.model_dump(exclude={'lat', 'lon'})
+    row['geom'] = _point_ewkt(schema.lon, schema.lat)
+    return row
+
+
+def vols_row(schema):
+    if len(schema.path) < 2:
+        raise ValueError('Маршрут должен содержать минимум 2 точки')
+    row = schema.model_dump(exclude={'path'})
+    row['path'] = _linestring_ewkt(schema.path)
+    return row
+
+
+def plain_row(schema):
+    return schema.model_dump()
+
+
+def node_from_feature(properties, geometry):
+    """Точка GeoJSON -> lon/lat"""
+    if geometry and geometry.get('type') == 'Point':
+        lon, lat = geometry['coordinates'][:2]
+        properties = {**properties, 'lon': lon, 'lat': lat}
+    return properties
+
+
+def vols_from_feature(properties, geometry):
+    """LineString GeoJSON -> path"""
+    if geometry and geometry.get('type') == 'LineString':
+        path = [coord[:2] for coord in geometry['coordinates']]
+        properties = {**properties, 'path': path}
+    return properties
+
+
+def properties_only(properties, geometry):
+    return properties
+
+
+class BulkModel:
+    """Описание загружаемой сущности"""
+
+    def __init__(self, table, model, schema, to_row, from_feature, after_insert=None):
+        self.table = table
+        self.model = model
+        self.schema = schema
+        self.to_row = to_row
+        self.from_feature = from_feature
+        # after_insert(connection, ids) - в той же транзакции, что и вставка
+        self.after_insert = after_insert
+        self.adapter = TypeAdapter(list[schema])
+
+
+BULK_MODELS = {
+    'nodes': BulkModel('nodes', Node, NodeCreate, node_row, node_from_feature),
+    'vols': BulkModel('vols', Vols, VolsCreate, vols_row, vols_from_feature, after_insert=refresh_lod),
+    'fibers': BulkModel('fibers', Fiber, FiberCreate, plain_row, properties_only),
+    'links': BulkModel('links', Link, LinkCreate, plain_row, properties_only),
+}
+
+
+def feature_to_item(bulk_model, obj):
+    """Объект входных данных (Feature или словарь атрибутов) -> словарь для схемы"""
+    if isinstance(obj, dict) and obj.get('type') == 'Feature':
+        return bulk_model.from_feature(dict(obj.get('properties') or {}), obj.get('geometry'))
+    return obj
+
+
+def iter_ndjson(stream):
+    """Объекты NDJSON построчно (пустые строки пропускаются)"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_batches(items, size=BULK_BATCH_SIZE):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _format_errors(errors):
+    return [{'loc': list(error['loc']), 'msg': error['msg']} for error in errors]
+
+
+def validate_batch(bulk_model, items, offset=0):
+    """Валидирует пачку объектов
+
+    Возвращает (rows, errors): строки для INSERT и ошибки вида
+    {'index': <номер объекта во входных данных>, 'errors': [...]}.
+    Пачка проверяется одним вызовом pydantic; при ошибках индексы
+    берутся из loc, а корректные объекты проверяются повторно.
+    """
+    try:
+        schemas = bulk_model.adapter.validate_python(items)
+        invalid = {}
+    except ValidationError as e:
+        invalid = defaultdict(list)
+        for error in e.errors():
+            index, *loc = error['loc']
+            invalid[index].append({**error, 'loc': tuple(loc)})
+        schemas = [
+            None if i in invalid else bulk_model.schema.model_validate(item)
+            for i, item in enumerate(items)
+        ]
+
+    rows, errors = [], []
+    for i, schema in enumerate(schemas):
+        if i in invalid:
+            errors.append({'index': offset + i, 'errors': _format_errors(invalid[i])})
+            continue
+        try:
+            rows.append(bulk_model.to_row(schema))
+        except ValueError as e:
+            errors.append({'index': offset + i, 'errors': [{'loc': [], 'msg': str(e)}]})
+    return rows, errors
+
+
+def insert_rows(connection, bulk_model, rows):
+    """Многострочный INSERT ... RETURNING id, id в порядке строк"""
+    if not rows:
+        return []
+    table = bulk_model.model.__table__
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    ids = list(connection.execute(statement, rows).scalars())
+    if bulk_model.after_insert is not None:
+        bulk_model.after_insert(connection, ids)
+    return ids
@@ -0,0 +1,151 @@
+"""Кластеризация узлов на сервере для мелких масштабов карты
+
+Узлы группируются по ячейкам сетки ST_SnapToGrid, размер ячейки -
+CLUSTER_CELL_PX пикселей экрана на заданном zoom. Для каждой ячейки
+считаются количество узлов, центр масс, охватывающий прямоугольник и
+разбивка по node_type/status (GROUPING SETS, таблица читается один раз).
+
+bbox расширяется до границ ячеек сетки (snap_bbox) и фильтрует узлы в
+самом запросе через GIST индекс: ячейка, задетая bbox, попадает в ответ
+целиком, а узлы вне этих ячеек не читаются. Кеш хранит кластеры по ключу
+(zoom, ячейки bbox) - соседние bbox в пределах тех же ячеек попадают в
+одну запись. Записи сбрасываются записью в nodes (bump_version) и по TTL,
+число записей ограничено CLUSTER_CACHE_ENTRIES (LRU).
+
+Кластеры нужны только на мелких масштабах: выше MAX_CLUSTER_ZOOM почти
+каждый узел - отдельная ячейка, и кеш по сути хранил бы копию таблицы
+на каждый zoom. Там клиент запрашивает узлы по bbox (/api/nodes?bbox=).
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from .spatial import SRID, degrees_per_pixel
+from .stats_cache import StatsCache
+
+# Размер ячейки сетки в пикселях экрана
+CLUSTER_CELL_PX = 60
+
+# Максимальный zoom кластеризации (ячейка ~1 км на экваторе)
+MAX_CLUSTER_ZOOM = 14
+
+# Число закешированных пар (zoom, ячейки bbox)
+CLUSTER_CACHE_ENTRIES = 256
+
+# Весь мир: кластеры без bbox
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+CLUSTERS_SQL = text("""
+    WITH cells AS (
+        SELECT id, node_type, status, ST_X(geom) AS x, ST_Y(geom) AS y,
+               ST_SnapToGrid(geom, :cell) AS cell
+        FROM nodes
+        WHERE geom IS NOT NULL
+          AND ST_Intersects(geom, ST_MakeEnvelope(:minx, :miny, :maxx, :maxy, {srid}))
+    ), grouped AS (
+        SELECT ST_X(cell) AS cx, ST_Y(cell) AS cy, node_type, status,
+               GROUPING(node_type) AS no_type, GROUPING(status) AS no_status,
+               count(*) AS c, avg(x) AS x, avg(y) AS y,
+               min(x) AS minx, min(y) AS miny, max(x) AS maxx, max(y) AS maxy,
+               min(id) AS node_id
+        FROM cells
+        GROUP BY GROUPING SETS ((ST_X(cell), ST_Y(cell)),
+                                (ST_X(cell), ST_Y(cell), node_type),
+                                (ST_X(cell), ST_Y(cell), status))
+    )
+    SELECT
+        max(c) FILTER (WHERE no_type = 1 AND no_status = 1) AS count,
+        max(x) FILTER (WHERE no_type = 1 AND no_status = 1) AS lon,
+        max(y) FILTER (WHERE no_type = 1 AND no_status = 1) AS lat,
+        min(minx) AS minx, min(miny) AS miny, max(maxx) AS maxx, max(maxy) AS maxy,
+        min(node_id) AS node_id,
+        json_object_agg(COALESCE(node_type, 'unknown'), c)
+            FILTER (WHERE no_type = 0) AS by_type,
+        json_object_agg(COALESCE(status, 'unknown'), c)
+            FILTER (WHERE no_status = 0) AS by_status
+    FROM grouped
+    WHERE cx BETWEEN :minx AND :maxx AND cy BETWEEN :miny AND :maxy
+    GROUP BY cx, cy
+    ORDER BY count DESC
+""".format(srid=SRID))
+
+
+def cell_size(zoom):
+    """Размер ячейки сетки в градусах для zoom"""
+    return CLUSTER_CELL_PX * degrees_per_pixel(zoom)
+
+
+def snap_bbox(bbox, zoom):
+    """Ячейки сетки, задетые bbox: (ix_min, iy_min, ix_max, iy_max)
+
+    ST_SnapToGrid относит точку к ближайшему узлу сетки, поэтому ячейка
+    с индексом i занимает [(i - 0.5) * cell, (i + 0.5) * cell].
+    """
+    cell = cell_size(zoom)
+    minx, miny, maxx, maxy = bbox or WORLD_BBOX
+    return (math.floor(minx / cell + 0.5), math.floor(miny / cell + 0.5),
+            math.floor(maxx / cell + 0.5), math.floor(maxy / cell + 0.5))
+
+
+def cells_envelope(cells, zoom):
+    """Прямоугольник (minx, miny, maxx, maxy) по внешним границам ячеек"""
+    cell = cell_size(zoom)
+    ix_min, iy_min, ix_max, iy_max = cells
+    return ((ix_min - 0.5) * cell, (iy_min - 0.5) * cell,
+            (ix_max + 0.5) * cell, (iy_max + 0.5) * cell)
+
+
+def compute_clusters(db, zoom, cells):
+    """Кластеры узлов в ячейках cells для zoom (один запрос)"""
+    minx, miny, maxx, maxy = cells_envelope(cells, zoom)
+    params = {'cell': cell_size(zoom), 'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}
+    clusters = []
+    for row in db.execute(CLUSTERS_SQL, params):
+        cluster = {
+            'count': row.count,
+            'lon': row.lon,
+            'lat': row.lat,
+            'bbox': [row.minx, row.miny, row.maxx, row.maxy],
+            'by_type': row.by_type or {},
+            'by_status': row.by_status or {},
+        }
+        if row.count == 1:
+            # Одиночный узел: клиент рисует обычный маркер
+            cluster['node_id'] = row.node_id
+        clusters.append(cluster)
+    return clusters
+
+
+class ClusterCache:
+    """Кластеры по (zoom, ячейки bbox): StatsCache на каждый ключ, LRU"""
+
+    def __init__(self, ttl=30, max_entries=CLUSTER_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._caches = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache(self, key):
+        with self._lock:
+            cache = self._caches.get(key)
+            if cache is None:
+                cache = self._caches[key] = StatsCache(('nodes',), self.ttl)
+                while len(self._caches) > self.max_entries:
+                    self._caches.popitem(last=False)
+            else:
+                self._caches.move_to_end(key)
+            return cache
+
+    def get(self, db, zoom, bbox=None):
+        """Кластеры ячеек, задетых bbox (без bbox - всех узлов)"""
+        cells = snap_bbox(bbox, zoom)
+        return self._cache((zoom, cells)).get(lambda: compute_clusters(db, zoom, cells))
+
+    def clear(self):
+        with self._lock:
+            self._caches.clear()
+
+
+cluster_cache = ClusterCache()
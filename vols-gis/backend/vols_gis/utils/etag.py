@@ -0,0 +1,61 @@
+"""ETag и условные GET запросы по версиям таблиц
+
+ETag строится из версий таблиц (utils/versions.py), маршрута и параметров
+запроса, поэтому проверка If-None-Match не обращается к БД: пока через API
+не было записи, клиент получает 304 без построения ответа.
+
+Версии берутся из хранилища utils/versions: в памяти процесса или, при
+vols_gis.cache.backend = file, в общем каталоге - тогда запись в любом
+процессе меняет ETag во всех. В ETag входит epoch хранилища: счетчики в
+памяти начинаются с нуля при каждом запуске, и старые ETag не совпадут.
+"""
+from functools import wraps
+import hashlib
+
+from pyramid.response import Response
+
+from .versions import get_epoch, get_version
+
+
+def make_etag(request, tables):
+    """Сильный ETag ответа для маршрута, параметров и версий таблиц"""
+    route = request.matched_route.name if request.matched_route else request.path
+    params = sorted(request.GET.items())
+    versions = [(table, get_version(table)) for table in tables]
+    # Ответ зависит от Accept (JSON или MessagePack)
+    accept = request.headers.get('Accept')
+    key = repr((get_epoch(), route, request.matchdict, params, accept, versions))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def conditional_get(*tables, extra=None):
+    """Декоратор view: ETag по версиям таблиц и 304 на If-None-Match
+
+    View вызывается только если ETag клиента устарел. ETag ставится
+    на успешные ответы (в т.ч. потоковые и ответы renderer='json').
+    extra(request) - дополнительные таблицы, от которых ответ зависит
+    при данных параметрах запроса (например, expand=).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            request_tables = tables + tuple(extra(request)) if extra is not None else tables
+            etag = make_etag(request, request_tables)
+            if etag in request.if_none_match:
+                response = Response(status=304)
+                response.etag = etag
+                response.cache_control.no_cache = True
+                return response
+            
+            result = view_func(request, *args, **kwargs)
+            response = result if isinstance(result, Response) else request.response
+            if response.status_code == 200:
+                response.etag = etag
+                response.vary = ('Accept',)
+                # Браузер кеширует ответ, но перед использованием проверяет ETag
+                response.cache_control.no_cache = True
+            return result
+        
+        return wrapper
+    
+    return decorator
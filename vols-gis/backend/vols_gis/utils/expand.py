@@ -0,0 +1,110 @@
+"""Загрузка связанных объектов для параметра expand=
+
+Связанные объекты страницы списка загружаются через relationship()
+моделей и selectinload: на каждую связь - один запрос `... IN (...)`
+по всем объектам страницы, а не запрос на каждый объект (N+1).
+
+Маршруты: expand=nodes (start_node/end_node), fibers, links (волокна
+вместе с их связями). Волокна: expand=links.
+"""
+from sqlalchemy.orm import selectinload, load_only, defer, undefer
+
+from ..models.nodes import Node
+from ..models.vols import Vols
+from ..models.fibers import Fiber
+from .serialization import node_row_to_dict
+
+# Допустимые значения expand и таблицы, от которых зависит ответ
+VOLS_EXPAND = {
+    'nodes': ('nodes',),
+    'fibers': ('fibers',),
+    'links': ('fibers', 'links'),
+}
+FIBERS_EXPAND = {
+    'links': ('links',),
+}
+
+
+def parse_expand(value, allowed):
+    """Разбирает expand=a,b (или expand=all) в множество; ValueError на неизвестных"""
+    if not value:
+        return set()
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    if 'all' in names:
+        return set(allowed)
+    unknown = names - set(allowed)
+    if unknown:
+        raise ValueError(f'expand: неизвестные значения {sorted(unknown)}, допустимы {sorted(allowed)}')
+    return names
+
+
+def expand_tables(allowed):
+    """Функция для conditional_get(extra=...): таблицы из expand запроса"""
+    def tables(request):
+        try:
+            names = parse_expand(request.params.get('expand'), allowed)
+        except ValueError:
+            return ()
+        return tuple(sorted({table for name in names for table in allowed[name]}))
+    return tables
+
+
+def _node_to_dict(node):
+    return node_row_to_dict(node) if node is not None else None
+
+
+def fiber_to_dict(fiber, with_links=False):
+    """Словарь волокна; with_links - вместе с загруженными связями"""
+    result = fiber.to_dict()
+    if with_links:
+        result['links'] = [link.to_dict() for link in fiber.links]
+    return result
+
+
+def vols_options(expand):
+    """Опции загрузки Vols для expand"""
+    options = []
+    if 'nodes' in expand:
+        # lat/lon считаются в SQL (column_property), WKB геометрии не нужен
+        node_options = (defer(Node.geom), undefer(Node.lat), undefer(Node.lon))
+        options.append(selectinload(Vols.start_node).options(*node_options))
+        options.append(selectinload(Vols.end_node).options(*node_options))
+    if 'links' in expand:
+        options.append(selectinload(Vols.fibers).selectinload(Fiber.links))
+    elif 'fibers' in expand:
+        options.append(selectinload(Vols.fibers))
+    return options
+
+
+def expand_vols(db, items, expand):
+    """Добавляет в словари маршрутов связанные объекты
+
+    Число запросов не зависит от числа маршрутов: маршруты (только ключи)
+    и по одному запросу на каждую загружаемую связь.
+    """
+    if not expand or not items:
+        return items
+    ids = [item['id'] for item in items]
+    query = db.query(Vols).options(
+        load_only(Vols.id, Vols.start_node_id, Vols.end_node_id),
+        *vols_options(expand)
+    ).filter(Vols.id.in_(ids))
+    loaded = {vols.id: vols for vols in query}
+    for item in items:
+        vols = loaded.get(item['id'])
+        if vols is None:
+            continue
+        if 'nodes' in expand:
+            item['start_node'] = _node_to_dict(vols.start_node)
+            item['end_node'] = _node_to_dict(vols.end_node)
+        if 'fibers' in expand or 'links' in expand:
+            item['fibers'] = [fiber_to_dict(fiber, 'links' in expand) for fiber in vols.fibers]
+    return items
+
+
+def fibers_options(expand):
+    """Опции загрузки Fiber для expand"""
+    if 'links' in expand:
+        return [selectinload(Fiber.links)]
+    return []
+
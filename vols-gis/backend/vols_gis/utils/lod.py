@@ -0,0 +1,79 @@
+"""Уровни детализации (LOD) путей маршрутов
+
+Для каждого маршрута в таблице vols_lod хранятся пути, упрощенные
+ST_SimplifyPreserveTopology для диапазонов zoom из LOD_BANDS. Допуск
+диапазона - размер пикселя на его максимальном zoom, поэтому на всех
+zoom диапазона упрощение не видно глазом. Выше последнего диапазона
+отдается полный путь.
+
+Таблица обновляется при записи пути (views, пакетная загрузка, импорт).
+Если строки LOD нет (данные внесены в обход API), путь упрощается на лету.
+"""
+import math
+
+from sqlalchemy import and_, func, text
+
+from ..models.vols import Vols
+from ..models.vols_lod import VolsLod
+from .spatial import degrees_per_pixel
+
+# Максимальные zoom диапазонов: 0..6, 7..9, 10..12
+LOD_BANDS = (6, 9, 12)
+
+REFRESH_LOD_SQL = text("""
+    INSERT INTO vols_lod (vols_id, band, path, npoints)
+    SELECT v.id, b.band, s.path, ST_NPoints(s.path)
+    FROM vols v
+    CROSS JOIN unnest(CAST(:bands AS integer[]), CAST(:tolerances AS float8[])) AS b(band, tolerance)
+    CROSS JOIN LATERAL (SELECT ST_SimplifyPreserveTopology(v.path, b.tolerance) AS path) s
+    WHERE (CAST(:ids AS integer[]) IS NULL OR v.id = ANY(CAST(:ids AS integer[])))
+    ON CONFLICT (vols_id, band) DO UPDATE
+    SET path = EXCLUDED.path, npoints = EXCLUDED.npoints
+""")
+
+
+def band_for_zoom(zoom):
+    """Диапазон LOD для zoom или None (полный путь)"""
+    for band in LOD_BANDS:
+        if zoom <= band:
+            return band
+    return None
+
+
+def refresh_lod(connection, vols_ids=None):
+    """Пересчитывает упрощенные пути маршрутов (всех, если vols_ids=None)
+
+    Выполняется в транзакции вызывающего кода.
+    """
+    if vols_ids is not None and not vols_ids:
+        return
+    connection.execute(REFRESH_LOD_SQL, {
+        'bands': list(LOD_BANDS),
+        'tolerances': [degrees_per_pixel(band) for band in LOD_BANDS],
+        'ids': list(vols_ids) if vols_ids is not None else None,
+    })
+
+
+def parse_tolerance(value):
+    """Параметр tolerance (градусы) или None"""
+    if value is None or value == '':
+        return None
+    tolerance = float(value)
+    if not math.isfinite(tolerance) or tolerance < 0:
+        raise ValueError('tolerance должен быть неотрицательным конечным числом')
+    return tolerance
+
+
+def simplified_path(zoom=None, tolerance=None):
+    """SQL выражение пути маршрута с учетом zoom/tolerance
+
+    Возвращает (path, onclause): onclause - условие LEFT JOIN с VolsLod
+    или None, если join не нужен. Явный tolerance упрощает на лету.
+    """
+    if tolerance is not None:
+        return func.ST_SimplifyPreserveTopology(Vols.path, tolerance), None
+    band = band_for_zoom(zoom) if zoom is not None else None
+    if band is None:
+        return Vols.path, None
+    path = func.coalesce(VolsLod.path, func.ST_SimplifyPreserveTopology(Vols.path, degrees_per_pixel(band)))
+    return path, and_(VolsLod.vols_id == Vols.id, VolsLod.band == band)
@@ -0,0 +1,72 @@
+"""Фильтры списков по meta_data (JSONB)
+
+Параметры запроса:
+- meta.<key>=<value> - значение ключа (вложенные ключи через точку:
+  meta.install.year=2019). Значение, похожее на число или true/false,
+  ищется и как JSON значение, и как строка ("2019" и 2019);
+- meta_contains=<JSON объект> - произвольное вхождение, как оператор @>.
+
+Все условия - вхождение `meta_data @> '{...}'`, которое обслуживают
+GIN индексы jsonb_path_ops (миграция 3).
+"""
+import json
+
+from sqlalchemy import and_, or_
+
+META_PREFIX = 'meta.'
+
+
+def _nest(path, value):
+    """meta.a.b=v -> {'a': {'b': v}}"""
+    document = value
+    for key in reversed(path):
+        document = {key: document}
+    return document
+
+
+def _values(raw):
+    """Варианты значения: строка и, если разбирается, JSON скаляр"""
+    values = [raw]
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return values
+    if not isinstance(parsed, (dict, list, str)) and parsed is not None:
+        values.append(parsed)
+    return values
+
+
+def parse_meta_filters(params):
+    """Условия из параметров: список групп документов (группа - варианты через OR)
+
+    ValueError при неверном meta_contains или пустом ключе.
+    """
+    groups = []
+    for name, raw in params.items():
+        if name.startswith(META_PREFIX):
+            path = name[len(META_PREFIX):].split('.')
+            if not all(path):
+                raise ValueError(f'Неверный ключ meta_data: {name}')
+            groups.append([_nest(path, value) for value in _values(raw)])
+        elif name == 'meta_contains':
+            try:
+                document = json.loads(raw)
+            except ValueError as e:
+                raise ValueError(f'meta_contains: неверный JSON ({e})')
+            if not isinstance(document, dict):
+                raise ValueError('meta_contains должен быть JSON объектом')
+            groups.append([document])
+    return groups
+
+
+def meta_filter(column, groups):
+    """Условие SQLAlchemy для JSONB колонки или None, если фильтров нет"""
+    if not groups:
+        return None
+    return and_(*(or_(*(column.contains(document) for document in group)) for group in groups))
+
+
+def apply_meta_filters(query, column, params):
+    """Применяет meta.* и meta_contains к запросу (ValueError при ошибке)"""
+    condition = meta_filter(column, parse_meta_filters(params))
+    return query.filter(condition) if condition is not None else query
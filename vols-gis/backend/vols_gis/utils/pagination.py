@@ -0,0 +1,63 @@
+"""Keyset (cursor) пагинация для списков
+
+Страница выбирается условием `id > after_id ORDER BY id LIMIT n`, поэтому
+стоимость запроса не зависит от номера страницы, а в памяти держится
+только одна страница.
+"""
+from sqlalchemy import text
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+
+def parse_page_params(params):
+    """Разбирает limit и after_id из параметров запроса
+
+    Возвращает (limit, after_id). При неверных значениях выбрасывает ValueError.
+    """
+    limit = params.get('limit')
+    limit = int(limit) if limit else DEFAULT_LIMIT
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit должен быть в диапазоне 1..{MAX_LIMIT}')
+
+    after_id = params.get('after_id')
+    after_id = int(after_id) if after_id else None
+    return limit, after_id
+
+
+def paginate(query, id_column, limit, after_id=None):
+    """Применяет keyset пагинацию к запросу
+
+    Возвращает (rows, next_cursor); next_cursor равен None на последней странице.
+    """
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    # Берем на одну запись больше, чтобы узнать, есть ли следующая страница
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return rows, next_cursor
+
+
+def estimate_count(db, table_name):
+    """Оценка числа строк таблицы из статистики планировщика (pg_class.reltuples)
+
+    Не сканирует таблицу, в отличие от COUNT(*). Значение обновляется
+    VACUUM/ANALYZE, поэтому может немного отставать.
+    """
+    value = db.execute(
+        text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+        {'table': table_name}
+    ).scalar()
+    # -1 означает, что таблица еще ни разу не анализировалась
+    return max(int(value or 0), 0)
+
+
+def page_response(key, items, next_cursor, request, db, table_name):
+    """Тело ответа для страницы списка"""
+    result = {key: items, 'count': len(items), 'next_cursor': next_cursor}
+    if request.params.get('count') == 'estimate':
+        result['total_estimate'] = estimate_count(db, table_name)
+    return result
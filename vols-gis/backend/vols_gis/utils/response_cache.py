@@ -0,0 +1,260 @@
+"""Кеш ответов для read-heavy endpoints
+
+Ключ - маршрут, параметры пути и запроса, роль пользователя и поколения
+таблиц, от которых зависит ответ. Запись в таблицу через API
+(bump_version) меняет поколение, и старые записи перестают находиться.
+
+Бэкенды:
+- MemoryBackend - LRU в памяти процесса с ограничением размера и TTL;
+- FileBackend - файлы в общем каталоге для нескольких процессов waitress.
+  Версии таблиц (utils/versions.FileVersions) хранятся там же, поэтому
+  запись в одном процессе инвалидирует кеш и ETag во всех.
+"""
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import logging
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+from pyramid.response import Response
+
+from .versions import FileVersions, get_version, set_store
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """LRU кеш в памяти процесса"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileBackend:
+    """Кеш в файлах общего каталога (для нескольких процессов)
+
+    Запись - JSON заголовок (срок, ключ, тип, Content-Type) и тело ответа
+    байтами; pickle не используется, чтобы чужой файл в каталоге не мог
+    выполнить код. Каталог должен принадлежать пользователю процесса и
+    быть закрыт на запись для остальных.
+    Устаревшие записи удаляются при чтении и очистке по max_entries
+    (раз в PRUNE_EVERY записей).
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, directory, max_entries=4096):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_directory()
+
+    def _check_directory(self):
+        """ValueError, если каталог может подменить другой пользователь"""
+        st = os.lstat(self.directory)
+        if not stat.S_ISDIR(st.st_mode):
+            raise ValueError(f'Каталог кеша {self.directory} не является каталогом')
+        if not hasattr(os, 'getuid'):
+            # Windows: владельца и права POSIX проверить нельзя
+            return
+        if st.st_uid != os.getuid():
+            raise ValueError(f'Каталог кеша {self.directory} принадлежит другому пользователю')
+        if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ValueError(f'Каталог кеша {self.directory} доступен на запись группе или всем')
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _filename(key):
+        return 'entry-' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _dump(expires, key, value):
+        """Запись кеша ответов (kind, value, content_type) в байты"""
+        kind, data, content_type = value
+        body = data if kind == 'response' else json.dumps(data).encode('utf-8')
+        header = {'expires': expires, 'key': repr(key), 'kind': kind, 'content_type': content_type}
+        return json.dumps(header).encode('utf-8') + b'\n' + body
+
+    @staticmethod
+    def _load(raw):
+        """(expires, repr ключа, value) из байтов записи"""
+        header, _, body = raw.partition(b'\n')
+        header = json.loads(header)
+        kind = header['kind']
+        data = body if kind == 'response' else json.loads(body)
+        return header['expires'], header['key'], (kind, data, header['content_type'])
+
+    def get(self, key):
+        path = self._path(self._filename(key))
+        try:
+            with open(path, 'rb') as f:
+                expires, stored_key, value = self._load(f.read())
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # Поврежденная или чужая запись - промах
+            return None
+        if stored_key != repr(key):
+            return None
+        if expires < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        # Пишем во временный файл и переименовываем: читатели не видят половину записи
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._dump(time.time() + ttl, key, value))
+        os.replace(tmp_path, self._path(self._filename(key)))
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        entries = [name for name in os.listdir(self.directory) if name.startswith('entry-')]
+        if len(entries) <= self.max_entries:
+            return
+        mtimes = {}
+        for name in entries:
+            try:
+                mtimes[name] = os.stat(self._path(name)).st_mtime
+            except OSError:
+                pass
+        for name in sorted(mtimes, key=mtimes.get)[:len(mtimes) - self.max_entries]:
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.startswith('entry-'):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+
+class ResponseCache:
+    """Кеш ответов view с инвалидацией по записи в таблицы"""
+
+    def __init__(self, backend=None, ttl=60, enabled=True):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+
+    def configure(self, settings):
+        """Настройка из vols_gis.cache.* в .ini"""
+        from pyramid.settings import asbool
+        max_entries = int(settings.get('vols_gis.cache.max_entries', 4096))
+        if settings.get('vols_gis.cache.backend', 'memory') == 'file':
+            directory = settings.get('vols_gis.cache.dir')
+            if not directory:
+                # Отдельный каталог на пользователя; владельца и права проверяет FileBackend
+                suffix = f'-{os.getuid()}' if hasattr(os, 'getuid') else ''
+                directory = os.path.join(tempfile.gettempdir(), f'vols_gis_cache{suffix}')
+            self.backend = FileBackend(directory, max_entries)
+            # Версии таблиц - в том же каталоге: кеши и ETag общие для всех процессов
+            set_store(FileVersions(directory))
+        else:
+            self.backend = MemoryBackend(max_entries)
+        self.ttl = int(settings.get('vols_gis.cache.ttl', 60))
+        self.enabled = asbool(settings.get('vols_gis.cache.enabled', True))
+
+    def make_key(self, request, tables):
+        route = request.matched_route.name if request.matched_route else request.path
+        user = getattr(request, 'user', None) or {}
+        return (
+            route,
+            tuple(sorted((request.matchdict or {}).items())),
+            tuple(sorted(request.GET.items())),
+            user.get('role'),
+            tuple(get_version(table) for table in tables),
+        )
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(*tables):
+    """Декоратор GET view: ответ из кеша, пока таблицы не изменились
+
+    Кешируются только успешные ответы: dict для renderer='json' при
+    request.response.status 200 и Response 200 с телом (потоковые ответы не кешируются).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not response_cache.enabled:
+                return view_func(request, *args, **kwargs)
+            
+            key = response_cache.make_key(request, tables)
+            entry = response_cache.get(key)
+            if entry is not None:
+                kind, value, content_type = entry
+                if kind == 'response':
+                    return Response(body=value, content_type=content_type)
+                return value
+            
+            result = view_func(request, *args, **kwargs)
+            if isinstance(result, dict):
+                # renderer='json': статус ошибки (404 и т.п.) view задает в request.response
+                if request.response.status_code == 200:
+                    response_cache.set(key, ('data', result, None))
+            elif isinstance(result, Response) and result.status_code == 200 and result.app_iter is not None \
+                    and isinstance(result.app_iter, list):
+                response_cache.set(key, ('response', result.body, result.content_type))
+            return result
+        
+        return wrapper
+    
+    return decorator
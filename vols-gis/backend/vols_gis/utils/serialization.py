@@ -0,0 +1,143 @@
+"""Сериализация строк списков без разбора геометрии в Python
+
+Координаты вычисляются в SQL (ST_X/ST_Y, ST_AsGeoJSON), поэтому запросы
+списков возвращают кортежи, а не ORM объекты, и для каждой строки не нужно
+разбирать WKB и создавать Shapely объект (geoalchemy2.shape.to_shape).
+"""
+import json
+from sqlalchemy import func
+from ..models.nodes import Node
+from ..models.vols import Vols
+from ..models.webmaps import WebMap
+from .wire import wkb_linestring_coordinates
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def node_columns():
+    """Колонки запроса узла: атрибуты и координаты точки"""
+    return [
+        Node.id,
+        Node.name,
+        Node.description,
+        Node.node_type,
+        Node.status,
+        Node.meta_data,
+        Node.created_at,
+        Node.updated_at,
+        func.ST_Y(Node.geom).label('lat'),
+        func.ST_X(Node.geom).label('lon'),
+    ]
+
+
+def node_row_to_dict(row):
+    """Словарь узла в формате API (как Node.to_dict() с lat/lon вместо geom)"""
+    return {
+        'id': row.id,
+        'name': row.name or '',
+        'description': row.description,
+        'node_type': row.node_type,
+        'status': row.status,
+        'meta_data': row.meta_data,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+        'lat': row.lat,
+        'lon': row.lon,
+    }
+
+
+def vols_columns(path=None, wkb=False):
+    """Колонки запроса маршрута: атрибуты и путь в виде GeoJSON
+
+    path - SQL выражение геометрии вместо Vols.path (например, упрощенной).
+    wkb - путь в виде 2D NDR WKB (path_wkb) вместо GeoJSON, для MessagePack.
+    """
+    if path is None:
+        path = Vols.path
+    if wkb:
+        path_column = func.ST_AsBinary(func.ST_Force2D(path), 'NDR').label('path_wkb')
+    else:
+        path_column = func.ST_AsGeoJSON(path).label('path_geojson')
+    return [
+        Vols.id,
+        Vols.name,
+        Vols.description,
+        Vols.start_node_id,
+        Vols.end_node_id,
+        Vols.length_km,
+        Vols.status,
+        Vols.meta_data,
+        Vols.created_at,
+        Vols.updated_at,
+        path_column,
+    ]
+
+
+def path_coordinates(path_geojson):
+    """Список координат [lon, lat] из GeoJSON LineString"""
+    if not path_geojson:
+        return None
+    return json.loads(path_geojson)['coordinates']
+
+
+def vols_row_to_dict(row):
+    """Словарь маршрута в формате API (path - список [lon, lat])
+
+    Для строк из vols_columns(wkb=True) path - упакованный массив float64.
+    """
+    if hasattr(row, 'path_wkb'):
+        path = wkb_linestring_coordinates(row.path_wkb)
+    else:
+        path = path_coordinates(row.path_geojson)
+    return {
+        'id': row.id,
+        'name': row.name or '',
+        'description': row.description,
+        'start_node_id': row.start_node_id,
+        'end_node_id': row.end_node_id,
+        'path': path,
+        'length_km': float(row.length_km) if row.length_km else None,
+        'status': row.status,
+        'meta_data': row.meta_data,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+    }
+
+
+def webmap_columns():
+    """Колонки запроса веб-карты: атрибуты и координаты центра"""
+    return [
+        WebMap.id,
+        WebMap.name,
+        WebMap.description,
+        WebMap.visible_layers,
+        WebMap.zoom_level,
+        WebMap.permissions,
+        WebMap.created_at,
+        WebMap.updated_at,
+        func.ST_Y(WebMap.center_geom).label('center_lat'),
+        func.ST_X(WebMap.center_geom).label('center_lon'),
+    ]
+
+
+def webmap_row_to_dict(row):
+    """Словарь веб-карты в формате API (center_lat/center_lon вместо center_geom)"""
+    result = {
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'visible_layers': row.visible_layers,
+        'zoom_level': row.zoom_level,
+        'permissions': row.permissions,
+        'created_at': _isoformat(row.created_at),
+        'updated_at': _isoformat(row.updated_at),
+    }
+    if row.center_lat is not None:
+        result['center_lat'] = row.center_lat
+        result['center_lon'] = row.center_lon
+    else:
+        # Как и раньше, без центра отдается center_geom = None
+        result['center_geom'] = None
+    return result
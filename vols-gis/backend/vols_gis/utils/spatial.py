@@ -0,0 +1,115 @@
+"""Пространственные фильтры для запросов к слоям карты"""
+import math
+from sqlalchemy import and_, func
+
+# SRID всех геометрий в БД (см. init-db.sql)
+SRID = 4326
+
+# Размер тайла веб-карты в пикселях (EPSG:3857)
+TILE_SIZE = 256
+
+MAX_ZOOM = 22
+
+# Размер маркера узла в пикселях: более близкие узлы на экране сливаются
+MARKER_PX = 4
+
+
+def parse_bbox(value):
+    """Разбирает параметр bbox=minx,miny,maxx,maxy (lon/lat, EPSG:4326)
+
+    Возвращает кортеж из четырех float или None, если параметр не задан.
+    При неверном формате выбрасывает ValueError.
+    """
+    if not value:
+        return None
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError('bbox должен иметь формат minx,miny,maxx,maxy')
+    minx, miny, maxx, maxy = (float(p) for p in parts)
+    if minx > maxx or miny > maxy:
+        raise ValueError('bbox: min должен быть не больше max')
+    if not (-180 <= minx <= 180 and -180 <= maxx <= 180 and -90 <= miny <= 90 and -90 <= maxy <= 90):
+        raise ValueError('bbox выходит за пределы EPSG:4326')
+    return minx, miny, maxx, maxy
+
+
+def parse_zoom(value):
+    """Разбирает параметр zoom (0..22) или возвращает None"""
+    if value is None or value == '':
+        return None
+    zoom = int(value)
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f'zoom должен быть в диапазоне 0..{MAX_ZOOM}')
+    return zoom
+
+
+def bbox_envelope(bbox):
+    """Прямоугольник bbox как геометрия PostGIS"""
+    minx, miny, maxx, maxy = bbox
+    return func.ST_MakeEnvelope(minx, miny, maxx, maxy, SRID)
+
+
+def bbox_filter(column, bbox):
+    """Условие пересечения геометрии с bbox
+
+    ST_Intersects сам добавляет проверку `&&`, поэтому запрос идет
+    через GIST индекс (idx_nodes_geom / idx_vols_path).
+    """
+    return func.ST_Intersects(column, bbox_envelope(bbox))
+
+
+def degrees_per_pixel(zoom):
+    """Размер одного пикселя экрана в градусах на заданном zoom"""
+    return 360.0 / (TILE_SIZE * (2 ** zoom))
+
+
+def thin_points(query, id_column, geom_column, zoom):
+    """Прореживает точки запроса для zoom: одна (наименьший id) на ячейку маркера
+
+    Ячейки - сетка ST_SnapToGrid со стороной MARKER_PX пикселей; отбор
+    идет по тем же фильтрам, что и query, поэтому keyset пагинация по
+    id_column остается согласованной между страницами.
+    """
+    cell = MARKER_PX * degrees_per_pixel(zoom)
+    keep = query.with_entities(func.min(id_column)).group_by(func.ST_SnapToGrid(geom_column, cell))
+    return query.filter(id_column.in_(keep.scalar_subquery()))
+
+
+# Длина одного градуса меридиана, метров (приближенно)
+METRES_PER_DEGREE = 111320.0
+
+
+def make_point(lon, lat):
+    """Точка lon/lat в SRID 4326"""
+    return func.ST_SetSRID(func.ST_MakePoint(lon, lat), SRID)
+
+
+def geography(expr):
+    """Приведение геометрии 4326 к geography (расстояния в метрах)"""
+    return func.geography(expr)
+
+
+def metres_to_degrees(lat, metres):
+    """Полуширина и полувысота (dx, dy) в градусах для радиуса в метрах
+
+    Оценка с запасом: долгота считается по широте дальнего от экватора
+    края окна, где градус долготы короче всего.
+    """
+    dy = metres / METRES_PER_DEGREE
+    edge_lat = min(abs(lat) + dy, 89.9)
+    dx = metres / (METRES_PER_DEGREE * math.cos(math.radians(edge_lat)))
+    return min(dx, 180.0), dy
+
+
+def dwithin_metres(column, lon, lat, metres):
+    """Условие "геометрия не дальше metres метров от точки"
+
+    Сначала грубый фильтр по окну вокруг точки (`&&` по GIST индексу
+    геометрии), затем точная проверка ST_DWithin по geography в метрах.
+    """
+    point = make_point(lon, lat)
+    dx, dy = metres_to_degrees(lat, metres)
+    return and_(
+        column.op('&&')(func.ST_Expand(point, dx, dy)),
+        func.ST_DWithin(geography(column), geography(point), metres)
+    )
@@ -0,0 +1,50 @@
+"""Кеш агрегированной статистики с коротким TTL"""
+import threading
+import time
+
+from .versions import get_version
+
+
+class StatsCache:
+    """Кеш одного значения статистики
+
+    Значение пересчитывается, когда истек TTL или изменилась версия одной
+    из таблиц (запись через API этого процесса). TTL покрывает записи из
+    других процессов и напрямую в БД. Пересчет выполняет один запрос,
+    остальные в это время получают прежнее значение.
+    """
+
+    def __init__(self, tables, ttl=30):
+        self.tables = tuple(tables)
+        self.ttl = ttl
+        self._value = None
+        self._key = None
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def _current_key(self):
+        return tuple(get_version(table) for table in self.tables)
+
+    def get(self, compute):
+        """Значение из кеша или результат compute()"""
+        key = self._current_key()
+        if self._value is not None and self._key == key and time.monotonic() < self._expires:
+            return self._value
+        if not self._lock.acquire(blocking=self._value is None):
+            # Пересчет уже идет в другом потоке
+            return self._value
+        try:
+            if self._value is not None and self._key == key and time.monotonic() < self._expires:
+                return self._value
+            value = compute()
+            self._value = value
+            self._key = key
+            self._expires = time.monotonic() + self.ttl
+            return value
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._key = None
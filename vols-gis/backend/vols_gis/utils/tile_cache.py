@@ -0,0 +1,43 @@
+"""In-process LRU кеш для векторных тайлов"""
+from collections import OrderedDict
+import threading
+
+from .versions import get_version
+
+
+class TileCache:
+    """LRU кеш MVT тайлов
+
+    Ключ включает версию слоя, поэтому запись в таблицу (bump_version)
+    делает все закешированные тайлы слоя недостижимыми.
+    """
+
+    def __init__(self, max_tiles=2048):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(layer, z, x, y, filters=()):
+        return (layer, get_version(layer), z, x, y, tuple(filters))
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def set(self, key, tile):
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+
+tile_cache = TileCache()
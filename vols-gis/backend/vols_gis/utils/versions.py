@@ -0,0 +1,108 @@
+"""Счетчики версий таблиц для инвалидации кешей
+
+Каждая запись в таблицу (create/update/delete) увеличивает версию
+соответствующего слоя. Кеши и ETag включают версию в ключ, поэтому после
+записи старые записи просто перестают находиться и вытесняются по LRU.
+
+Хранилища версий:
+- MemoryVersions - счетчики в памяти процесса (один процесс waitress);
+- FileVersions - файлы общего каталога: запись в одном процессе видят
+  все. Включается вместе с vols_gis.cache.backend = file.
+epoch хранилища отличает версии разных "жизней" счетчиков (перезапуск
+процесса, очищенный каталог), чтобы старые ETag не совпали с новыми.
+"""
+import os
+import threading
+import uuid
+
+_listeners = []
+
+
+class MemoryVersions:
+    """Версии в памяти процесса; начинаются с нуля при каждом запуске"""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, table):
+        return self._versions.get(table, 0)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class FileVersions:
+    """Версии в файлах общего каталога (для нескольких процессов)
+
+    Версия таблицы - размер файла gen-<table>: запись дописывает в него
+    один байт (O_APPEND атомарен), блокировки не нужны. Каталог проверяет
+    FileBackend кеша ответов (владелец и права).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.epoch = self._read_epoch()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_epoch(self):
+        path = self._path('epoch')
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write(uuid.uuid4().hex)
+        with open(path) as f:
+            return f.read().strip()
+
+    def get(self, table):
+        try:
+            return os.stat(self._path(f'gen-{table}')).st_size
+        except FileNotFoundError:
+            return 0
+
+    def bump(self, tables):
+        for table in tables:
+            fd = os.open(self._path(f'gen-{table}'), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                os.write(fd, b'.')
+            finally:
+                os.close(fd)
+
+
+_store = MemoryVersions()
+
+
+def set_store(store):
+    """Заменяет хранилище версий (MemoryVersions или FileVersions)"""
+    global _store
+    _store = store
+
+
+def get_epoch():
+    """Идентификатор хранилища версий для ETag"""
+    return _store.epoch
+
+
+def get_version(table):
+    """Текущая версия таблицы (0, если записей еще не было)"""
+    return _store.get(table)
+
+
+def bump_version(*tables):
+    """Увеличивает версию одной или нескольких таблиц"""
+    _store.bump(tables)
+    for listener in _listeners:
+        listener(tables)
+
+
+def on_bump(listener):
+    """Подписка на запись в таблицы: listener(tables) после bump_version"""
+    _listeners.append(listener)
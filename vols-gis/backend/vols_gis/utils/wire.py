@@ -0,0 +1,51 @@
+"""Выбор формата ответа: JSON или MessagePack
+
+MessagePack отдается, если клиент предпочитает его в Accept
+(application/x-msgpack) или передал ?format=msgpack. Пакет msgpack -
+необязательная зависимость (pip install vols-gis[msgpack]); без него
+всегда отдается JSON.
+
+В MessagePack координаты линий передаются упакованным массивом float64
+(little-endian, lon, lat, lon, lat, ...), геометрии в выгрузках - WKB.
+"""
+from pyramid.response import Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPE = 'application/x-msgpack'
+
+# Заголовок WKB LineString: порядок байт (1), тип (4), число точек (4)
+WKB_LINESTRING_HEADER = 9
+
+
+def wants_msgpack(request):
+    """Клиент запросил MessagePack и он доступен"""
+    if msgpack is None:
+        return False
+    if request.params.get('format') == 'msgpack':
+        return True
+    offers = request.accept.acceptable_offers([JSON_TYPE, MSGPACK_TYPE])
+    return bool(offers) and offers[0][0] == MSGPACK_TYPE
+
+
+def packb(data):
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def msgpack_response(data, status=200):
+    return Response(body=packb(data), status=status, content_type=MSGPACK_TYPE)
+
+
+def wkb_linestring_coordinates(wkb):
+    """Координаты из NDR WKB LineString как упакованный массив float64
+
+    Точки в WKB уже лежат подряд парами double, поэтому достаточно
+    отрезать заголовок - без разбора геометрии.
+    """
+    if wkb is None:
+        return None
+    return bytes(wkb[WKB_LINESTRING_HEADER:])
@@ -4,6 +4,8 @@ from pyramid.response import Response
 from ..models.users import User
 from ..schemas.users import UserLogin
 from ..auth.jwt import create_access_token
+from ..auth.cache import user_cache
+from ..auth.security import AUTHENTICATED
 import logging
 import traceback
 import hashlib
@@ -138,32 +140,19 @@ def auth_login(request):
         )
 
 
-@view_config(route_name='api_auth_me', request_method='GET')
+@view_config(route_name='api_auth_me', request_method='GET', permission=AUTHENTICATED)
 def auth_me(request):
-    """Получение информации о текущем пользователе"""
-    from ..auth.decorators import get_token_from_request, get_user_from_token
-    
+    """Получение информации о текущем пользователе
+
+    Токен уже проверен auth_tween; при включенном vols_gis.auth.user_cache
+    профиль берется из кеша без запроса к таблице users.
+    """
     try:
-        token = get_token_from_request(request)
-        
-        if not token:
+        user_id = request.user['user_id']
+        cached = user_cache.get(user_id)
+        if cached is not None:
             return Response(
-                json_body={
-                    'error': 'Unauthorized',
-                    'message': 'Требуется аутентификация'
-                },
-                status=401,
-                content_type='application/json'
-            )
-        
-        user_info = get_user_from_token(token)
-        if not user_info:
-            return Response(
-                json_body={
-                    'error': 'Invalid token',
-                    'message': 'Неверный или истекший токен'
-                },
-                status=401,
+                json_body={'user': cached},
                 content_type='application/json'
             )
         
@@ -179,7 +168,7 @@ def auth_me(request):
             )
         
         db = request.db
-        user = db.query(User).filter(User.id == user_info['user_id']).first()
+        user = db.query(User).filter(User.id == user_id).first()
         
         if not user:
             return Response(
@@ -191,8 +180,10 @@ def auth_me(request):
                 content_type='application/json'
             )
         
+        user_dict = user.to_dict()
+        user_cache.set(user_id, user_dict)
         return Response(
-            json_body={'user': user.to_dict()},
+            json_body={'user': user_dict},
             content_type='application/json'
         )
         
@@ -205,4 +196,3 @@ def auth_me(request):
             status=500,
             content_type='application/json'
         )
-
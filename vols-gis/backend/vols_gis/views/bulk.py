@@ -0,0 +1,120 @@
+"""Views для пакетной загрузки объектов"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from pyramid.settings import asbool
+from ..auth.security import AUTHENTICATED
+from ..utils.bulk import (
+    BULK_MODELS, MAX_REPORTED_ERRORS, feature_to_item, iter_ndjson,
+    iter_batches, validate_batch, insert_rows,
+)
+from ..imports.readers import iter_json_document
+from ..utils.versions import bump_version
+from ..graph import network_graph, port_index
+import io
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+def is_ndjson(request):
+    return request.content_type in NDJSON_TYPES or request.params.get('format') == 'ndjson'
+
+
+@view_config(route_name='api_bulk', request_method='POST', permission=AUTHENTICATED)
+def bulk_import(request):
+    """Пакетная загрузка nodes/vols/fibers/links из NDJSON или GeoJSON
+
+    Параметры:
+    - dry_run=1 - только валидация, без записи;
+    - skip_invalid=1 - записать корректные объекты, даже если есть ошибки
+      (по умолчанию при любой ошибке не записывается ничего).
+    Все записи выполняются в одной транзакции.
+    """
+    bulk_model = BULK_MODELS.get(request.matchdict['model'])
+    if bulk_model is None:
+        return Response(
+            json_body={'error': 'Unknown model', 'models': sorted(BULK_MODELS)},
+            status=404,
+            content_type='application/json'
+        )
+
+    if not hasattr(request, 'db') or request.db is None:
+        return Response(
+            json_body={'error': 'Database session not available'},
+            status=500,
+            content_type='application/json'
+        )
+
+    dry_run = asbool(request.params.get('dry_run', False))
+    skip_invalid = asbool(request.params.get('skip_invalid', False))
+
+    db = request.db
+    received = 0
+    ids = []
+    errors = []
+    error_count = 0
+
+    try:
+        stream = io.TextIOWrapper(request.body_file, encoding='utf-8')
+        objects = iter_ndjson(stream) if is_ndjson(request) else iter_json_document(stream)
+
+        for batch in iter_batches(objects):
+            items = [feature_to_item(bulk_model, obj) for obj in batch]
+            rows, batch_errors = validate_batch(bulk_model, items, offset=received)
+            received += len(items)
+            error_count += len(batch_errors)
+            errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+
+            # Без skip_invalid после первой ошибки только валидируем остаток
+            if dry_run or (error_count and not skip_invalid):
+                continue
+            ids.extend(insert_rows(db, bulk_model, rows))
+    except ValueError as e:
+        # В т.ч. json.JSONDecodeError и ImportFormatError потокового разбора
+        db.rollback()
+        return Response(
+            json_body={'error': 'Invalid input', 'message': str(e), 'received': received},
+            status=400,
+            content_type='application/json'
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f'Ошибка пакетной загрузки {bulk_model.table}: {e}')
+        logger.error(traceback.format_exc())
+        return Response(
+            json_body={'error': 'Database error', 'message': str(e), 'received': received},
+            status=500,
+            content_type='application/json'
+        )
+
+    written = not dry_run and (skip_invalid or not error_count)
+    if written:
+        db.commit()
+        bump_version(bulk_model.table)
+        if bulk_model.table in ('vols', 'links'):
+            # Граф перечитается из БД при следующем запросе
+            network_graph.reset()
+        if bulk_model.table == 'links':
+            port_index.reset()
+        logger.info(f'Пакетная загрузка {bulk_model.table}: записано {len(ids)} из {received}')
+    else:
+        db.rollback()
+
+    result = {
+        'model': bulk_model.table,
+        'dry_run': dry_run,
+        'received': received,
+        'valid': received - error_count,
+        'inserted': len(ids) if written else 0,
+        'ids': ids if written else [],
+        'error_count': error_count,
+        'errors': errors,
+    }
+    return Response(
+        json_body=result,
+        status=200 if written or dry_run else 422,
+        content_type='application/json'
+    )
@@ -2,77 +2,306 @@
 from pyramid.view import view_config
 from pyramid.response import Response
 from sqlalchemy import func
-from geoalchemy2.shape import to_shape
+from sqlalchemy.orm import Session
 from ..models.nodes import Node
 from ..models.vols import Vols
 from ..models.fibers import Fiber
 from ..models.links import Link
-from ..auth.decorators import require_auth
+from ..auth.security import AUTHENTICATED
+from ..utils.serialization import node_columns, node_row_to_dict, vols_columns, vols_row_to_dict
+from ..utils.etag import conditional_get
+from ..utils.wire import wants_msgpack, packb, MSGPACK_TYPE
 import logging
 import traceback
 import json
 import csv
 import io
+import textwrap
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
 
-def nodes_to_geojson(nodes):
-    """Преобразует узлы в GeoJSON"""
-    features = []
-    for node in nodes:
-        if node.geom:
-            shape = to_shape(node.geom)
-            features.append({
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [shape.x, shape.y]
-                },
-                "properties": {
-                    "id": node.id,
-                    "name": node.name,
-                    "description": node.description,
-                    "node_type": node.node_type,
-                    "status": node.status,
-                    "meta_data": node.meta_data
-                }
-            })
+# Размер пачки строк, читаемых из серверного курсора
+EXPORT_BATCH_SIZE = 1000
+
+# Примерный размер куска ответа, отдаваемого WSGI серверу
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def node_properties(row):
+    """Свойства GeoJSON feature для узла"""
     return {
-        "type": "FeatureCollection",
-        "features": features
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "node_type": row.node_type,
+        "status": row.status,
+        "meta_data": row.meta_data
     }
 
 
-def vols_to_geojson(vols_list):
-    """Преобразует маршруты в GeoJSON"""
-    features = []
-    for vols in vols_list:
-        if vols.path:
-            shape = to_shape(vols.path)
-            features.append({
-                "type": "Feature",
-                "geometry": {
-                    "type": "LineString",
-                    "coordinates": [[coord[0], coord[1]] for coord in shape.coords]
-                },
-                "properties": {
-                    "id": vols.id,
-                    "name": vols.name,
-                    "description": vols.description,
-                    "status": vols.status,
-                    "length_km": float(vols.length_km) if vols.length_km else None,
-                    "meta_data": vols.meta_data
-                }
-            })
+def vols_properties(row):
+    """Свойства GeoJSON feature для маршрута"""
     return {
-        "type": "FeatureCollection",
-        "features": features
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "status": row.status,
+        "length_km": float(row.length_km) if row.length_km else None,
+        "meta_data": row.meta_data
     }
 
 
-@view_config(route_name='api_export_nodes_geojson', request_method='GET')
-@require_auth
+def iter_feature_collection(rows, make_properties, indent=True):
+    """Потоково формирует GeoJSON FeatureCollection
+
+    rows - строки с колонкой geometry, уже сериализованной в БД через
+    ST_AsGeoJSON. В компактном режиме геометрия вставляется в ответ как есть,
+    без разбора. Отдает байтовые куски размером около EXPORT_CHUNK_SIZE.
+    """
+    if indent:
+        header = '{\n  "type": "FeatureCollection",\n  "features": [\n'
+        separator = ',\n'
+        footer = '\n  ]\n}\n'
+    else:
+        header = '{"type":"FeatureCollection","features":['
+        separator = ','
+        footer = ']}'
+
+    chunk = [header]
+    size = len(header)
+    first = True
+    for row in rows:
+        if row.geometry is None:
+            continue
+        properties = make_properties(row)
+        if indent:
+            feature = {
+                "type": "Feature",
+                "geometry": json.loads(row.geometry),
+                "properties": properties
+            }
+            text = textwrap.indent(json.dumps(feature, ensure_ascii=False, indent=2), '    ')
+        else:
+            text = '{"type":"Feature","geometry":%s,"properties":%s}' % (
+                row.geometry,
+                json.dumps(properties, ensure_ascii=False, separators=(',', ':'))
+            )
+        if not first:
+            text = separator + text
+        first = False
+        chunk.append(text)
+        size += len(text)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+            size = 0
+    chunk.append(footer)
+    yield ''.join(chunk).encode('utf-8')
+
+
+def iter_msgpack_features(rows, make_properties, layer):
+    """Потоковая выгрузка в MessagePack
+
+    Поток из последовательных объектов MessagePack (читается
+    msgpack.Unpacker): заголовок {"type": "FeatureCollection", "layer": ...},
+    затем по объекту на Feature с геометрией в WKB (колонка geometry -
+    результат ST_AsBinary).
+    """
+    chunk = [packb({'type': 'FeatureCollection', 'layer': layer})]
+    size = len(chunk[0])
+    for row in rows:
+        if row.geometry is None:
+            continue
+        data = packb({
+            'type': 'Feature',
+            'geometry': bytes(row.geometry),
+            'properties': make_properties(row)
+        })
+        chunk.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def stream_export(bind, build_query, make_properties, indent=True, layer=None):
+    """Генератор ответа экспорта на отдельной сессии
+
+    Сессия запроса закрывается в db_close_tween до того, как WSGI сервер
+    начнет читать app_iter, поэтому выгрузка открывает свою сессию и
+    закрывает ее, когда ответ дочитан (или клиент отключился).
+    Строки читаются серверным курсором пачками по EXPORT_BATCH_SIZE.
+    С layer выгрузка идет в MessagePack (iter_msgpack_features).
+    """
+    session = Session(bind=bind)
+    try:
+        rows = build_query(session).yield_per(EXPORT_BATCH_SIZE)
+        if layer is not None:
+            yield from iter_msgpack_features(rows, make_properties, layer)
+        else:
+            yield from iter_feature_collection(rows, make_properties, indent)
+    finally:
+        session.close()
+
+
+def is_compact(request):
+    """Компактный режим выгрузки (без отступов): ?compact=1"""
+    return request.params.get('compact', '').lower() in ('1', 'true', 'yes')
+
+
+# COPY выгрузки: заголовки колонок совпадают с прежним CSV форматом
+NODES_CSV_COPY_SQL = """
+    COPY (
+        SELECT id AS "ID", name AS "Name", description AS "Description",
+               node_type AS "Type", status AS "Status",
+               ST_Y(geom) AS "Latitude", ST_X(geom) AS "Longitude"
+        FROM nodes
+        WHERE geom IS NOT NULL
+        ORDER BY id
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+FIBERS_CSV_COPY_SQL = """
+    COPY (
+        SELECT id AS "ID", name AS "Name", cable_type AS "Cable Type",
+               fiber_count AS "Fiber Count", status AS "Status", vols_id AS "Vols ID"
+        FROM fibers
+        ORDER BY id
+    ) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+# Сколько кусков COPY может ждать отправки клиенту
+COPY_QUEUE_SIZE = 16
+
+_COPY_DONE = object()
+
+
+class _CopyCancelled(Exception):
+    """Клиент перестал читать ответ, COPY нужно прервать"""
+
+
+class _QueueWriter:
+    """File-like объект для COPY, передающий куски в очередь
+
+    Очередь ограничена, поэтому COPY ждет, пока клиент прочитает
+    предыдущие куски, и в памяти не накапливается весь файл.
+    """
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data):
+        if self.cancelled.is_set():
+            raise _CopyCancelled()
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.chunks.put(data)
+        return len(data)
+
+
+# Драйверы PostgreSQL с COPY TO STDOUT: psycopg2 (copy_expert) и psycopg 3 (cursor.copy)
+COPY_DRIVERS = ('psycopg2', 'psycopg2cffi', 'psycopg')
+
+
+def supports_copy(bind):
+    """COPY TO STDOUT доступен через драйверы psycopg2 и psycopg 3"""
+    return bind.dialect.name == 'postgresql' and bind.dialect.driver in COPY_DRIVERS
+
+
+def copy_to(cursor, sql, writer):
+    """Выполняет COPY ... TO STDOUT, передавая данные в writer.write()"""
+    if hasattr(cursor, 'copy_expert'):
+        # psycopg2
+        cursor.copy_expert(sql, writer)
+    else:
+        # psycopg 3
+        with cursor.copy(sql) as copy:
+            for data in copy:
+                writer.write(bytes(data))
+
+
+def stream_copy(bind, sql):
+    """Потоково отдает результат COPY ... TO STDOUT
+
+    COPY выполняется в отдельном потоке и пишет куски в ограниченную
+    очередь, генератор забирает их оттуда. Если клиент отключился раньше
+    конца выгрузки, запрос отменяется на сервере (connection.cancel()),
+    а не только при следующей записи в очередь.
+    """
+    connection = bind.raw_connection()
+    chunks = queue.Queue(maxsize=COPY_QUEUE_SIZE)
+    cancelled = threading.Event()
+
+    def run_copy():
+        try:
+            cursor = connection.cursor()
+            try:
+                copy_to(cursor, sql, _QueueWriter(chunks, cancelled))
+            finally:
+                cursor.close()
+            chunks.put(_COPY_DONE)
+        except _CopyCancelled:
+            pass
+        except Exception as e:
+            if cancelled.is_set():
+                # Запрос отменен после отключения клиента
+                return
+            logger.error(f'Ошибка COPY выгрузки: {e}')
+            chunks.put(e)
+
+    worker = threading.Thread(target=run_copy, name='csv-copy', daemon=True)
+    worker.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _COPY_DONE:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Клиент отключился раньше времени: отменяем запрос и разблокируем поток COPY
+        cancelled.set()
+        if worker.is_alive():
+            try:
+                connection.driver_connection.cancel()
+            except Exception as e:
+                logger.warning(f'Не удалось отменить COPY: {e}')
+        while worker.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        connection.close()
+
+
+def stream_csv_rows(bind, build_query, header, make_row):
+    """Запасной вариант без COPY: серверный курсор и csv.writer по пачкам"""
+    session = Session(bind=bind)
+    try:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for row in build_query(session).yield_per(EXPORT_BATCH_SIZE):
+            writer.writerow(make_row(row))
+            if output.tell() >= EXPORT_CHUNK_SIZE:
+                yield output.getvalue().encode('utf-8')
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue().encode('utf-8')
+    finally:
+        session.close()
+
+
+@view_config(route_name='api_export_nodes_geojson', request_method='GET', permission=AUTHENTICATED)
+@conditional_get('nodes')
 def export_nodes_geojson(request):
     """Экспорт узлов в GeoJSON"""
     try:
@@ -83,17 +312,36 @@ def export_nodes_geojson(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        nodes = db.query(Node).all()
+        msgpack_format = wants_msgpack(request)
+        if msgpack_format:
+            geometry = func.ST_AsBinary(Node.geom, 'NDR')
+        else:
+            geometry = func.ST_AsGeoJSON(Node.geom)
+        
+        def build_query(session):
+            return session.query(
+                Node.id,
+                Node.name,
+                Node.description,
+                Node.node_type,
+                Node.status,
+                Node.meta_data,
+                geometry.label('geometry')
+            ).order_by(Node.id)
         
-        geojson = nodes_to_geojson(nodes)
+        app_iter = stream_export(
+            request.db.get_bind(),
+            build_query,
+            node_properties,
+            indent=not is_compact(request),
+            layer='nodes' if msgpack_format else None
+        )
         
+        filename = 'nodes.msgpack' if msgpack_format else 'nodes.geojson'
         return Response(
-            body=json.dumps(geojson, ensure_ascii=False, indent=2),
-            content_type='application/geo+json',
-            headers={
-                'Content-Disposition': 'attachment; filename="nodes.geojson"'
-            }
+            app_iter=app_iter,
+            content_type=MSGPACK_TYPE if msgpack_format else 'application/geo+json',
+            content_disposition=f'attachment; filename="{filename}"'
         )
     except Exception as e:
         logger.error(f'Ошибка экспорта узлов: {e}')
@@ -104,8 +352,8 @@ def export_nodes_geojson(request):
         )
 
 
-@view_config(route_name='api_export_vols_geojson', request_method='GET')
-@require_auth
+@view_config(route_name='api_export_vols_geojson', request_method='GET', permission=AUTHENTICATED)
+@conditional_get('vols')
 def export_vols_geojson(request):
     """Экспорт маршрутов в GeoJSON"""
     try:
@@ -116,17 +364,36 @@ def export_vols_geojson(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        vols_list = db.query(Vols).all()
+        msgpack_format = wants_msgpack(request)
+        if msgpack_format:
+            geometry = func.ST_AsBinary(Vols.path, 'NDR')
+        else:
+            geometry = func.ST_AsGeoJSON(Vols.path)
         
-        geojson = vols_to_geojson(vols_list)
+        def build_query(session):
+            return session.query(
+                Vols.id,
+                Vols.name,
+                Vols.description,
+                Vols.status,
+                Vols.length_km,
+                Vols.meta_data,
+                geometry.label('geometry')
+            ).order_by(Vols.id)
         
+        app_iter = stream_export(
+            request.db.get_bind(),
+            build_query,
+            vols_properties,
+            indent=not is_compact(request),
+            layer='vols' if msgpack_format else None
+        )
+        
+        filename = 'vols.msgpack' if msgpack_format else 'vols.geojson'
         return Response(
-            body=json.dumps(geojson, ensure_ascii=False, indent=2),
-            content_type='application/geo+json',
-            headers={
-                'Content-Disposition': 'attachment; filename="vols.geojson"'
-            }
+            app_iter=app_iter,
+            content_type=MSGPACK_TYPE if msgpack_format else 'application/geo+json',
+            content_disposition=f'attachment; filename="{filename}"'
         )
     except Exception as e:
         logger.error(f'Ошибка экспорта маршрутов: {e}')
@@ -137,8 +404,8 @@ def export_vols_geojson(request):
         )
 
 
-@view_config(route_name='api_export_nodes_csv', request_method='GET')
-@require_auth
+@view_config(route_name='api_export_nodes_csv', request_method='GET', permission=AUTHENTICATED)
+@conditional_get('nodes')
 def export_nodes_csv(request):
     """Экспорт узлов в CSV"""
     try:
@@ -149,35 +416,40 @@ def export_nodes_csv(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        nodes = db.query(Node).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Заголовки
-        writer.writerow(['ID', 'Name', 'Description', 'Type', 'Status', 'Latitude', 'Longitude'])
-        
-        # Данные
-        for node in nodes:
-            if node.geom:
-                shape = to_shape(node.geom)
-                writer.writerow([
-                    node.id,
-                    node.name or '',
-                    node.description or '',
-                    node.node_type or '',
-                    node.status or '',
-                    shape.y,
-                    shape.x
-                ])
+        bind = request.db.get_bind()
+        if supports_copy(bind):
+            app_iter = stream_copy(bind, NODES_CSV_COPY_SQL)
+        else:
+            def build_query(session):
+                return session.query(
+                    Node.id,
+                    Node.name,
+                    Node.description,
+                    Node.node_type,
+                    Node.status,
+                    func.ST_Y(Node.geom).label('lat'),
+                    func.ST_X(Node.geom).label('lon')
+                ).filter(Node.geom.isnot(None)).order_by(Node.id)
+            
+            app_iter = stream_csv_rows(
+                bind,
+                build_query,
+                ['ID', 'Name', 'Description', 'Type', 'Status', 'Latitude', 'Longitude'],
+                lambda row: [
+                    row.id,
+                    row.name or '',
+                    row.description or '',
+                    row.node_type or '',
+                    row.status or '',
+                    row.lat,
+                    row.lon
+                ]
+            )
         
         return Response(
-            body=output.getvalue(),
+            app_iter=app_iter,
             content_type='text/csv; charset=utf-8',
-            headers={
-                'Content-Disposition': 'attachment; filename="nodes.csv"'
-            }
+            content_disposition='attachment; filename="nodes.csv"'
         )
     except Exception as e:
         logger.error(f'Ошибка экспорта узлов в CSV: {e}')
@@ -188,8 +460,8 @@ def export_nodes_csv(request):
         )
 
 
-@view_config(route_name='api_export_fibers_csv', request_method='GET')
-@require_auth
+@view_config(route_name='api_export_fibers_csv', request_method='GET', permission=AUTHENTICATED)
+@conditional_get('fibers')
 def export_fibers_csv(request):
     """Экспорт волокон в CSV"""
     try:
@@ -200,32 +472,38 @@ def export_fibers_csv(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        fibers = db.query(Fiber).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Заголовки
-        writer.writerow(['ID', 'Name', 'Cable Type', 'Fiber Count', 'Status', 'Vols ID'])
-        
-        # Данные
-        for fiber in fibers:
-            writer.writerow([
-                fiber.id,
-                fiber.name or '',
-                fiber.cable_type or '',
-                fiber.fiber_count or '',
-                fiber.status or '',
-                fiber.vols_id or ''
-            ])
+        bind = request.db.get_bind()
+        if supports_copy(bind):
+            app_iter = stream_copy(bind, FIBERS_CSV_COPY_SQL)
+        else:
+            def build_query(session):
+                return session.query(
+                    Fiber.id,
+                    Fiber.name,
+                    Fiber.cable_type,
+                    Fiber.fiber_count,
+                    Fiber.status,
+                    Fiber.vols_id
+                ).order_by(Fiber.id)
+            
+            app_iter = stream_csv_rows(
+                bind,
+                build_query,
+                ['ID', 'Name', 'Cable Type', 'Fiber Count', 'Status', 'Vols ID'],
+                lambda row: [
+                    row.id,
+                    row.name or '',
+                    row.cable_type or '',
+                    row.fiber_count or '',
+                    row.status or '',
+                    row.vols_id or ''
+                ]
+            )
         
         return Response(
-            body=output.getvalue(),
+            app_iter=app_iter,
             content_type='text/csv; charset=utf-8',
-            headers={
-                'Content-Disposition': 'attachment; filename="fibers.csv"'
-            }
+            content_disposition='attachment; filename="fibers.csv"'
         )
     except Exception as e:
         logger.error(f'Ошибка экспорта волокон в CSV: {e}')
@@ -236,10 +514,10 @@ def export_fibers_csv(request):
         )
 
 
-@view_config(route_name='api_export_all_json', request_method='GET')
-@require_auth
+@view_config(route_name='api_export_all_json', request_method='GET', permission=AUTHENTICATED)
+@conditional_get('nodes', 'vols', 'fibers', 'links')
 def export_all_json(request):
-    """Экспорт всех данных в JSON"""
+    """Экспорт всех данных в JSON (или MessagePack, см. utils/wire.py)"""
     try:
         if not hasattr(request, 'db') or request.db is None:
             return Response(
@@ -251,33 +529,30 @@ def export_all_json(request):
         db = request.db
         
         # Получаем все данные
-        nodes = db.query(Node).all()
-        vols_list = db.query(Vols).all()
+        nodes = db.query(*node_columns()).order_by(Node.id).all()
+        vols_list = db.query(*vols_columns()).order_by(Vols.id).all()
         fibers = db.query(Fiber).all()
         links = db.query(Link).all()
         
-        # Преобразуем в словари
+        # Преобразуем в словари (координаты уже вычислены в SQL)
         data = {
-            'nodes': [node.to_dict() for node in nodes],
-            'vols': [],
+            'nodes': [node_row_to_dict(row) for row in nodes],
+            'vols': [vols_row_to_dict(row) for row in vols_list],
             'fibers': [fiber.to_dict() for fiber in fibers],
             'links': [link.to_dict() for link in links]
         }
         
-        # Обрабатываем маршруты с геометрией
-        for vols in vols_list:
-            vols_dict = vols.to_dict()
-            if vols.path:
-                shape = to_shape(vols.path)
-                vols_dict['path'] = [[coord[0], coord[1]] for coord in shape.coords]
-            data['vols'].append(vols_dict)
-        
+        if wants_msgpack(request):
+            return Response(
+                body=packb(data),
+                content_type=MSGPACK_TYPE,
+                content_disposition='attachment; filename="vols_gis_export.msgpack"'
+            )
         return Response(
-            body=json.dumps(data, ensure_ascii=False, indent=2),
+            body=json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'),
             content_type='application/json',
-            headers={
-                'Content-Disposition': 'attachment; filename="vols_gis_export.json"'
-            }
+            charset='utf-8',
+            content_disposition='attachment; filename="vols_gis_export.json"'
         )
     except Exception as e:
         logger.error(f'Ошибка экспорта всех данных: {e}')
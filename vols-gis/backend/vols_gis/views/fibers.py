@@ -2,9 +2,18 @@
 from pyramid.view import view_config
 from ..models.fibers import Fiber
 from ..schemas.fibers import FiberCreate, FiberUpdate
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..utils.etag import conditional_get
+from ..utils.meta_filter import apply_meta_filters
+from ..utils.response_cache import cached_response
+from ..utils.versions import bump_version
+from ..utils.expand import FIBERS_EXPAND, parse_expand, expand_tables, fiber_to_dict, fibers_options
+from ..graph import network_graph
+from ..graph.network import EDGE_LINK, fiber_link_edges
 
 
 @view_config(route_name='api_fibers_list', request_method='GET')
+@conditional_get('fibers', extra=expand_tables(FIBERS_EXPAND))
 def fibers_list(request):
     """Список всех волокон"""
     import logging
@@ -32,8 +41,19 @@ def fibers_list(request):
         
         logger.info('DB сессия получена, выполняем запрос')
         
+        # Связи волокон страницы (expand=links) - одним запросом
+        try:
+            expand = parse_expand(request.params.get('expand'), FIBERS_EXPAND)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid expand', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
         # Параметры поиска и фильтрации
-        query = db.query(Fiber)
+        query = db.query(Fiber).options(*fibers_options(expand))
         
         # Фильтр по маршруту
         vols_id = request.params.get('vols_id')
@@ -53,8 +73,30 @@ def fibers_list(request):
         if search:
             query = query.filter(Fiber.name.ilike(f'%{search}%'))
         
+        # Фильтры по meta_data (meta.<key>=, meta_contains=) - GIN индекс jsonb_path_ops
+        try:
+            query = apply_meta_filters(query, Fiber.meta_data, request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid meta filter', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        # Keyset пагинация (limit, after_id)
+        try:
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
         try:
-            fibers = query.all()
+            fibers, next_cursor = paginate(query, Fiber.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             from pyramid.response import Response
@@ -72,12 +114,12 @@ def fibers_list(request):
         fibers_list = []
         for f in fibers:
             try:
-                fibers_list.append(f.to_dict())
+                fibers_list.append(fiber_to_dict(f, 'links' in expand))
             except Exception as e:
                 logger.warning(f'Ошибка при преобразовании волокна {f.id}: {e}')
                 continue
         
-        result = {'fibers': fibers_list, 'count': len(fibers_list)}
+        result = page_response('fibers', fibers_list, next_cursor, request, db, 'fibers')
         logger.info(f'Список волокон успешно сформирован: {len(fibers_list)} элементов')
         from pyramid.response import Response
         return Response(
@@ -124,6 +166,7 @@ def fibers_create(request):
         )
         db.add(fiber)
         db.commit()
+        bump_version('fibers')
         
         from pyramid.response import Response
         return Response(json_body={'fiber': fiber.to_dict()}, status=201)
@@ -133,6 +176,7 @@ def fibers_create(request):
 
 
 @view_config(route_name='api_fibers_get', request_method='GET', renderer='json')
+@cached_response('fibers')
 def fibers_get(request):
     """Получить волокно по ID"""
     fiber_id = int(request.matchdict['id'])
@@ -167,12 +211,18 @@ def fibers_update(request):
             fiber.fiber_count = schema.fiber_count
         if schema.status is not None:
             fiber.status = schema.status
+        route_changed = schema.vols_id is not None and schema.vols_id != fiber.vols_id
         if schema.vols_id is not None:
             fiber.vols_id = schema.vols_id
         if schema.meta_data is not None:
             fiber.meta_data = schema.meta_data
         
         db.commit()
+        bump_version('fibers')
+        if route_changed and network_graph.loaded:
+            # Вес связей волокна - длина его нового маршрута
+            for link_id, start_id, end_id, weight in fiber_link_edges(db, fiber.id):
+                network_graph.upsert_edge(EDGE_LINK, link_id, start_id, end_id, weight)
         
         return {'fiber': fiber.to_dict()}
     except Exception as e:
@@ -181,6 +231,7 @@ def fibers_update(request):
 
 
 @view_config(route_name='api_fibers_by_vols', request_method='GET', renderer='json')
+@cached_response('fibers')
 def fibers_by_vols(request):
     """Получить волокна по ВОЛС маршруту"""
     vols_id = int(request.matchdict['vols_id'])
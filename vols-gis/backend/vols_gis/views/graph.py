@@ -0,0 +1,97 @@
+"""Views для запросов к графу сети (кратчайший путь, достижимость)"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from ..graph import network_graph
+from ..models.nodes import Node
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _node_param(request, name):
+    value = request.params.get(name)
+    if value is None:
+        raise ValueError(f'Не указан параметр {name}')
+    return int(value)
+
+
+def _ensure_graph(request):
+    """Загружает граф (первый запрос или истек TTL); None, если БД недоступна"""
+    if getattr(request, 'db', None) is None:
+        return network_graph if network_graph.loaded else None
+    try:
+        network_graph.ensure_loaded(request.db)
+    except Exception as e:
+        logger.error(f'Ошибка загрузки графа сети: {e}')
+        request.db.rollback()
+        return None
+    return network_graph
+
+
+def _db_unavailable():
+    return Response(
+        json_body={'error': 'Database session not available'},
+        status=503,
+        content_type='application/json'
+    )
+
+
+@view_config(route_name='api_graph_path', request_method='GET')
+def graph_path(request):
+    """Кратчайший путь между узлами по длине маршрутов (length_km)"""
+    try:
+        from_id = _node_param(request, 'from')
+        to_id = _node_param(request, 'to')
+    except ValueError as e:
+        return Response(json_body={'error': str(e)}, status=400, content_type='application/json')
+    
+    graph = _ensure_graph(request)
+    if graph is None:
+        return _db_unavailable()
+    
+    path = graph.shortest_path(from_id, to_id)
+    if path is None:
+        return Response(
+            json_body={'error': 'Path not found', 'from': from_id, 'to': to_id},
+            status=404,
+            content_type='application/json'
+        )
+    
+    return Response(
+        json_body={'from': from_id, 'to': to_id, **path},
+        content_type='application/json'
+    )
+
+
+@view_config(route_name='api_graph_reachable', request_method='GET')
+def graph_reachable(request):
+    """Узлы, достижимые из узла; max_hops ограничивает окрестность"""
+    try:
+        from_id = _node_param(request, 'from')
+        max_hops = request.params.get('max_hops')
+        max_hops = int(max_hops) if max_hops else None
+        if max_hops is not None and max_hops < 0:
+            raise ValueError('max_hops должен быть неотрицательным')
+    except ValueError as e:
+        return Response(json_body={'error': str(e)}, status=400, content_type='application/json')
+    
+    graph = _ensure_graph(request)
+    if graph is None:
+        return _db_unavailable()
+    
+    reachable = graph.reachable(from_id, max_hops)
+    if reachable is None and request.db.query(Node.id).filter(Node.id == from_id).first():
+        # Узел без маршрутов и связей
+        reachable = [(from_id, 0)]
+    if reachable is None:
+        return Response(
+            json_body={'error': 'Node not found in graph', 'from': from_id},
+            status=404,
+            content_type='application/json'
+        )
+    
+    nodes = [{'id': node_id, 'hops': hops} for node_id, hops in sorted(reachable, key=lambda item: item[1])]
+    return Response(
+        json_body={'from': from_id, 'max_hops': max_hops, 'nodes': nodes, 'count': len(nodes)},
+        content_type='application/json'
+    )
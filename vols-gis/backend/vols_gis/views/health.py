@@ -0,0 +1,26 @@
+"""Views для мониторинга состояния сервиса"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from ..db_pool import pool_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@view_config(route_name='api_health_db', request_method='GET')
+def health_db(request):
+    """Состояние БД и статистика пула соединений"""
+    engine = request.registry.get('db_engine')
+    if engine is None:
+        return Response(
+            json_body={'error': 'Database not configured', 'healthy': False},
+            status=503,
+            content_type='application/json'
+        )
+    
+    stats = pool_stats(engine, request.registry.get('db_health_checker'))
+    return Response(
+        json_body={'pool': stats},
+        status=503 if stats.get('healthy') is False else 200,
+        content_type='application/json'
+    )
@@ -0,0 +1,116 @@
+"""Views для импорта файлов (GeoJSON, GeoPackage, Shapefile)"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from ..auth.security import AUTHENTICATED
+from ..imports import ImportJob, detect_format, import_manager
+import json
+import os
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MODELS = ('nodes', 'vols')
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _bad_request(message):
+    return Response(
+        json_body={'error': 'Invalid import request', 'message': message},
+        status=400,
+        content_type='application/json'
+    )
+
+
+@view_config(route_name='api_imports', request_method='POST', permission=AUTHENTICATED)
+def imports_create(request):
+    """Загрузка файла и постановка задачи импорта в очередь
+
+    Файл передается полем file (multipart/form-data) или телом запроса.
+    Параметры: format (geojson|gpkg|shp, по умолчанию по имени/сигнатуре),
+    model (nodes|vols, по умолчанию по типу геометрии), srid (система
+    координат файла), layer (слой GeoPackage), mapping (JSON {поле: атрибут}).
+    Ответ 202 сразу после сохранения файла, прогресс - GET /api/imports/{id}.
+    """
+    if import_manager.engine is None:
+        return Response(
+            json_body={'error': 'Database not configured'},
+            status=503,
+            content_type='application/json'
+        )
+    
+    params = request.params
+    model = params.get('model') or None
+    if model is not None and model not in IMPORT_MODELS:
+        return _bad_request(f'model должен быть одним из: {", ".join(IMPORT_MODELS)}')
+    try:
+        srid = int(params['srid']) if params.get('srid') else None
+        mapping = json.loads(params['mapping']) if params.get('mapping') else None
+    except ValueError as e:
+        return _bad_request(str(e))
+    if mapping is not None and not isinstance(mapping, dict):
+        return _bad_request('mapping должен быть JSON объектом {поле: атрибут}')
+    
+    upload = request.POST.get('file') if request.content_type == 'multipart/form-data' else None
+    if upload is not None and hasattr(upload, 'file'):
+        source, filename = upload.file, upload.filename
+    else:
+        source, filename = request.body_file, params.get('filename')
+    
+    # Тело запроса уже буферизовано сервером (waitress), здесь только копия
+    # на диск: разбор и запись в БД выполняются в рабочем потоке
+    suffix = os.path.splitext(filename)[1] if filename else ''
+    with import_manager.create_upload_file(suffix) as f:
+        shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
+        path = f.name
+    
+    file_format = params.get('format') or detect_format(path, filename)
+    if file_format not in ('geojson', 'gpkg', 'shp'):
+        os.remove(path)
+        return _bad_request('format должен быть одним из: geojson, gpkg, shp')
+    
+    job = import_manager.submit(ImportJob(
+        path, file_format,
+        filename=filename,
+        model=model,
+        srid=srid,
+        layer=params.get('layer') or None,
+        mapping=mapping
+    ))
+    logger.info(f'Импорт {job.id} поставлен в очередь: {filename or "тело запроса"} ({file_format})')
+    
+    response = Response(
+        json_body={'import': job.to_dict()},
+        status=202,
+        content_type='application/json'
+    )
+    response.location = request.route_url('api_imports_get', id=job.id)
+    return response
+
+
+@view_config(route_name='api_imports', request_method='GET', permission=AUTHENTICATED)
+def imports_list(request):
+    """Последние задачи импорта"""
+    jobs = [job.to_dict() for job in import_manager.jobs()]
+    for job in jobs:
+        job.pop('errors')
+    return Response(
+        json_body={'imports': jobs, 'count': len(jobs)},
+        content_type='application/json'
+    )
+
+
+@view_config(route_name='api_imports_get', request_method='GET', permission=AUTHENTICATED)
+def imports_get(request):
+    """Состояние задачи импорта"""
+    job = import_manager.get(request.matchdict['id'])
+    if job is None:
+        return Response(
+            json_body={'error': 'Import not found'},
+            status=404,
+            content_type='application/json'
+        )
+    return Response(
+        json_body={'import': job.to_dict()},
+        content_type='application/json'
+    )
@@ -2,9 +2,17 @@
 from pyramid.view import view_config
 from ..models.links import Link
 from ..schemas.links import LinkCreate, LinkUpdate
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..utils.etag import conditional_get
+from ..utils.meta_filter import apply_meta_filters
+from ..utils.response_cache import cached_response
+from ..utils.versions import bump_version
+from ..graph import network_graph, port_index
+from ..graph.network import EDGE_LINK, link_weight
 
 
 @view_config(route_name='api_links_list', request_method='GET')
+@conditional_get('links')
 def links_list(request):
     """Список всех связей"""
     import logging
@@ -64,8 +72,30 @@ def links_list(request):
         if status:
             query = query.filter(Link.status == status)
         
+        # Фильтры по meta_data (meta.<key>=, meta_contains=) - GIN индекс jsonb_path_ops
         try:
-            links = query.all()
+            query = apply_meta_filters(query, Link.meta_data, request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid meta filter', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        # Keyset пагинация (limit, after_id)
+        try:
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        try:
+            links, next_cursor = paginate(query, Link.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             from pyramid.response import Response
@@ -88,7 +118,7 @@ def links_list(request):
                 logger.warning(f'Ошибка при преобразовании связи {l.id}: {e}')
                 continue
         
-        result = {'links': links_list, 'count': len(links_list)}
+        result = page_response('links', links_list, next_cursor, request, db, 'links')
         logger.info(f'Список связей успешно сформирован: {len(links_list)} элементов')
         from pyramid.response import Response
         return Response(
@@ -117,6 +147,30 @@ def links_list(request):
         )
 
 
+def port_conflict_response(request, conflicts):
+    """409 с перечнем занятых портов"""
+    request.response.status = 409
+    return {'error': 'Port conflict', 'conflicts': conflicts}
+
+
+def commit_link(request, link, exclude_link_id=None):
+    """Проверяет порты связи по индексу и фиксирует запись; 409 при конфликте, иначе None
+
+    Проверка и commit идут под блокировкой индекса портов: два запроса
+    процесса не пройдут проверку на один порт одновременно.
+    """
+    db = request.db
+    with port_index.locked():
+        conflicts = port_index.conflicts(link.start_node_id, link.start_port,
+                                         link.end_node_id, link.end_port, exclude_link_id=exclude_link_id)
+        if conflicts:
+            db.rollback()
+            return port_conflict_response(request, conflicts)
+        db.commit()
+        port_index.upsert_link(link)
+    return None
+
+
 @view_config(route_name='api_links_list', request_method='POST', renderer='json')
 def links_create(request):
     """Создание новой связи"""
@@ -125,6 +179,9 @@ def links_create(request):
         schema = LinkCreate(**data)
         
         db = request.db
+        # Порты на концах связи должны быть свободны (индекс портов, без сканирования links)
+        port_index.ensure_loaded(db)
+        
         link = Link(
             fiber_id=schema.fiber_id,
             start_node_id=schema.start_node_id,
@@ -136,7 +193,13 @@ def links_create(request):
             meta_data=schema.meta_data
         )
         db.add(link)
-        db.commit()
+        conflict = commit_link(request, link)
+        if conflict is not None:
+            return conflict
+        bump_version('links')
+        if network_graph.loaded:
+            network_graph.upsert_edge(EDGE_LINK, link.id, link.start_node_id, link.end_node_id,
+                                      link_weight(db, link.fiber_id))
         
         from pyramid.response import Response
         return Response(json_body={'link': link.to_dict()}, status=201)
@@ -146,6 +209,7 @@ def links_create(request):
 
 
 @view_config(route_name='api_links_get', request_method='GET', renderer='json')
+@cached_response('links')
 def links_get(request):
     """Получить связь по ID"""
     link_id = int(request.matchdict['id'])
@@ -172,6 +236,9 @@ def links_update(request):
         if not link:
             return {'error': 'Link not found'}, 404
         
+        # До изменения атрибутов: загрузка индекса не должна увидеть несохраненную связь
+        port_index.ensure_loaded(db)
+        
         if schema.fiber_id is not None:
             link.fiber_id = schema.fiber_id
         if schema.start_node_id is not None:
@@ -189,7 +256,13 @@ def links_update(request):
         if schema.meta_data is not None:
             link.meta_data = schema.meta_data
         
-        db.commit()
+        conflict = commit_link(request, link, exclude_link_id=link_id)
+        if conflict is not None:
+            return conflict
+        bump_version('links')
+        if network_graph.loaded:
+            network_graph.upsert_edge(EDGE_LINK, link.id, link.start_node_id, link.end_node_id,
+                                      link_weight(db, link.fiber_id))
         
         return {'link': link.to_dict()}
     except Exception as e:
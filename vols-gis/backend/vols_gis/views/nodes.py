@@ -6,12 +6,27 @@ from geoalchemy2.shape import to_shape
 from shapely.geometry import Point
 from ..models.nodes import Node
 from ..schemas.nodes import NodeCreate, NodeUpdate
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..utils.etag import conditional_get
+from ..utils.meta_filter import apply_meta_filters
+from ..utils.response_cache import cached_response
+from ..utils.versions import bump_version
+from ..utils.spatial import parse_bbox, parse_zoom, bbox_filter, thin_points, make_point, geography, dwithin_metres
+from ..utils.clusters import cluster_cache, cell_size, MAX_CLUSTER_ZOOM
+from ..utils.serialization import node_columns, node_row_to_dict
+from ..utils.wire import wants_msgpack, msgpack_response
+from ..graph import port_index
 import json
 
 
 @view_config(route_name='api_nodes_list', request_method='GET')
+@conditional_get('nodes')
 def nodes_list(request):
-    """Список всех узлов"""
+    """Список узлов
+
+    bbox=minx,miny,maxx,maxy ограничивает область видимости карты, zoom
+    прореживает узлы: на каждую ячейку размером с маркер - один узел.
+    """
     import logging
     import traceback
     logger = logging.getLogger(__name__)
@@ -38,7 +53,7 @@ def nodes_list(request):
         logger.info('DB сессия получена, выполняем запрос')
         
         # Параметры поиска и фильтрации
-        query = db.query(Node)
+        query = db.query(*node_columns())
         
         # Фильтр по типу узла
         node_type = request.params.get('node_type')
@@ -55,8 +70,46 @@ def nodes_list(request):
         if search:
             query = query.filter(Node.name.ilike(f'%{search}%'))
         
+        # Фильтры по meta_data (meta.<key>=, meta_contains=) - GIN индекс jsonb_path_ops
+        try:
+            query = apply_meta_filters(query, Node.meta_data, request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid meta filter', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        # Фильтр по области видимости карты (bbox=minx,miny,maxx,maxy&zoom=N)
         try:
-            nodes = query.all()
+            bbox = parse_bbox(request.params.get('bbox'))
+            zoom = parse_zoom(request.params.get('zoom'))
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid parameters', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        if bbox:
+            query = query.filter(bbox_filter(Node.geom, bbox))
+        if zoom is not None:
+            query = thin_points(query, Node.id, Node.geom, zoom)
+        
+        # Keyset пагинация (limit, after_id)
+        try:
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        try:
+            nodes, next_cursor = paginate(query, Node.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             from pyramid.response import Response
@@ -70,25 +123,15 @@ def nodes_list(request):
             )
         logger.info(f'Найдено узлов: {len(nodes)}')
         
-        result = []
-        for node in nodes:
-            try:
-                node_dict = node.to_dict()
-                # Преобразуем геометрию в координаты
-                if node.geom:
-                    shape = to_shape(node.geom)
-                    node_dict['lat'] = shape.y
-                    node_dict['lon'] = shape.x
-                    node_dict.pop('geom', None)
-                result.append(node_dict)
-            except Exception as e:
-                logger.warning(f'Ошибка при обработке узла {node.id}: {e}')
-                continue
+        result = [node_row_to_dict(row) for row in nodes]
         
         logger.info('Список узлов успешно сформирован')
+        body = page_response('nodes', result, next_cursor, request, db, 'nodes')
+        if wants_msgpack(request):
+            return msgpack_response(body)
         from pyramid.response import Response
         return Response(
-            json_body={'nodes': result, 'count': len(result)},
+            json_body=body,
             content_type='application/json'
         )
     except Exception as e:
@@ -131,6 +174,7 @@ def nodes_create(request):
         )
         db.add(node)
         db.commit()
+        bump_version('nodes')
         
         node_dict = node.to_dict()
         shape = to_shape(node.geom)
@@ -155,25 +199,19 @@ def nodes_create(request):
 
 
 @view_config(route_name='api_nodes_get', request_method='GET')
+@cached_response('nodes')
 def nodes_get(request):
     """Получить узел по ID"""
     node_id = int(request.matchdict['id'])
     db = request.db
-    node = db.query(Node).filter(Node.id == node_id).first()
+    row = db.query(*node_columns()).filter(Node.id == node_id).first()
     
-    if not node:
+    if not row:
         return {'error': 'Node not found'}, 404
     
-    node_dict = node.to_dict()
-    if node.geom:
-        shape = to_shape(node.geom)
-        node_dict['lat'] = shape.y
-        node_dict['lon'] = shape.x
-        node_dict.pop('geom', None)
-    
     from pyramid.response import Response
     return Response(
-        json_body={'node': node_dict},
+        json_body={'node': node_row_to_dict(row)},
         content_type='application/json'
     )
 
@@ -210,6 +248,7 @@ def nodes_update(request):
             node.geom = point
         
         db.commit()
+        bump_version('nodes')
         
         node_dict = node.to_dict()
         if node.geom:
@@ -249,6 +288,7 @@ def nodes_delete(request):
     
     db.delete(node)
     db.commit()
+    bump_version('nodes')
     
     from pyramid.response import Response
     return Response(
@@ -266,25 +306,18 @@ def nodes_nearby(request):
         distance = float(request.params.get('distance', 5))  # км по умолчанию
         
         db = request.db
-        point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+        point = make_point(lon, lat)
+        distance_m = func.ST_Distance(geography(Node.geom), geography(point)).label('distance_m')
         
-        # Поиск в радиусе (distance в метрах)
-        nodes = db.query(Node).filter(
-            func.ST_DWithin(
-                Node.geom,
-                point,
-                distance * 1000  # конвертируем км в метры
-            )
-        ).all()
+        # Поиск в радиусе: окно по GIST индексу + точная проверка в метрах (geography)
+        nodes = db.query(*node_columns(), distance_m).filter(
+            dwithin_metres(Node.geom, lon, lat, distance * 1000)  # конвертируем км в метры
+        ).order_by(distance_m).all()
         
         result = []
-        for node in nodes:
-            node_dict = node.to_dict()
-            if node.geom:
-                shape = to_shape(node.geom)
-                node_dict['lat'] = shape.y
-                node_dict['lon'] = shape.x
-                node_dict.pop('geom', None)
+        for row in nodes:
+            node_dict = node_row_to_dict(row)
+            node_dict['distance_m'] = row.distance_m
             result.append(node_dict)
         
         from pyramid.response import Response
@@ -300,3 +333,195 @@ def nodes_nearby(request):
             content_type='application/json'
         )
 
+
+MAX_NEAREST = 1000
+
+
+@view_config(route_name='api_nodes_nearest', request_method='GET')
+def nodes_nearest(request):
+    """K ближайших узлов к точке (KNN по GIST индексу, расстояния в метрах)"""
+    from pyramid.response import Response
+    try:
+        lat = float(request.params.get('lat'))
+        lon = float(request.params.get('lon'))
+        k = int(request.params.get('k', 10))
+        if not 1 <= k <= MAX_NEAREST:
+            raise ValueError(f'k должен быть в диапазоне 1..{MAX_NEAREST}')
+    except (TypeError, ValueError) as e:
+        return Response(
+            json_body={'error': 'Invalid parameters', 'message': str(e)},
+            status=400,
+            content_type='application/json'
+        )
+    
+    if not hasattr(request, 'db') or request.db is None:
+        return Response(
+            json_body={'error': 'Database session not available'},
+            status=500,
+            content_type='application/json'
+        )
+    
+    try:
+        db = request.db
+        point = make_point(lon, lat)
+        distance_m = func.ST_Distance(geography(Node.geom), geography(point)).label('distance_m')
+        
+        # ORDER BY geography(geom) <-> geography(point) LIMIT k - обход idx_nodes_geog
+        # (миграция 4) по расстоянию на сфере; итог упорядочивается по distance_m
+        candidates = db.query(*node_columns(), distance_m).order_by(
+            geography(Node.geom).op('<->')(geography(point))
+        ).limit(k).subquery()
+        
+        nodes = db.query(candidates).order_by(candidates.c.distance_m, candidates.c.id).all()
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f'Ошибка поиска ближайших узлов: {e}')
+        db.rollback()
+        return Response(
+            json_body={'error': 'Database query error', 'message': str(e)},
+            status=500,
+            content_type='application/json'
+        )
+    
+    result = []
+    for row in nodes:
+        node_dict = node_row_to_dict(row)
+        node_dict['distance_m'] = row.distance_m
+        result.append(node_dict)
+    
+    return Response(
+        json_body={'nodes': result, 'count': len(result)},
+        content_type='application/json'
+    )
+
+
+@view_config(route_name='api_nodes_clusters', request_method='GET')
+@conditional_get('nodes')
+def nodes_clusters(request):
+    """Кластеры узлов по сетке для zoom (bbox=minx,miny,maxx,maxy&zoom=N)"""
+    try:
+        bbox = parse_bbox(request.params.get('bbox'))
+        zoom = parse_zoom(request.params.get('zoom'))
+        if zoom is None:
+            raise ValueError('Параметр zoom обязателен')
+        if zoom > MAX_CLUSTER_ZOOM:
+            raise ValueError(f'Кластеры доступны до zoom {MAX_CLUSTER_ZOOM}, '
+                             f'на крупных масштабах используйте /api/nodes?bbox=')
+    except ValueError as e:
+        from pyramid.response import Response
+        return Response(
+            json_body={'error': 'Invalid parameters', 'message': str(e)},
+            status=400,
+            content_type='application/json'
+        )
+    
+    if not hasattr(request, 'db') or request.db is None:
+        from pyramid.response import Response
+        return Response(
+            json_body={'error': 'Database session not available'},
+            status=500,
+            content_type='application/json'
+        )
+    
+    try:
+        clusters = cluster_cache.get(request.db, zoom, bbox)
+    except Exception as e:
+        import logging
+        import traceback
+        logger = logging.getLogger(__name__)
+        logger.error(f'Ошибка кластеризации узлов: {e}')
+        logger.error(traceback.format_exc())
+        request.db.rollback()
+        from pyramid.response import Response
+        return Response(
+            json_body={'error': 'Database query error', 'message': str(e)},
+            status=500,
+            content_type='application/json'
+        )
+    
+    body = {
+        'zoom': zoom,
+        'cell_size': cell_size(zoom),
+        'clusters': clusters,
+        'count': len(clusters),
+        'total': sum(cluster['count'] for cluster in clusters),
+    }
+    if wants_msgpack(request):
+        return msgpack_response(body)
+    from pyramid.response import Response
+    return Response(json_body=body, content_type='application/json')
+
+
+def _node_port_count(request, node):
+    """Число портов узла: параметр port_count или meta_data.port_count"""
+    value = request.params.get('port_count')
+    if value is None and node.meta_data:
+        value = node.meta_data.get('port_count')
+    if value is None:
+        return None
+    port_count = int(value)
+    if port_count < 0:
+        raise ValueError('port_count должен быть неотрицательным')
+    return port_count
+
+
+def _find_node_for_index(request):
+    """Узел из matchdict и загруженный индекс портов; Response при ошибке"""
+    from pyramid.response import Response
+    if not hasattr(request, 'db') or request.db is None:
+        return None, Response(
+            json_body={'error': 'Database session not available'},
+            status=500,
+            content_type='application/json'
+        )
+    node_id = int(request.matchdict['id'])
+    node = request.db.query(Node.id, Node.meta_data).filter(Node.id == node_id).first()
+    if node is None:
+        return None, Response(json_body={'error': 'Node not found'}, status=404, content_type='application/json')
+    port_index.ensure_loaded(request.db)
+    return node, None
+
+
+@view_config(route_name='api_nodes_ports', request_method='GET')
+def nodes_ports(request):
+    """Занятые и свободные порты узла (индекс портов, O(портов узла))"""
+    node, error = _find_node_for_index(request)
+    if error is not None:
+        return error
+    try:
+        port_count = _node_port_count(request, node)
+    except (TypeError, ValueError) as e:
+        from pyramid.response import Response
+        return Response(
+            json_body={'error': 'Invalid port_count', 'message': str(e)},
+            status=400,
+            content_type='application/json'
+        )
+    
+    occupied = port_index.ports(node.id)
+    body = {
+        'node_id': node.id,
+        'occupied': occupied,
+        'occupied_count': len(occupied),
+        'port_count': port_count,
+    }
+    if port_count is not None:
+        # Порты нумеруются с 1
+        used = {item['port'] for item in occupied}
+        body['free'] = [port for port in range(1, port_count + 1) if port not in used]
+        body['free_count'] = len(body['free'])
+    from pyramid.response import Response
+    return Response(json_body=body, content_type='application/json')
+
+
+@view_config(route_name='api_nodes_capacity', request_method='GET')
+def nodes_capacity(request):
+    """Число связей и суммарная емкость (Гбит/с), оканчивающихся на узле"""
+    node, error = _find_node_for_index(request)
+    if error is not None:
+        return error
+    from pyramid.response import Response
+    return Response(
+        json_body={'node_id': node.id, **port_index.capacity(node.id)},
+        content_type='application/json'
+    )
@@ -0,0 +1,163 @@
+"""Общий поиск по узлам, маршрутам и волокнам (typeahead)
+
+Каждая таблица ищется по "документу" - имени, описанию и ключам
+meta_data - через GIN trigram индексы миграции 2: подстрока (ILIKE) или
+похожее слово (оператор `<%` pg_trgm, находит опечатки). Результаты
+ранжируются: точное совпадение имени, затем имя с префикса запроса,
+затем word_similarity. Из каждой таблицы берется не больше limit строк,
+итог объединяется одним запросом UNION ALL.
+"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from sqlalchemy import text
+from ..migrations.v0002_search_indexes import DOCUMENTS
+from ..utils.response_cache import cached_response
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ('node', 'vols', 'fiber')
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Выражение ранга: чем больше, тем выше в выдаче
+RANK_SQL = """
+    CASE WHEN lower(name) = lower(:q) THEN 2
+         WHEN name ILIKE :prefix THEN 1
+         ELSE 0 END + word_similarity(:q, {document})
+"""
+
+# Ветка UNION ALL для каждого типа; extra - поля типа в едином наборе колонок
+BRANCH_SQL = {
+    'node': """
+        SELECT 'node' AS type, id, name, description, {rank} AS score,
+               ST_Y(geom) AS lat, ST_X(geom) AS lon, NULL::float8[] AS bbox, NULL::integer AS vols_id
+        FROM nodes
+        WHERE {document} ILIKE :pattern OR :q <% {document}
+        ORDER BY score DESC, id
+        LIMIT :limit
+    """,
+    'vols': """
+        SELECT 'vols' AS type, id, name, description, {rank} AS score,
+               NULL::float8 AS lat, NULL::float8 AS lon,
+               ARRAY[ST_XMin(path), ST_YMin(path), ST_XMax(path), ST_YMax(path)] AS bbox,
+               NULL::integer AS vols_id
+        FROM vols
+        WHERE {document} ILIKE :pattern OR :q <% {document}
+        ORDER BY score DESC, id
+        LIMIT :limit
+    """,
+    'fiber': """
+        SELECT 'fiber' AS type, id, name, cable_type AS description, {rank} AS score,
+               NULL::float8 AS lat, NULL::float8 AS lon, NULL::float8[] AS bbox, vols_id
+        FROM fibers
+        WHERE {document} ILIKE :pattern OR :q <% {document}
+        ORDER BY score DESC, id
+        LIMIT :limit
+    """,
+}
+
+TYPE_TABLES = {'node': 'nodes', 'vols': 'vols', 'fiber': 'fibers'}
+
+
+def escape_like(value):
+    """Экранирует спецсимволы LIKE (\\, %, _)"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_sql(types):
+    """Запрос поиска по выбранным типам"""
+    branches = []
+    for search_type in types:
+        document = DOCUMENTS[TYPE_TABLES[search_type]]
+        rank = RANK_SQL.format(document=document)
+        branches.append('(' + BRANCH_SQL[search_type].format(document=document, rank=rank) + ')')
+    return text(' UNION ALL '.join(branches) + ' ORDER BY score DESC, type, id LIMIT :limit')
+
+
+def parse_search_params(params):
+    """(q, types, limit) из параметров запроса; ValueError при ошибке"""
+    q = (params.get('q') or '').strip()
+    types = params.get('types')
+    if types:
+        types = tuple(t.strip() for t in types.split(',') if t.strip())
+        unknown = set(types) - set(SEARCH_TYPES)
+        if unknown:
+            raise ValueError(f'types: неизвестные типы {sorted(unknown)}, допустимы {list(SEARCH_TYPES)}')
+    else:
+        types = SEARCH_TYPES
+    limit = int(params.get('limit', DEFAULT_LIMIT))
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit должен быть в диапазоне 1..{MAX_LIMIT}')
+    return q, types, limit
+
+
+def hit_to_dict(row):
+    hit = {
+        'type': row.type,
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'score': round(float(row.score), 4),
+    }
+    if row.type == 'node':
+        hit['lat'] = row.lat
+        hit['lon'] = row.lon
+    elif row.type == 'vols':
+        hit['bbox'] = list(row.bbox) if row.bbox else None
+    elif row.type == 'fiber':
+        hit['vols_id'] = row.vols_id
+    return hit
+
+
+@view_config(route_name='api_search', request_method='GET')
+@cached_response('nodes', 'vols', 'fibers')
+def search(request):
+    """Поиск по узлам, маршрутам и волокнам: /api/search?q=&types=&limit="""
+    try:
+        q, types, limit = parse_search_params(request.params)
+    except ValueError as e:
+        return Response(
+            json_body={'error': 'Invalid parameters', 'message': str(e)},
+            status=400,
+            content_type='application/json'
+        )
+
+    if len(q) < MIN_QUERY_LENGTH:
+        # Слишком короткий запрос: индекс по триграммам не поможет
+        return Response(
+            json_body={'q': q, 'hits': [], 'count': 0},
+            content_type='application/json'
+        )
+
+    if not hasattr(request, 'db') or request.db is None:
+        return Response(
+            json_body={'error': 'Database session not available'},
+            status=500,
+            content_type='application/json'
+        )
+
+    try:
+        rows = request.db.execute(search_sql(types), {
+            'q': q,
+            'pattern': f'%{escape_like(q)}%',
+            'prefix': f'{escape_like(q)}%',
+            'limit': limit,
+        }).all()
+    except Exception as e:
+        logger.error(f'Ошибка поиска: {e}')
+        logger.error(traceback.format_exc())
+        request.db.rollback()
+        return Response(
+            json_body={'error': 'Database query error', 'message': str(e)},
+            status=500,
+            content_type='application/json'
+        )
+
+    hits = [hit_to_dict(row) for row in rows]
+    return Response(
+        json_body={'q': q, 'hits': hits, 'count': len(hits)},
+        content_type='application/json'
+    )
@@ -1,20 +1,105 @@
 """Views для статистики и аналитики"""
 from pyramid.view import view_config
 from pyramid.response import Response
-from sqlalchemy import func
-from ..models.nodes import Node
-from ..models.vols import Vols
-from ..models.fibers import Fiber
-from ..models.links import Link
-from ..auth.decorators import require_auth
+from sqlalchemy import text
+from ..auth.security import AUTHENTICATED
+from ..utils.stats_cache import StatsCache
 import logging
 import traceback
 
 logger = logging.getLogger(__name__)
 
+# Вся статистика дашборда одним запросом: каждая таблица читается один раз,
+# итоги и группировки считаются через GROUPING SETS.
+# GROUPING(col) = 1 в строках, где col не участвует в группировке.
+DASHBOARD_SQL = text("""
+    WITH node_stats AS (
+        SELECT status, node_type,
+               GROUPING(status) AS no_status, GROUPING(node_type) AS no_type,
+               count(*) AS c
+        FROM nodes
+        GROUP BY GROUPING SETS ((status), (node_type), ())
+    ), vols_stats AS (
+        SELECT status, GROUPING(status) AS no_status,
+               count(*) AS c, sum(length_km) AS length_km
+        FROM vols
+        GROUP BY GROUPING SETS ((status), ())
+    ), fiber_stats AS (
+        SELECT status, vols_id,
+               GROUPING(status) AS no_status, GROUPING(vols_id) AS no_vols,
+               count(*) AS c
+        FROM fibers
+        GROUP BY GROUPING SETS ((status), (vols_id), ())
+    ), link_stats AS (
+        SELECT status, start_node_id,
+               GROUPING(status) AS no_status, GROUPING(start_node_id) AS no_node,
+               count(*) AS c
+        FROM links
+        GROUP BY GROUPING SETS ((status), (start_node_id), ())
+    )
+    SELECT
+        (SELECT c FROM node_stats WHERE no_status = 1 AND no_type = 1) AS total_nodes,
+        (SELECT c FROM vols_stats WHERE no_status = 1) AS total_vols,
+        (SELECT c FROM fiber_stats WHERE no_status = 1 AND no_vols = 1) AS total_fibers,
+        (SELECT c FROM link_stats WHERE no_status = 1 AND no_node = 1) AS total_links,
+        (SELECT length_km FROM vols_stats WHERE no_status = 1) AS total_length_km,
+        (SELECT json_object_agg(COALESCE(status, 'unknown'), c)
+         FROM node_stats WHERE no_status = 0) AS nodes_by_status,
+        (SELECT json_object_agg(COALESCE(node_type, 'unknown'), c)
+         FROM node_stats WHERE no_type = 0) AS nodes_by_type,
+        (SELECT json_object_agg(COALESCE(status, 'unknown'), c)
+         FROM vols_stats WHERE no_status = 0) AS vols_by_status,
+        (SELECT json_object_agg(COALESCE(status, 'unknown'), c)
+         FROM fiber_stats WHERE no_status = 0) AS fibers_by_status,
+        (SELECT json_object_agg(vols_id, c)
+         FROM fiber_stats WHERE no_vols = 0 AND vols_id IS NOT NULL) AS fibers_by_vols,
+        (SELECT json_object_agg(COALESCE(status, 'unknown'), c)
+         FROM link_stats WHERE no_status = 0) AS links_by_status,
+        (SELECT json_object_agg(start_node_id, c)
+         FROM link_stats WHERE no_node = 0 AND start_node_id IS NOT NULL) AS links_by_node
+""")
 
-@view_config(route_name='api_stats_dashboard', request_method='GET')
-@require_auth
+# Запись через API сбрасывает кеш сразу (версии таблиц), остальное - по TTL
+dashboard_cache = StatsCache(('nodes', 'vols', 'fibers', 'links'))
+
+
+def compute_dashboard(db):
+    """Статистика дашборда из БД (один запрос)"""
+    row = db.execute(DASHBOARD_SQL).one()
+    total_length = float(row.total_length_km) if row.total_length_km else 0
+    return {
+        'summary': {
+            'total_nodes': row.total_nodes or 0,
+            'total_vols': row.total_vols or 0,
+            'total_fibers': row.total_fibers or 0,
+            'total_links': row.total_links or 0,
+            'total_length_km': total_length
+        },
+        'nodes': {
+            'by_status': row.nodes_by_status or {},
+            'by_type': row.nodes_by_type or {}
+        },
+        'vols': {
+            'by_status': row.vols_by_status or {},
+            'total_length_km': total_length
+        },
+        'fibers': {
+            'by_status': row.fibers_by_status or {},
+            'by_vols': row.fibers_by_vols or {}
+        },
+        'links': {
+            'by_status': row.links_by_status or {},
+            'by_node': row.links_by_node or {}
+        }
+    }
+
+
+def get_dashboard(db):
+    """Статистика дашборда из кеша"""
+    return dashboard_cache.get(lambda: compute_dashboard(db))
+
+
+@view_config(route_name='api_stats_dashboard', request_method='GET', permission=AUTHENTICATED)
 def stats_dashboard(request):
     """Дашборд со статистикой"""
     try:
@@ -25,94 +110,8 @@ def stats_dashboard(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        
-        # Общая статистика
-        total_nodes = db.query(func.count(Node.id)).scalar() or 0
-        total_vols = db.query(func.count(Vols.id)).scalar() or 0
-        total_fibers = db.query(func.count(Fiber.id)).scalar() or 0
-        total_links = db.query(func.count(Link.id)).scalar() or 0
-        
-        # Статистика по статусам узлов
-        nodes_by_status = db.query(
-            Node.status,
-            func.count(Node.id).label('count')
-        ).group_by(Node.status).all()
-        nodes_status_stats = {status or 'unknown': count for status, count in nodes_by_status}
-        
-        # Статистика по типам узлов
-        nodes_by_type = db.query(
-            Node.node_type,
-            func.count(Node.id).label('count')
-        ).group_by(Node.node_type).all()
-        nodes_type_stats = {node_type or 'unknown': count for node_type, count in nodes_by_type}
-        
-        # Статистика по статусам маршрутов
-        vols_by_status = db.query(
-            Vols.status,
-            func.count(Vols.id).label('count')
-        ).group_by(Vols.status).all()
-        vols_status_stats = {status or 'unknown': count for status, count in vols_by_status}
-        
-        # Общая длина маршрутов
-        total_length = db.query(func.sum(Vols.length_km)).scalar() or 0
-        
-        # Статистика по статусам волокон
-        fibers_by_status = db.query(
-            Fiber.status,
-            func.count(Fiber.id).label('count')
-        ).group_by(Fiber.status).all()
-        fibers_status_stats = {status or 'unknown': count for status, count in fibers_by_status}
-        
-        # Статистика по статусам связей
-        links_by_status = db.query(
-            Link.status,
-            func.count(Link.id).label('count')
-        ).group_by(Link.status).all()
-        links_status_stats = {status or 'unknown': count for status, count in links_by_status}
-        
-        # Статистика по маршрутам (волокна по маршрутам)
-        fibers_by_vols = db.query(
-            Fiber.vols_id,
-            func.count(Fiber.id).label('count')
-        ).group_by(Fiber.vols_id).all()
-        fibers_by_vols_stats = {vols_id: count for vols_id, count in fibers_by_vols if vols_id}
-        
-        # Статистика связей по узлам
-        links_by_node = db.query(
-            Link.start_node_id,
-            func.count(Link.id).label('count')
-        ).group_by(Link.start_node_id).all()
-        links_by_node_stats = {node_id: count for node_id, count in links_by_node if node_id}
-        
-        dashboard = {
-            'summary': {
-                'total_nodes': total_nodes,
-                'total_vols': total_vols,
-                'total_fibers': total_fibers,
-                'total_links': total_links,
-                'total_length_km': float(total_length) if total_length else 0
-            },
-            'nodes': {
-                'by_status': nodes_status_stats,
-                'by_type': nodes_type_stats
-            },
-            'vols': {
-                'by_status': vols_status_stats,
-                'total_length_km': float(total_length) if total_length else 0
-            },
-            'fibers': {
-                'by_status': fibers_status_stats,
-                'by_vols': fibers_by_vols_stats
-            },
-            'links': {
-                'by_status': links_status_stats,
-                'by_node': links_by_node_stats
-            }
-        }
-        
         return Response(
-            json_body=dashboard,
+            json_body=get_dashboard(request.db),
             content_type='application/json'
         )
         
@@ -126,8 +125,7 @@ def stats_dashboard(request):
         )
 
 
-@view_config(route_name='api_stats_summary', request_method='GET')
-@require_auth
+@view_config(route_name='api_stats_summary', request_method='GET', permission=AUTHENTICATED)
 def stats_summary(request):
     """Краткая статистика"""
     try:
@@ -138,14 +136,13 @@ def stats_summary(request):
                 content_type='application/json'
             )
         
-        db = request.db
-        
+        totals = get_dashboard(request.db)['summary']
         summary = {
-            'nodes': db.query(func.count(Node.id)).scalar() or 0,
-            'vols': db.query(func.count(Vols.id)).scalar() or 0,
-            'fibers': db.query(func.count(Fiber.id)).scalar() or 0,
-            'links': db.query(func.count(Link.id)).scalar() or 0,
-            'total_length_km': float(db.query(func.sum(Vols.length_km)).scalar() or 0)
+            'nodes': totals['total_nodes'],
+            'vols': totals['total_vols'],
+            'fibers': totals['total_fibers'],
+            'links': totals['total_links'],
+            'total_length_km': totals['total_length_km']
         }
         
         return Response(
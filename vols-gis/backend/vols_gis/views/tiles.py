@@ -0,0 +1,119 @@
+"""Views для векторных тайлов (Mapbox Vector Tiles)"""
+from pyramid.view import view_config
+from pyramid.response import Response
+from sqlalchemy import text
+from ..utils.tile_cache import tile_cache
+import logging
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Описание слоев: таблица, колонка геометрии, атрибуты и допустимые фильтры
+TILE_LAYERS = {
+    'nodes': {
+        'table': 'nodes',
+        'geom': 'geom',
+        'columns': ['id', 'name', 'node_type', 'status'],
+        'filters': ['status', 'node_type'],
+    },
+    'vols': {
+        'table': 'vols',
+        'geom': 'path',
+        'columns': ['id', 'name', 'status', 'length_km'],
+        'filters': ['status'],
+    },
+}
+
+MAX_TILE_ZOOM = 22
+
+
+def build_tile_sql(layer, filters):
+    """Формирует SQL для ST_AsMVT по описанию слоя
+
+    Имена таблиц и колонок берутся только из TILE_LAYERS, значения
+    фильтров передаются как bind-параметры.
+    """
+    config = TILE_LAYERS[layer]
+    columns = ', '.join(f't.{c}' for c in config['columns'])
+    where = [f"t.{config['geom']} && ST_Transform(bounds.geom, 4326)"]
+    for name in filters:
+        where.append(f't.{name} = :{name}')
+    return text(f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(ST_Transform(t.{config['geom']}, 3857), bounds.geom) AS geom,
+                   {columns}
+            FROM {config['table']} t, bounds
+            WHERE {' AND '.join(where)}
+        )
+        SELECT ST_AsMVT(mvtgeom.*, :layer, 4096, 'geom', 'id') FROM mvtgeom
+    """)
+
+
+@view_config(route_name='api_tiles', request_method='GET')
+def tiles_get(request):
+    """Векторный тайл слоя nodes или vols в формате MVT"""
+    try:
+        layer = request.matchdict['layer']
+        if layer not in TILE_LAYERS:
+            return Response(
+                json_body={'error': 'Unknown layer', 'message': f'Слой {layer} не найден'},
+                status=404,
+                content_type='application/json'
+            )
+
+        try:
+            z = int(request.matchdict['z'])
+            x = int(request.matchdict['x'])
+            y = int(request.matchdict['y'])
+        except ValueError:
+            return Response(
+                json_body={'error': 'Invalid tile', 'message': 'z, x, y должны быть целыми числами'},
+                status=400,
+                content_type='application/json'
+            )
+        if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response(
+                json_body={'error': 'Invalid tile', 'message': 'Тайл вне сетки'},
+                status=400,
+                content_type='application/json'
+            )
+
+        # Фильтры по атрибутам (status, node_type)
+        filters = {}
+        for name in TILE_LAYERS[layer]['filters']:
+            value = request.params.get(name)
+            if value:
+                filters[name] = value
+
+        key = tile_cache.make_key(layer, z, x, y, sorted(filters.items()))
+        tile = tile_cache.get(key)
+
+        if tile is None:
+            if not hasattr(request, 'db') or request.db is None:
+                return Response(
+                    json_body={'error': 'Database session not available'},
+                    status=500,
+                    content_type='application/json'
+                )
+
+            sql = build_tile_sql(layer, sorted(filters))
+            params = {'z': z, 'x': x, 'y': y, 'layer': layer, **filters}
+            tile = bytes(request.db.execute(sql, params).scalar() or b'')
+            tile_cache.set(key, tile)
+
+        return Response(
+            body=tile,
+            content_type='application/vnd.mapbox-vector-tile',
+            cache_control='no-cache'
+        )
+    except Exception as e:
+        logger.error(f'Ошибка при построении тайла: {e}')
+        logger.error(traceback.format_exc())
+        return Response(
+            json_body={'error': str(e)},
+            status=500,
+            content_type='application/json'
+        )
@@ -4,7 +4,9 @@ from pyramid.response import Response
 from sqlalchemy.exc import IntegrityError
 from ..models.users import User
 from ..schemas.users import UserCreate, UserUpdate, UserLogin
-from ..auth.decorators import require_auth, require_role
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..auth.security import AUTHENTICATED
+from ..auth.cache import user_cache
 import logging
 import traceback
 import hashlib
@@ -17,8 +19,7 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-@view_config(route_name='api_users_list', request_method='GET')
-@require_auth
+@view_config(route_name='api_users_list', request_method='GET', permission=AUTHENTICATED)
 def users_list(request):
     """Список всех пользователей"""
     try:
@@ -37,8 +38,18 @@ def users_list(request):
         
         db = request.db
         
+        # Keyset пагинация (limit, after_id)
         try:
-            users = db.query(User).all()
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        try:
+            users, next_cursor = paginate(db.query(User), User.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             return Response(
@@ -60,7 +71,7 @@ def users_list(request):
                 logger.warning(f'Ошибка при преобразовании пользователя {user.id}: {e}')
                 continue
         
-        result = {'users': users_list, 'count': len(users_list)}
+        result = page_response('users', users_list, next_cursor, request, db, 'users')
         logger.info(f'Список пользователей успешно сформирован: {len(users_list)} элементов')
         return Response(json_body=result, content_type='application/json')
         
@@ -81,8 +92,7 @@ def users_list(request):
         )
 
 
-@view_config(route_name='api_users_list', request_method='POST')
-@require_role('admin')
+@view_config(route_name='api_users_list', request_method='POST', permission='admin')
 def users_create(request):
     """Создание нового пользователя"""
     try:
@@ -262,8 +272,7 @@ def users_get(request):
         )
 
 
-@view_config(route_name='api_users_get', request_method='PUT')
-@require_auth
+@view_config(route_name='api_users_get', request_method='PUT', permission=AUTHENTICATED)
 def users_update(request):
     """Обновление пользователя"""
     try:
@@ -366,6 +375,7 @@ def users_update(request):
             
             db.commit()
             db.refresh(user)
+            user_cache.invalidate(user_id)
             
             logger.info(f'Пользователь обновлен: {user.id}')
             return Response(
@@ -415,8 +425,7 @@ def users_update(request):
         )
 
 
-@view_config(route_name='api_users_get', request_method='DELETE')
-@require_role('admin')
+@view_config(route_name='api_users_get', request_method='DELETE', permission='admin')
 def users_delete(request):
     """Удаление пользователя"""
     try:
@@ -459,6 +468,7 @@ def users_delete(request):
         try:
             db.delete(user)
             db.commit()
+            user_cache.invalidate(user_id)
             
             logger.info(f'Пользователь удален: {user_id}')
             return Response(
@@ -3,11 +3,25 @@ from pyramid.view import view_config
 from sqlalchemy import func
 from geoalchemy2.shape import to_shape
 from ..models.vols import Vols
+from ..models.vols_lod import VolsLod
 from ..schemas.vols import VolsCreate, VolsUpdate
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..utils.etag import conditional_get
+from ..utils.meta_filter import apply_meta_filters
+from ..utils.response_cache import cached_response
+from ..utils.versions import bump_version
+from ..utils.spatial import parse_bbox, parse_zoom, bbox_filter
+from ..utils.serialization import vols_columns, vols_row_to_dict
+from ..utils.wire import wants_msgpack, msgpack_response
+from ..utils.lod import refresh_lod, parse_tolerance, simplified_path
+from ..utils.expand import VOLS_EXPAND, parse_expand, expand_tables, expand_vols
+from ..graph import network_graph
+from ..graph.network import EDGE_VOLS, EDGE_LINK, route_link_edges
 import json
 
 
 @view_config(route_name='api_vols_list', request_method='GET')
+@conditional_get('vols', extra=expand_tables(VOLS_EXPAND))
 def vols_list(request):
     """Список всех ВОЛС маршрутов"""
     import logging
@@ -35,8 +49,38 @@ def vols_list(request):
         
         logger.info('DB сессия получена, выполняем запрос')
         
+        # Фильтр по области видимости карты (bbox=minx,miny,maxx,maxy&zoom=N)
+        # и уровень детализации пути (zoom или явный tolerance в градусах)
+        try:
+            bbox = parse_bbox(request.params.get('bbox'))
+            zoom = parse_zoom(request.params.get('zoom'))
+            tolerance = parse_tolerance(request.params.get('tolerance'))
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid parameters', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        # Связанные объекты страницы (expand=nodes,fibers,links)
+        try:
+            expand = parse_expand(request.params.get('expand'), VOLS_EXPAND)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid expand', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
         # Параметры поиска и фильтрации
-        query = db.query(Vols)
+        # (для MessagePack путь берется в WKB и отдается упакованным массивом)
+        msgpack_format = wants_msgpack(request)
+        path, lod_join = simplified_path(zoom, tolerance)
+        query = db.query(*vols_columns(path=path, wkb=msgpack_format))
+        if lod_join is not None:
+            query = query.outerjoin(VolsLod, lod_join)
         
         # Фильтр по статусу
         status = request.params.get('status')
@@ -48,8 +92,33 @@ def vols_list(request):
         if search:
             query = query.filter(Vols.name.ilike(f'%{search}%'))
         
+        # Фильтры по meta_data (meta.<key>=, meta_contains=) - GIN индекс jsonb_path_ops
         try:
-            vols_list = query.all()
+            query = apply_meta_filters(query, Vols.meta_data, request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid meta filter', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        if bbox:
+            query = query.filter(bbox_filter(Vols.path, bbox))
+        
+        # Keyset пагинация (limit, after_id)
+        try:
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            from pyramid.response import Response
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        try:
+            vols_list, next_cursor = paginate(query, Vols.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             from pyramid.response import Response
@@ -63,23 +132,16 @@ def vols_list(request):
             )
         logger.info(f'Найдено маршрутов: {len(vols_list)}')
         
-        result = []
-        for vols in vols_list:
-            try:
-                vols_dict = vols.to_dict()
-                # Преобразуем геометрию в координаты
-                if vols.path:
-                    shape = to_shape(vols.path)
-                    vols_dict['path'] = [[coord[0], coord[1]] for coord in shape.coords]
-                result.append(vols_dict)
-            except Exception as e:
-                logger.warning(f'Ошибка при обработке маршрута {vols.id}: {e}')
-                continue
+        result = [vols_row_to_dict(row) for row in vols_list]
+        expand_vols(db, result, expand)
         
         logger.info('Список маршрутов успешно сформирован')
+        body = page_response('vols', result, next_cursor, request, db, 'vols')
+        if msgpack_format:
+            return msgpack_response(body)
         from pyramid.response import Response
         return Response(
-            json_body={'vols': result, 'count': len(result)},
+            json_body=body,
             content_type='application/json'
         )
     except Exception as e:
@@ -163,7 +225,11 @@ def vols_create(request):
                 meta_data=schema.meta_data
             )
             db.add(vols)
+            db.flush()
+            refresh_lod(db, [vols.id])
             db.commit()
+            bump_version('vols')
+            network_graph.upsert_edge(EDGE_VOLS, vols.id, vols.start_node_id, vols.end_node_id, vols.length_km)
             logger.info(f'Маршрут успешно создан с ID: {vols.id}')
         except Exception as db_error:
             db.rollback()
@@ -194,21 +260,17 @@ def vols_create(request):
 
 
 @view_config(route_name='api_vols_get', request_method='GET', renderer='json')
+@cached_response('vols')
 def vols_get(request):
     """Получить ВОЛС маршрут по ID"""
     vols_id = int(request.matchdict['id'])
     db = request.db
-    vols = db.query(Vols).filter(Vols.id == vols_id).first()
+    row = db.query(*vols_columns()).filter(Vols.id == vols_id).first()
     
-    if not vols:
+    if not row:
         return {'error': 'VOLS not found'}, 404
     
-    vols_dict = vols.to_dict()
-    if vols.path:
-        shape = to_shape(vols.path)
-        vols_dict['path'] = [[coord[0], coord[1]] for coord in shape.coords]
-    
-    return {'vols': vols_dict}
+    return {'vols': vols_row_to_dict(row)}
 
 
 @view_config(route_name='api_vols_get', request_method='PUT', renderer='json')
@@ -234,6 +296,7 @@ def vols_update(request):
             vols.start_node_id = schema.start_node_id
         if schema.end_node_id is not None:
             vols.end_node_id = schema.end_node_id
+        length_changed = schema.length_km is not None and schema.length_km != vols.length_km
         if schema.length_km is not None:
             vols.length_km = schema.length_km
         if schema.status is not None:
@@ -249,8 +312,16 @@ def vols_update(request):
                 4326
             )
             vols.path = linestring
+            db.flush()
+            refresh_lod(db, [vols_id])
         
         db.commit()
+        bump_version('vols')
+        network_graph.upsert_edge(EDGE_VOLS, vols.id, vols.start_node_id, vols.end_node_id, vols.length_km)
+        if length_changed and network_graph.loaded:
+            # Вес связей по волокнам маршрута - его длина
+            for link_id, start_id, end_id, weight in route_link_edges(db, vols.id):
+                network_graph.upsert_edge(EDGE_LINK, link_id, start_id, end_id, weight)
         
         vols_dict = vols.to_dict()
         if vols.path:
@@ -273,35 +344,54 @@ def vols_delete(request):
     if not vols:
         return {'error': 'VOLS not found'}, 404
     
+    # Связи по волокнам маршрута: без маршрута их ребра в графе не нужны
+    link_ids = [row[0] for row in route_link_edges(db, vols_id)] if network_graph.loaded else []
+    
     db.delete(vols)
     db.commit()
+    bump_version('vols')
+    network_graph.remove_edge(EDGE_VOLS, vols_id)
+    for link_id in link_ids:
+        network_graph.remove_edge(EDGE_LINK, link_id)
     
     return {'message': 'VOLS deleted'}
 
 
 @view_config(route_name='api_vols_path', request_method='GET', renderer='json')
+@cached_response('vols')
 def vols_path(request):
     """Получить геометрию маршрута в формате GeoJSON"""
     vols_id = int(request.matchdict['id'])
+    try:
+        zoom = parse_zoom(request.params.get('zoom'))
+        tolerance = parse_tolerance(request.params.get('tolerance'))
+    except ValueError as e:
+        request.response.status = 400
+        return {'error': 'Invalid parameters', 'message': str(e)}
+    
     db = request.db
-    vols = db.query(Vols).filter(Vols.id == vols_id).first()
+    path, lod_join = simplified_path(zoom, tolerance)
+    query = db.query(
+        Vols.id,
+        Vols.name,
+        Vols.description,
+        Vols.status,
+        func.ST_AsGeoJSON(path).label('path_geojson')
+    )
+    if lod_join is not None:
+        query = query.outerjoin(VolsLod, lod_join)
+    vols = query.filter(Vols.id == vols_id).first()
     
     if not vols:
         return {'error': 'VOLS not found'}, 404
     
-    if not vols.path:
+    if not vols.path_geojson:
         return {'error': 'Path not found'}, 404
     
-    # Преобразуем в GeoJSON
-    shape = to_shape(vols.path)
-    coords = [[coord[0], coord[1]] for coord in shape.coords]
-    
+    # Геометрия уже сериализована в GeoJSON на стороне БД
     geojson = {
         'type': 'Feature',
-        'geometry': {
-            'type': 'LineString',
-            'coordinates': coords
-        },
+        'geometry': json.loads(vols.path_geojson),
         'properties': {
             'id': vols.id,
             'name': vols.name,
@@ -312,3 +402,24 @@ def vols_path(request):
     
     return geojson
 
+
+
+@view_config(route_name='api_vols_full', request_method='GET', renderer='json')
+@cached_response('vols', 'nodes', 'fibers', 'links')
+def vols_full(request):
+    """Маршрут со всеми связанными объектами: узлы, волокна и их связи
+
+    Фиксированное число запросов (selectinload по каждой связи),
+    независимо от количества волокон и связей.
+    """
+    vols_id = int(request.matchdict['id'])
+    db = request.db
+    row = db.query(*vols_columns()).filter(Vols.id == vols_id).first()
+    
+    if not row:
+        request.response.status = 404
+        return {'error': 'VOLS not found'}
+    
+    vols_dict = vols_row_to_dict(row)
+    expand_vols(db, [vols_dict], set(VOLS_EXPAND))
+    return {'vols': vols_dict}
@@ -6,6 +6,8 @@ from geoalchemy2.shape import to_shape
 from shapely.geometry import Point
 from ..models.webmaps import WebMap
 from ..schemas.webmaps import WebMapCreate, WebMapUpdate
+from ..utils.pagination import parse_page_params, paginate, page_response
+from ..utils.serialization import webmap_columns, webmap_row_to_dict
 import logging
 import traceback
 
@@ -31,8 +33,18 @@ def webmaps_list(request):
         
         db = request.db
         
+        # Keyset пагинация (limit, after_id)
         try:
-            webmaps = db.query(WebMap).all()
+            limit, after_id = parse_page_params(request.params)
+        except ValueError as e:
+            return Response(
+                json_body={'error': 'Invalid pagination', 'message': str(e)},
+                status=400,
+                content_type='application/json'
+            )
+        
+        try:
+            webmaps, next_cursor = paginate(db.query(*webmap_columns()), WebMap.id, limit, after_id)
         except Exception as query_error:
             logger.error(f'Ошибка выполнения запроса: {query_error}')
             return Response(
@@ -46,22 +58,9 @@ def webmaps_list(request):
         
         logger.info(f'Найдено веб-карт: {len(webmaps)}')
         
-        webmaps_list = []
-        for webmap in webmaps:
-            try:
-                webmap_dict = webmap.to_dict()
-                # Преобразуем геометрию в координаты
-                if webmap.center_geom:
-                    shape = to_shape(webmap.center_geom)
-                    webmap_dict['center_lat'] = shape.y
-                    webmap_dict['center_lon'] = shape.x
-                    webmap_dict.pop('center_geom', None)
-                webmaps_list.append(webmap_dict)
-            except Exception as e:
-                logger.warning(f'Ошибка при преобразовании веб-карты {webmap.id}: {e}')
-                continue
-        
-        result = {'webmaps': webmaps_list, 'count': len(webmaps_list)}
+        webmaps_list = [webmap_row_to_dict(row) for row in webmaps]
+        
+        result = page_response('webmaps', webmaps_list, next_cursor, request, db, 'webmaps')
         logger.info(f'Список веб-карт успешно сформирован: {len(webmaps_list)} элементов')
         return Response(json_body=result, content_type='application/json')
         
@@ -90,6 +90,20 @@ class APIClient {
         }
     }
 
+    // Загрузка всех страниц списка по курсору next_cursor
+    async requestAll(url, key) {
+        const items = [];
+        let cursor = null;
+        do {
+            const separator = url.includes('?') ? '&' : '?';
+            const pageUrl = cursor ? `${url}${separator}after_id=${cursor}` : url;
+            const page = await this.request(pageUrl);
+            items.push(...(page[key] || []));
+            cursor = page.next_cursor;
+        } while (cursor);
+        return { [key]: items, count: items.length };
+    }
+
     // Nodes
     async getNodes() {
         return this.request('/nodes');
@@ -123,6 +137,10 @@ class APIClient {
         return this.request(`/nodes/nearby?lat=${lat}&lon=${lon}&distance=${distance}`);
     }
 
+    async getNodesNearest(lat, lon, k = 10) {
+        return this.request(`/nodes/nearest?lat=${lat}&lon=${lon}&k=${k}`);
+    }
+
     // VOLS
     async getVols() {
         return this.request('/vols');
@@ -147,6 +165,11 @@ class APIClient {
         return this.request(`/vols/${id}/path`);
     }
 
+    // Маршрут с узлами, волокнами и связями одним запросом
+    async getVolsFull(id) {
+        return this.request(`/vols/${id}/full`);
+    }
+
     async updateVols(id, data) {
         return this.request(`/vols/${id}`, {
             method: 'PUT',
@@ -211,6 +234,12 @@ class APIClient {
         return this.request(`/links/search?${params.toString()}`);
     }
 
+    // Поиск по узлам, маршрутам и волокнам (typeahead)
+    async search(q, limit = 10) {
+        const params = new URLSearchParams({ q, limit });
+        return this.request(`/search?${params.toString()}`);
+    }
+
     // Auth
     async login(username, password) {
         const response = await this.request('/auth/login', {
@@ -233,7 +262,7 @@ class APIClient {
 
     // Users
     async getUsers() {
-        return this.request('/users');
+        return this.requestAll('/users', 'users');
     }
 
     async createUser(data) {
@@ -262,7 +291,7 @@ class APIClient {
 
     // WebMaps
     async getWebMaps() {
-        return this.request('/webmaps');
+        return this.requestAll('/webmaps', 'webmaps');
     }
 
     async createWebMap(data) {
@@ -385,16 +414,20 @@ class APIClient {
         if (filters.node_type) params.append('node_type', filters.node_type);
         if (filters.status) params.append('status', filters.status);
         if (filters.search) params.append('search', filters.search);
+        if (filters.bbox) params.append('bbox', filters.bbox.join(','));
+        if (filters.zoom !== undefined) params.append('zoom', filters.zoom);
         const query = params.toString();
-        return this.request(`/nodes${query ? '?' + query : ''}`);
+        return this.requestAll(`/nodes${query ? '?' + query : ''}`, 'nodes');
     }
 
     async getVols(filters = {}) {
         const params = new URLSearchParams();
         if (filters.status) params.append('status', filters.status);
         if (filters.search) params.append('search', filters.search);
+        if (filters.bbox) params.append('bbox', filters.bbox.join(','));
+        if (filters.zoom !== undefined) params.append('zoom', filters.zoom);
         const query = params.toString();
-        return this.request(`/vols${query ? '?' + query : ''}`);
+        return this.requestAll(`/vols${query ? '?' + query : ''}`, 'vols');
     }
 
     async getFibers(filters = {}) {
@@ -403,7 +436,7 @@ class APIClient {
         if (filters.status) params.append('status', filters.status);
         if (filters.search) params.append('search', filters.search);
         const query = params.toString();
-        return this.request(`/fibers${query ? '?' + query : ''}`);
+        return this.requestAll(`/fibers${query ? '?' + query : ''}`, 'fibers');
     }
 
     async getLinks(filters = {}) {
@@ -413,7 +446,7 @@ class APIClient {
         if (filters.end_node_id) params.append('end_node_id', filters.end_node_id);
         if (filters.status) params.append('status', filters.status);
         const query = params.toString();
-        return this.request(`/links${query ? '?' + query : ''}`);
+        return this.requestAll(`/links${query ? '?' + query : ''}`, 'links');
     }
 }
 
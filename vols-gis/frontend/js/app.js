@@ -16,31 +16,50 @@ document.addEventListener('DOMContentLoaded', () => {
     // Автоматическая загрузка данных при старте
     loadAllData();
     
+    // Подгружаем узлы и маршруты только для видимой области карты
+    let moveTimer = null;
+    mapManager.map.on('moveend', () => {
+        clearTimeout(moveTimer);
+        moveTimer = setTimeout(() => {
+            // Не перерисовываем слои во время рисования
+            if (!mapManager.drawInteraction) {
+                loadMapData();
+            }
+        }, 300);
+    });
+    
     console.log('Приложение инициализировано');
 });
 
 async function loadAllData() {
+    // Волокна и связи не зависят от области карты: загружаются при старте и после записи
+    await Promise.all([loadMapData(), loadFibersAndLinks()]);
+}
+
+async function loadMapData() {
     try {
         uiManager.showMessage('Загрузка данных...');
         
-        // Загружаем все данные параллельно с улучшенной обработкой ошибок
-        const [nodesResponse, volsResponse, fibersResponse, linksResponse] = await Promise.allSettled([
-            api.getNodes(),
-            api.getVols(),
-            api.getFibers(),
-            api.getLinks()
+        // Узлы и маршруты запрашиваем только в пределах видимой области
+        const bbox = mapManager.getViewBbox();
+        const zoom = mapManager.getZoom();
+        // На мелких масштабах узлы и маршруты рисуются векторными тайлами
+        const useTiles = zoom <= mapManager.vectorMinZoom;
+        
+        // Загружаем данные параллельно с улучшенной обработкой ошибок
+        const [nodesResponse, volsResponse] = await Promise.allSettled([
+            useTiles ? Promise.resolve({ nodes: [], count: 0 }) : api.getNodes({ bbox, zoom }),
+            useTiles ? Promise.resolve({ vols: [], count: 0 }) : api.getVols({ bbox, zoom })
         ]).then(results => {
             return results.map((result, index) => {
                 if (result.status === 'fulfilled') {
                     return result.value;
                 } else {
-                    const names = ['узлов', 'маршрутов', 'волокон', 'связей'];
+                    const names = ['узлов', 'маршрутов'];
                     console.error(`Ошибка загрузки ${names[index]}:`, result.reason);
                     const emptyResponses = [
                         { nodes: [], count: 0 },
-                        { vols: [], count: 0 },
-                        { fibers: [], count: 0 },
-                        { links: [], count: 0 }
+                        { vols: [], count: 0 }
                     ];
                     return emptyResponses[index];
                 }
@@ -49,17 +68,13 @@ async function loadAllData() {
         
         const nodes = nodesResponse.nodes || [];
         const volsList = volsResponse.vols || [];
-        const fibers = fibersResponse.fibers || [];
-        const links = linksResponse.links || [];
         
-        console.log(`Загружено данных: ${nodes.length} узлов, ${volsList.length} маршрутов, ${fibers.length} волокон, ${links.length} связей`);
+        console.log(`Загружено данных: ${nodes.length} узлов, ${volsList.length} маршрутов`);
         
         // Обновляем статистику
         uiManager.updateStats({
             nodes: nodes.length,
-            vols: volsList.length,
-            fibers: fibers.length,
-            links: links.length
+            vols: volsList.length
         });
         
         // Очищаем карту
@@ -87,6 +102,54 @@ async function loadAllData() {
         uiManager.showNodesList(nodes);
         uiManager.showVolsList(volsList);
         
+        // Подгоняем карту под все объекты только если есть новые объекты
+        if (nodes.length > 0 || volsList.length > 0) {
+            // Не делаем fitBounds автоматически, чтобы не сбивать позицию пользователя
+            // mapManager.fitBounds();
+        }
+        
+        if (useTiles) {
+            uiManager.showMessage('Мелкий масштаб: узлы и маршруты показаны тайлами, приблизьте карту для редактирования');
+        } else {
+            uiManager.showMessage(`Загружено: ${volsList.length} маршрутов, ${nodes.length} узлов`);
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки данных:', error);
+        uiManager.showError(`Ошибка: ${error.message}`);
+    }
+}
+
+async function loadFibersAndLinks() {
+    try {
+        const [fibersResponse, linksResponse] = await Promise.allSettled([
+            api.getFibers(),
+            api.getLinks()
+        ]).then(results => {
+            return results.map((result, index) => {
+                if (result.status === 'fulfilled') {
+                    return result.value;
+                } else {
+                    const names = ['волокон', 'связей'];
+                    console.error(`Ошибка загрузки ${names[index]}:`, result.reason);
+                    const emptyResponses = [
+                        { fibers: [], count: 0 },
+                        { links: [], count: 0 }
+                    ];
+                    return emptyResponses[index];
+                }
+            });
+        });
+        
+        const fibers = fibersResponse.fibers || [];
+        const links = linksResponse.links || [];
+        
+        console.log(`Загружено данных: ${fibers.length} волокон, ${links.length} связей`);
+        
+        uiManager.updateStats({
+            fibers: fibers.length,
+            links: links.length
+        });
+        
         // Обновляем списки волокон и связей, если соответствующие панели открыты
         const currentPanel = uiManager.currentPanel;
         if (currentPanel === 'fibers' || document.getElementById('panel-fibers')?.style.display === 'block') {
@@ -99,19 +162,15 @@ async function loadAllData() {
         // Сохраняем данные волокон и связей для быстрого доступа
         uiManager.fibersCache = fibers;
         uiManager.linksCache = links;
-        
-        // Подгоняем карту под все объекты только если есть новые объекты
-        if (nodes.length > 0 || volsList.length > 0) {
-            // Не делаем fitBounds автоматически, чтобы не сбивать позицию пользователя
-            // mapManager.fitBounds();
-        }
-        
-        uiManager.showMessage(`Загружено: ${volsList.length} маршрутов, ${nodes.length} узлов`);
     } catch (error) {
-        console.error('Ошибка загрузки данных:', error);
+        console.error('Ошибка загрузки волокон и связей:', error);
         uiManager.showError(`Ошибка: ${error.message}`);
     }
 }
 
 // Экспортируем функцию для использования в других местах
-window.loadRoutes = loadAllData;
+// (вызывается после изменения данных, поэтому сбрасываем и тайлы)
+window.loadRoutes = () => {
+    mapManager.refreshTiles();
+    return loadAllData();
+};
@@ -9,6 +9,12 @@ class MapManager {
         this.baseLayer = null;
         this.nodesLayer = null;
         this.routesLayer = null;
+        this.nodesTileLayer = null;
+        this.routesTileLayer = null;
+        
+        // До этого zoom (включительно) слои показываются векторными тайлами,
+        // выше - редактируемыми векторными слоями
+        this.vectorMinZoom = 11;
         
         // Источники данных
         this.nodesSource = null;
@@ -59,12 +65,33 @@ class MapManager {
 
         this.nodesLayer = new ol.layer.Vector({
             source: this.nodesSource,
-            style: (feature) => this.getNodeStyle(feature)
+            style: (feature) => this.getNodeStyle(feature),
+            minZoom: this.vectorMinZoom
         });
 
         this.routesLayer = new ol.layer.Vector({
             source: this.routesSource,
-            style: (feature) => this.getRouteStyle(feature)
+            style: (feature) => this.getRouteStyle(feature),
+            minZoom: this.vectorMinZoom
+        });
+
+        // Векторные тайлы (MVT) для мелких масштабов
+        this.nodesTileLayer = new ol.layer.VectorTile({
+            source: new ol.source.VectorTile({
+                format: new ol.format.MVT(),
+                url: `${API_BASE}/tiles/nodes/{z}/{x}/{y}.pbf`
+            }),
+            style: (feature) => this.getTileStyle(feature),
+            maxZoom: this.vectorMinZoom
+        });
+
+        this.routesTileLayer = new ol.layer.VectorTile({
+            source: new ol.source.VectorTile({
+                format: new ol.format.MVT(),
+                url: `${API_BASE}/tiles/vols/{z}/{x}/{y}.pbf`
+            }),
+            style: (feature) => this.getTileStyle(feature),
+            maxZoom: this.vectorMinZoom
         });
 
         // Создаем overlay для попапа
@@ -80,6 +107,8 @@ class MapManager {
             target: this.containerId,
             layers: [
                 this.baseLayer,
+                this.routesTileLayer,
+                this.nodesTileLayer,
                 this.routesLayer,
                 this.nodesLayer
             ],
@@ -278,6 +307,37 @@ class MapManager {
         });
     }
 
+    // Стиль для объектов из векторных тайлов (атрибуты берутся из самого тайла)
+    getTileStyle(feature) {
+        const colors = {
+            active: '#2ecc71',
+            maintenance: '#f39c12',
+            under_construction: '#f39c12',
+            inactive: '#e74c3c',
+            planning: '#95a5a6'
+        };
+        const color = colors[feature.get('status')] || '#3498db';
+
+        if (feature.getType() === 'Point') {
+            return new ol.style.Style({
+                image: new ol.style.Circle({
+                    radius: 5,
+                    fill: new ol.style.Fill({ color: color }),
+                    stroke: new ol.style.Stroke({ color: '#fff', width: 1 })
+                })
+            });
+        }
+        return new ol.style.Style({
+            stroke: new ol.style.Stroke({ color: color, width: 2 })
+        });
+    }
+
+    // Сбросить векторные тайлы после изменения данных
+    refreshTiles() {
+        this.nodesTileLayer.getSource().refresh();
+        this.routesTileLayer.getSource().refresh();
+    }
+
     // Стиль для выбранных объектов
     getSelectedStyle(feature) {
         const geometryType = feature.getGeometry().getType();
@@ -496,6 +556,25 @@ class MapManager {
         }
     }
 
+    // Текущая область видимости карты в EPSG:4326 [minx, miny, maxx, maxy]
+    getViewBbox() {
+        const view = this.map.getView();
+        const extent = view.calculateExtent(this.map.getSize());
+        const [minx, miny, maxx, maxy] = ol.proj.transformExtent(extent, 'EPSG:3857', 'EPSG:4326');
+        // При сильном отдалении extent выходит за пределы мира
+        return [
+            Math.max(minx, -180),
+            Math.max(miny, -90),
+            Math.min(maxx, 180),
+            Math.min(maxy, 90)
+        ];
+    }
+
+    // Текущий уровень масштаба (целый)
+    getZoom() {
+        return Math.round(this.map.getView().getZoom());
+    }
+
     // Обновить размер карты
     updateSize() {
         if (this.map) {
@@ -1,10 +1,37 @@
 ﻿-- нициализация  для Vols GIS
 CREATE EXTENSION IF NOT EXISTS postgis;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 CREATE TABLE IF NOT EXISTS nodes (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT, node_type VARCHAR(50), status VARCHAR(50), geom GEOMETRY(Point, 4326) NOT NULL, meta_data JSONB, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW());
 CREATE INDEX IF NOT EXISTS idx_nodes_geom ON nodes USING GIST(geom);
 CREATE TABLE IF NOT EXISTS vols (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT, start_node_id INTEGER REFERENCES nodes(id), end_node_id INTEGER REFERENCES nodes(id), path GEOMETRY(LineString, 4326) NOT NULL, length_km DECIMAL(10,2), status VARCHAR(50), meta_data JSONB, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW());
 CREATE INDEX IF NOT EXISTS idx_vols_path ON vols USING GIST(path);
+CREATE TABLE IF NOT EXISTS vols_lod (vols_id INTEGER NOT NULL REFERENCES vols(id) ON DELETE CASCADE, band INTEGER NOT NULL, path GEOMETRY(LineString, 4326) NOT NULL, npoints INTEGER, PRIMARY KEY (vols_id, band));
 CREATE TABLE IF NOT EXISTS fibers (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, cable_type VARCHAR(100), fiber_count INTEGER, status VARCHAR(50), vols_id INTEGER REFERENCES vols(id), meta_data JSONB, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW());
 CREATE TABLE IF NOT EXISTS links (id SERIAL PRIMARY KEY, fiber_id INTEGER REFERENCES fibers(id), start_node_id INTEGER REFERENCES nodes(id), end_node_id INTEGER REFERENCES nodes(id), start_port INTEGER, end_port INTEGER, status VARCHAR(50), capacity_gbps DECIMAL(10,2), meta_data JSONB, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW());
 CREATE TABLE IF NOT EXISTS webmaps (id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT, visible_layers JSONB, center_geom GEOMETRY(Point, 4326), zoom_level INTEGER DEFAULT 8, permissions JSONB, created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW());
 CREATE TABLE IF NOT EXISTS users (id SERIAL PRIMARY KEY, username VARCHAR(100) UNIQUE NOT NULL, email VARCHAR(255) UNIQUE NOT NULL, password_hash VARCHAR(255) NOT NULL, role VARCHAR(50), is_active BOOLEAN DEFAULT TRUE, created_at TIMESTAMP DEFAULT NOW());
+-- Индексы фильтров и поиска по имени (миграция 1, vols_gis/migrations)
+CREATE INDEX IF NOT EXISTS idx_nodes_status ON nodes (status, id);
+CREATE INDEX IF NOT EXISTS idx_nodes_node_type ON nodes (node_type, id);
+CREATE INDEX IF NOT EXISTS idx_vols_status ON vols (status, id);
+CREATE INDEX IF NOT EXISTS idx_vols_start_node_id ON vols (start_node_id);
+CREATE INDEX IF NOT EXISTS idx_vols_end_node_id ON vols (end_node_id);
+CREATE INDEX IF NOT EXISTS idx_fibers_vols_id ON fibers (vols_id, id);
+CREATE INDEX IF NOT EXISTS idx_fibers_status ON fibers (status, id);
+CREATE INDEX IF NOT EXISTS idx_links_fiber_id ON links (fiber_id, id);
+CREATE INDEX IF NOT EXISTS idx_links_start_node_id ON links (start_node_id, id);
+CREATE INDEX IF NOT EXISTS idx_links_end_node_id ON links (end_node_id, id);
+CREATE INDEX IF NOT EXISTS idx_links_status ON links (status, id);
+CREATE INDEX IF NOT EXISTS idx_nodes_name_trgm ON nodes USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vols_name_trgm ON vols USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_fibers_name_trgm ON fibers USING GIN (name gin_trgm_ops);
+-- Индексы общего поиска (миграция 2) и фильтров meta_data (миграция 3)
+CREATE INDEX IF NOT EXISTS idx_nodes_search_trgm ON nodes USING GIN ((name || ' ' || coalesce(description, '') || ' ' || coalesce(meta_data ->> 'address', '') || ' ' || coalesce(meta_data ->> 'code', '') || ' ' || coalesce(meta_data ->> 'owner', '')) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_vols_search_trgm ON vols USING GIN ((name || ' ' || coalesce(description, '') || ' ' || coalesce(meta_data ->> 'address', '') || ' ' || coalesce(meta_data ->> 'code', '') || ' ' || coalesce(meta_data ->> 'owner', '')) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_fibers_search_trgm ON fibers USING GIN ((name || ' ' || coalesce(cable_type, '') || ' ' || coalesce(meta_data ->> 'address', '') || ' ' || coalesce(meta_data ->> 'code', '') || ' ' || coalesce(meta_data ->> 'owner', '')) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_nodes_meta_data ON nodes USING GIN (meta_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_vols_meta_data ON vols USING GIN (meta_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_fibers_meta_data ON fibers USING GIN (meta_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_links_meta_data ON links USING GIN (meta_data jsonb_path_ops);
+-- KNN по расстоянию в метрах (миграция 4)
+CREATE INDEX IF NOT EXISTS idx_nodes_geog ON nodes USING GIST (geography(geom));